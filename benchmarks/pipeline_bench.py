@@ -0,0 +1,359 @@
+# benchmarks/pipeline_bench.py — Headless end-to-end latency of a voice command against a local Spotify stand-in
+"""
+Drives the real hotkey flow (toggle_recording -> capture -> transcription -> query_best_song ->
+play_track -> recommendation queueing) with no microphone, speaker or network:
+
+  * audio comes from the WAV fixtures in fixtures/manifest.json, replayed through FileCapture
+  * Spotify is a local HTTP server serving canned search / track / artist / device responses
+    with a configurable per-request latency
+  * spoken feedback is the silent TTS stage (speak() returns an already finished Future)
+
+Per-stage timings come from the command traces (core/tracing.py); the report shows every run,
+then p50/p95/p99 per stage, the response latency (end of speech -> playback started) and RSS.
+
+    python -m benchmarks.pipeline_bench --backend whisper --model base.en --runs 3 --latency-ms 80
+    python -m benchmarks.pipeline_bench --backend scripted --fast   # no ASR: matcher + transport only
+
+`--backend scripted` returns the manifest text instead of decoding, so fixtures without a WAV
+are replaced by a synthetic noise burst of similar length.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from core.tracing import TraceRecorder
+from benchmarks.recognizer_bench import FIXTURES_DIR, SAMPLE_RATE, load_manifest, peak_rss_mb
+from core.audio_io import load_wav
+
+DEVICE_ID = "benchmark-device"
+
+
+# ------------------- Canned catalog -------------------
+def make_artist(artist_id: str, name: str) -> dict:
+    return {"id": artist_id, "name": name, "uri": f"spotify:artist:{artist_id}", "type": "artist"}
+
+
+def make_track(track_id: str, name: str, artists: list[dict]) -> dict:
+    return {
+        "id": track_id,
+        "name": name,
+        "uri": f"spotify:track:{track_id}",
+        "artists": artists,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+    }
+
+
+def search_words(text: str) -> set[str]:
+    return set(text.lower().translate(str.maketrans('', '', string.punctuation)).split())
+
+
+class Catalog:
+    """
+    The manifest's songs plus `decoys` generated tracks built from the same vocabulary, so every
+    search returns full pages of plausible near-misses for the matcher to score.
+    """
+
+    def __init__(self, entries: list[dict], decoys: int = 400, seed: int = 0):
+        rng = random.Random(seed)
+        self.tracks, self.artists, self.top_tracks, self.related = {}, {}, {}, {}
+
+        for i, entry in enumerate(entries):
+            title, _, artist = entry["text"].partition(" by ")
+            artist = make_artist(f"a{i}", artist or f"Artist {i}")
+            self.artists[artist["id"]] = artist
+            track = make_track(f"t{i}", title, [artist])
+            self.tracks[track["id"]] = track
+
+        vocabulary = sorted({w for e in entries for w in e["text"].split() if w.lower() != "by"})
+        vocabulary += ["Love", "Night", "Heart", "Fire", "Dream", "Road", "Light", "Rain", "Gold", "Home"]
+        for i in range(40):
+            artist = make_artist(f"d{i}", " ".join(rng.sample(vocabulary, 2)))
+            self.artists[artist["id"]] = artist
+        decoy_artists = [a for a in self.artists.values() if a["id"].startswith("d")]
+        for i in range(decoys):
+            title = " ".join(rng.sample(vocabulary, rng.randint(1, 4)))
+            artist = rng.choice(decoy_artists)
+            self.tracks[f"x{i}"] = make_track(f"x{i}", title, [artist])
+
+        for artist_id in self.artists:
+            self.top_tracks[artist_id] = [t for t in self.tracks.values() if t["artists"][0]["id"] == artist_id][:10]
+            self.related[artist_id] = [a for a in rng.sample(decoy_artists, 5) if a["id"] != artist_id]
+        self._words = {track_id: search_words(t["name"] + " " + t["artists"][0]["name"]) for track_id, t in self.tracks.items()}
+
+    def search(self, query: str, limit: int, offset: int) -> dict:
+        """Tracks ranked by shared words with the query (stable order for ties), one page of them."""
+        words = search_words(query)
+        ranked = sorted(self.tracks, key=lambda track_id: -len(words & self._words[track_id]))
+        items = [self.tracks[track_id] for track_id in ranked[offset:offset + limit]]
+        return {"tracks": {"items": items, "limit": limit, "offset": offset, "total": len(ranked)}}
+
+
+# ------------------- Local Spotify stand-in -------------------
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload=None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method: str):
+        server = self.server
+        # Drain the request body so the keep-alive connection stays usable
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.removeprefix("/v1/")
+        server.count(method + " " + re.sub(r"(tracks|artists)/\w+", r"\1/{id}", path))
+        time.sleep(server.latency_s)
+        catalog = server.catalog
+
+        if method == "GET" and path == "search":
+            return self._reply(200, catalog.search(params.get("q", ""), int(params.get("limit", 10)), int(params.get("offset", 0))))
+        if method == "GET" and path == "me/player/devices":
+            return self._reply(200, {"devices": [{"id": DEVICE_ID, "name": "Benchmark", "is_active": True, "type": "Computer"}]})
+        if method in ("PUT", "POST") and path in ("me/player/play", "me/player/pause", "me/player/queue"):
+            return self._reply(204)
+        match = re.fullmatch(r"tracks/(\w+)", path)
+        if method == "GET" and match and match[1] in catalog.tracks:
+            return self._reply(200, catalog.tracks[match[1]])
+        match = re.fullmatch(r"artists/(\w+)/(related-artists|top-tracks)", path)
+        if method == "GET" and match and match[1] in catalog.artists:
+            if match[2] == "related-artists":
+                return self._reply(200, {"artists": catalog.related[match[1]]})
+            return self._reply(200, {"tracks": catalog.top_tracks[match[1]]})
+        return self._reply(404, {"error": {"status": 404, "message": f"No route for {method} {path}"}})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_POST(self):
+        self._route("POST")
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    """Threaded, so concurrent page requests overlap just like against the real API."""
+    daemon_threads = True
+
+    def __init__(self, catalog: Catalog, latency_ms: float = 0.0):
+        super().__init__(("127.0.0.1", 0), FakeSpotifyHandler)
+        self.catalog = catalog
+        self.latency_s = latency_ms / 1000
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, route: str):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def start(self) -> "FakeSpotifyServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# ------------------- Headless pipeline -------------------
+class ScriptedRecognizer:
+    """Skips ASR: every transcribe() returns the text of the fixture being replayed."""
+
+    def __init__(self):
+        self.text = ""
+
+    def transcribe(self, audio, **options):
+        return {"text": self.text}
+
+
+def synthetic_utterance(text: str, seed: int = 0) -> np.ndarray:
+    """Amplitude-modulated noise roughly as long as `text` spoken (stands in for a missing WAV)."""
+    rng = np.random.default_rng(seed)
+    duration = 0.35 * len(text.split()) + 0.4
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * t))
+    return (0.2 * envelope * rng.standard_normal(t.shape[0])).astype(np.float32)
+
+
+def pad_silence(audio: np.ndarray, lead_s: float, tail_s: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    noise = lambda seconds: (1e-3 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+    return np.concatenate((noise(lead_s), audio, noise(tail_s)))
+
+
+def load_fixtures(fixtures_dir: str, scripted: bool) -> list[tuple[str, np.ndarray]]:
+    fixtures = []
+    for i, entry in enumerate(load_manifest(fixtures_dir)):
+        path = os.path.join(fixtures_dir, entry["file"])
+        if os.path.exists(path):
+            fixtures.append((entry["text"], load_wav(path)))
+        elif scripted:
+            fixtures.append((entry["text"], synthetic_utterance(entry["text"], seed=i)))
+        else:
+            print(f"Skipping {entry['file']}: not found (run recognizer_bench --generate)")
+    return fixtures
+
+
+def install_stand_ins(server: FakeSpotifyServer, cache: str):
+    """Point the app at the local server and silence spoken feedback."""
+    import spotipy
+    import core.service as service
+    import core.spotify_player as sp
+    import core.tracing as tracing
+    from core.history import NullCommandHistory
+    from core.pipeline import build_pipeline
+    from core.search_cache import SQLiteSearchCache, NullSearchCache
+    from core.spotify_transport import DeviceCache
+    from core.startup import LazyHandle
+
+    client = spotipy.Spotify(auth="benchmark", requests_session=sp.session, requests_timeout=10)
+    client.prefix = server.url + "/v1/"
+    sp.sp = LazyHandle("spotify-user", lambda: client)
+    sp.sp_client = LazyHandle("spotify-app", lambda: client)
+    sp.devices = DeviceCache()
+    sp.LIBRARY_INDEX_ENABLED = False
+    sp.search_cache = SQLiteSearchCache(":memory:") if cache == "memory" else NullSearchCache()
+    sp.history = NullCommandHistory()  # repeated runs must not turn into history shortcuts
+
+    # Silent feedback; the capture stage is replaced per command by run_command()
+    service.use_pipeline(build_pipeline(capture="sounddevice", tts="none", matcher="spotify", player="spotify"))
+
+    recorder = BenchRecorder()
+    tracing.TRACE_ENABLED = True
+    tracing.recorder = recorder
+    return recorder
+
+
+class BenchRecorder(TraceRecorder):
+    """Trace recorder that keeps every finished record and signals the waiting benchmark."""
+
+    def __init__(self):
+        super().__init__(path=None)
+        self.records = []
+        self.finished = threading.Event()
+
+    def finish(self, trace):
+        record = super().finish(trace)
+        self.records.append(record)
+        self.finished.set()
+        return record
+
+
+def run_command(recognizer, text: str, audio: np.ndarray, recorder: BenchRecorder, realtime: bool, vad: bool, timeout: float = 120):
+    """One hotkey press -> speech -> (hotkey press or VAD stop) -> wait until the trace is complete."""
+    import core.service as service
+    from core.capture import FileCapture, RingBuffer
+
+    if isinstance(recognizer, ScriptedRecognizer):
+        recognizer.text = text
+    clip = pad_silence(audio, 0.3, 1.5 if vad else 0.3)
+    # Paused until the hotkey handler has armed capture, which clears anything buffered before
+    source = FileCapture(RingBuffer(clip.shape[0]), audio=clip, realtime=realtime, paused=True)
+    service.stages().capture = lambda: source
+
+    recorder.finished.clear()
+    service.toggle_recording(recognizer)
+    source.resume()
+    source.finished.wait(timeout)
+    if not vad:
+        service.toggle_recording(recognizer)
+    if not recorder.finished.wait(timeout):
+        raise TimeoutError(f"Command '{text}' did not finish within {timeout}s")
+    return recorder.records[-1]
+
+
+def stage_totals(record: dict) -> dict:
+    totals = {}
+    for span in record["spans"]:
+        totals[span["name"]] = totals.get(span["name"], 0.0) + span["duration_ms"]
+    marks = record["marks"]
+    if "stop" in marks and "playing" in marks:
+        totals["response"] = marks["playing"] - marks["stop"]
+    totals["total"] = record["total_ms"]
+    return totals
+
+
+def percentiles(values: list[float]) -> str:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:8.1f}  p95 {p95:8.1f}  p99 {p99:8.1f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="whisper", help="recognizer backend, or 'scripted' to skip ASR")
+    parser.add_argument("--model", default="base.en")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=3, help="passes over all fixtures")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="added to every Spotify request")
+    parser.add_argument("--decoys", type=int, default=400, help="generated near-miss tracks in the catalog")
+    parser.add_argument("--cache", choices=["none", "memory"], default="none", help="search cache during the run")
+    parser.add_argument("--vad", action="store_true", help="end utterances by VAD instead of a second hotkey press")
+    parser.add_argument("--no-streaming", action="store_true", help="decode only after capture stops")
+    parser.add_argument("--fast", action="store_true", help="replay audio as fast as possible instead of in real time")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--json", help="also write every trace record to this file")
+    args = parser.parse_args(argv)
+
+    scripted = args.backend == "scripted"
+    fixtures = load_fixtures(args.fixtures, scripted)
+    if not fixtures:
+        raise SystemExit(f"No fixtures available in {args.fixtures}")
+
+    server = FakeSpotifyServer(Catalog(load_manifest(args.fixtures), args.decoys), args.latency_ms).start()
+    recorder = install_stand_ins(server, args.cache)
+
+    import core.service as service
+    service.VAD_ENABLED = args.vad
+    service.STREAMING_RECOGNITION = not args.no_streaming
+
+    start = time.perf_counter()
+    if scripted:
+        recognizer = ScriptedRecognizer()
+    else:
+        from core.recognizer import create_backend
+        recognizer = create_backend(args.backend, args.model, args.threads).load()
+    print(f"Recognizer {args.backend} ready in {time.perf_counter() - start:.2f}s, RSS {peak_rss_mb():.0f} MB")
+
+    rows = []
+    for run in range(args.runs):
+        for text, audio in fixtures:
+            record = run_command(recognizer, text, audio, recorder, realtime=not args.fast, vad=args.vad)
+            totals = stage_totals(record)
+            rss = peak_rss_mb()
+            rows.append((totals, rss))
+            print(f"run {run + 1}  {text:<34} response {totals.get('response', float('nan')):7.1f} ms  "
+                  f"transcription {totals.get('transcription', 0):7.1f} ms  match {totals.get('match', 0):7.1f} ms  "
+                  f"playback {totals.get('playback_start', 0):6.1f} ms  peak RSS {rss:6.0f} MB")
+
+    print(f"\n{len(rows)} commands, Spotify latency {args.latency_ms:.0f} ms/request, cache {args.cache}")
+    stages = sorted({name for totals, _ in rows for name in totals})
+    for name in stages:
+        values = [totals[name] for totals, _ in rows if name in totals]
+        print(f"  {name:<18} {percentiles(values)}  (n={len(values)})")
+    print(f"  peak RSS first/last run: {rows[0][1]:.0f} / {rows[-1][1]:.0f} MB")
+    print(f"  Spotify requests: {dict(sorted(server.requests.items()))}")
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(recorder.records, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# benchmarks/recognizer_bench.py — Compare recognizer backends / model sizes on local WAV fixtures
+"""
+Reports, per (backend, model) pair: load time, real-time factor (decode time / audio length),
+peak RSS and word error rate against the references in fixtures/manifest.json.
+
+Each pair runs in a fresh process so peak RSS isn't polluted by previously loaded models.
+
+    python -m benchmarks.recognizer_bench --backends whisper whisper-int8 --models tiny.en base.en small.en
+
+Fixtures are 16-bit WAVs listed in fixtures/manifest.json. The WAVs are not committed: render
+them once with the assistant's own TTS voice via --generate, or (better) drop real recordings
+with those names into fixtures/. Synthetic TTS audio is much easier than real speech, so WER
+on generated fixtures is a lower bound.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import string
+import sys
+import time
+import numpy as np
+from core.audio_io import load_wav
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SAMPLE_RATE = 16000
+
+
+# ------------------- Fixtures -------------------
+def load_manifest(fixtures_dir: str) -> list[dict]:
+    with open(os.path.join(fixtures_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def generate_fixtures(fixtures_dir: str):
+    from core.utils import global_tts
+    for entry in load_manifest(fixtures_dir):
+        path = os.path.join(fixtures_dir, entry["file"])
+        if not os.path.exists(path):
+            print(f"Rendering fixture {entry['file']}")
+            global_tts.tts_to_file(text=entry["text"], speaker="p347", file_path=path)
+
+
+# ------------------- Metrics -------------------
+def normalize_words(text: str) -> list[str]:
+    return text.lower().translate(str.maketrans('', '', string.punctuation)).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        prev_diag, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            prev_diag, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev_diag + (ref_word != hyp_word))
+    return row[-1] / len(ref)
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process; NaN where it can't be measured (Windows without psutil)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return float("nan")
+
+
+def available_fixtures(fixtures_dir: str) -> list[dict]:
+    return [entry for entry in load_manifest(fixtures_dir) if os.path.exists(os.path.join(fixtures_dir, entry["file"]))]
+
+
+# ------------------- Runner -------------------
+def run_config(backend: str, model_size: str, threads: int, fixtures_dir: str, queue):
+    """Child-process entry point: load one backend, transcribe every fixture, report metrics."""
+    from core.recognizer import create_backend
+
+    try:
+        fixtures = [
+            (entry["text"], load_wav(os.path.join(fixtures_dir, entry["file"])))
+            for entry in available_fixtures(fixtures_dir)
+        ]
+
+        start = time.perf_counter()
+        recognizer = create_backend(backend, model_size, threads).load()
+        load_s = time.perf_counter() - start
+
+        # Warm-up pass so one-off allocations don't land in the first fixture's timing
+        recognizer.transcribe(fixtures[0][1], temperature=0.0)
+
+        audio_s = decode_s = errors = 0.0
+        for reference, audio in fixtures:
+            start = time.perf_counter()
+            result = recognizer.transcribe(audio, temperature=0.0)
+            decode_s += time.perf_counter() - start
+            audio_s += audio.shape[0] / SAMPLE_RATE
+            errors += word_error_rate(reference, result.get("text", ""))
+
+        queue.put({
+            "backend": backend,
+            "model": model_size,
+            "load_s": load_s,
+            "rtf": decode_s / audio_s,
+            "peak_rss_mb": peak_rss_mb(),
+            "wer": errors / len(fixtures),
+            "fixtures": len(fixtures),
+        })
+    except Exception as e:
+        queue.put({"backend": backend, "model": model_size, "error": str(e)})
+
+
+def wait_for_result(proc, queue, timeout: float) -> dict:
+    """The child's report, or an error once it died without one or ran out of time."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = queue.get(timeout=1.0)
+            proc.join()
+            return result
+        except queue_module.Empty:
+            pass
+        if not proc.is_alive():
+            try:
+                return queue.get(timeout=1.0)  # reported just before exiting
+            except queue_module.Empty:
+                return {"error": f"worker exited with code {proc.exitcode} before reporting"}
+        if time.monotonic() > deadline:
+            proc.terminate()
+            proc.join()
+            return {"error": f"timed out after {timeout:.0f}s"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["whisper", "whisper-int8", "ctranslate2"])
+    parser.add_argument("--models", nargs="+", default=["tiny.en", "base.en", "small.en"])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--generate", action="store_true", help="render missing fixtures with TTS first")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds allowed per configuration")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generate_fixtures(args.fixtures)
+    if not available_fixtures(args.fixtures):
+        raise SystemExit(f"No fixture WAVs in {args.fixtures}: they are not committed. Run with --generate "
+                         "to render them with TTS, or add recordings named as in manifest.json.")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in args.backends:
+        for model_size in args.models:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_config, args=(backend, model_size, args.threads, args.fixtures, queue))
+            proc.start()
+            result = wait_for_result(proc, queue, args.timeout)
+            results.append({"backend": backend, "model": model_size, **result})
+
+            if "error" in result:
+                print(f"{backend:<14} {model_size:<10} skipped: {result['error']}")
+            else:
+                print(f"{backend:<14} {model_size:<10} load {result['load_s']:6.1f}s  RTF {result['rtf']:.3f}  "
+                      f"peak RSS {result['peak_rss_mb']:7.0f} MB  WER {result['wer']:.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
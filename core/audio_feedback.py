@@ -1,33 +1,272 @@
-import os
-import sounddevice as sd
-import soundfile as sf
+import collections
+import itertools
+import queue
+import re
+import threading
+from concurrent.futures import Future
+import numpy as np
+from core.config import TTS_MODEL, TTS_SPEAKER, TTS_LENGTH_SCALE, TTS_NOISE_SCALE, TTS_NOISE_SCALE_W
 from core.utils import global_tts
-ESPEAK_PATH = r"F:\eSpeak\command-line"
-os.environ["PATH"] = ESPEAK_PATH + os.pathsep + os.environ.get("PATH", "")
-
-def initiate_tts(tts=global_tts, text="Sorry! Haven't quite caught that.", speaker_id = "p347", file_path = "assets/sounds/temp.wav"):
-
-    try:
-        # parameters for smoother speech
-        length_scale = 1.5  # slightly slower speech
-        noise_scale = 0.7   # reduces robotic artifacts
-        noise_scale_w = 0.8   # affects prosody
-
-        tts.tts_to_file(
-            text=text,
-            speaker=speaker_id,
-            file_path=file_path,
-            length_scale=length_scale,
-            noise_scale=noise_scale,
-            noise_scale_w=noise_scale_w
+from core.tts_cache import TTSCache, make_key
+
+phrase_cache = TTSCache()
+
+
+def phrase_key(text: str, speaker_id: str = TTS_SPEAKER) -> str:
+    # Keyed by the configured model name, so cached phrases are found without loading the model
+    return make_key(text, speaker_id, TTS_LENGTH_SCALE, TTS_NOISE_SCALE, TTS_NOISE_SCALE_W, TTS_MODEL)
+
+
+def cached_phrase(text: str, speaker_id: str = TTS_SPEAKER):
+    """(wav, sample_rate) if `text` was rendered before (memory or disk), else None. Never runs TTS."""
+    return phrase_cache.get(phrase_key(text, speaker_id))
+
+
+def synthesize(tts=global_tts, text="Sorry! Haven't quite caught that.", speaker_id = TTS_SPEAKER):
+    """Return (wav, sample_rate) for `text`, from the phrase cache when possible."""
+    # parameters for smoother speech (see core/config.py)
+    length_scale = TTS_LENGTH_SCALE
+    noise_scale = TTS_NOISE_SCALE
+    noise_scale_w = TTS_NOISE_SCALE_W
+
+    key = phrase_key(text, speaker_id)
+    cached = phrase_cache.get(key)
+    if cached is not None:
+        return cached
+
+    wav = tts.tts(
+        text=text,
+        speaker=speaker_id,
+        length_scale=length_scale,
+        noise_scale=noise_scale,
+        noise_scale_w=noise_scale_w
+    )
+    wav = np.asarray(wav, dtype=np.float32)
+    sr = tts.synthesizer.output_sample_rate
+    phrase_cache.put(key, wav, sr)
+    return wav, sr
+
+
+# Boundaries where an utterance can be cut without hurting prosody much
+CHUNK_BOUNDARY = re.compile(r'(\s+-\s+|(?<=[.!?;:,])\s+)')
+
+
+def split_chunks(text: str, min_chars: int = 12) -> list[str]:
+    """Split text at sentence/clause boundaries, merging pieces shorter than `min_chars` forward."""
+    pieces = CHUNK_BOUNDARY.split(text.strip())
+    chunks, current = [], pieces[0]
+    for separator, piece in zip(pieces[1::2], pieces[2::2]):
+        if len(current) < min_chars:
+            current += separator + piece
+        else:
+            chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ------------------- Streaming playback -------------------
+
+class SpeechStream:
+    """Chunks of one utterance, appended by the synthesis worker and consumed by playback."""
+
+    _END = object()
+
+    def __init__(self):
+        self.error = None
+        self._chunks = queue.Queue()
+
+    def put(self, wav: np.ndarray, sr: int):
+        self._chunks.put((wav, sr))
+
+    def close(self, error: Exception | None = None):
+        self.error = error
+        self._chunks.put(self._END)
+
+    def __iter__(self):
+        while (item := self._chunks.get()) is not self._END:
+            yield item
+
+
+class StreamingOutput:
+    """Plays float32 chunks through a single sd.OutputStream as soon as they are written."""
+
+    def __init__(self, samplerate: int, blocksize: int = 1024):
+        import sounddevice as sd
+        self._stop_stream = sd.CallbackStop  # raised from the callback; no import on the audio thread
+        self._pending = collections.deque()
+        self._offset = 0
+        self._closed = False
+        self._aborted = False
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._stream = sd.OutputStream(
+            samplerate=samplerate,
+            channels=1,
+            dtype="float32",
+            blocksize=blocksize,
+            callback=self._callback,
+            finished_callback=self._finished.set,
         )
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        filled = 0
+        with self._lock:
+            while filled < frames and self._pending and not self._aborted:
+                chunk = self._pending[0]
+                take = min(frames - filled, chunk.shape[0] - self._offset)
+                out[filled:filled + take] = chunk[self._offset:self._offset + take]
+                filled += take
+                self._offset += take
+                if self._offset >= chunk.shape[0]:
+                    self._pending.popleft()
+                    self._offset = 0
+            done = self._aborted or (self._closed and not self._pending)
+        # Underrun while the next chunk is still being synthesized: pad with silence
+        out[filled:] = 0
+        if done:
+            raise self._stop_stream
+
+    def write(self, wav: np.ndarray):
+        with self._lock:
+            self._pending.append(wav)
+
+    def close(self):
+        """No more chunks; playback ends once the queued audio has drained."""
+        with self._lock:
+            self._closed = True
+
+    def abort(self):
+        with self._lock:
+            self._aborted = True
+
+    def wait(self) -> bool:
+        """Block until playback ends; True if it drained normally, False if aborted."""
+        self._finished.wait()
+        self._stream.close()
+        return not self._aborted
+
+
+# ------------------- Non-blocking feedback -------------------
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class FeedbackPlayer:
+    """
+    Speaks prompts without blocking the caller. A synthesis worker renders queued phrases chunk
+    by chunk (so the next one is ready while the current one plays) and a playback worker streams
+    each chunk to the output device as soon as it exists, in priority order. speak() returns a Future that resolves to True once the phrase has been
+    played in full, or False if it was interrupted / dropped; await it only when ordering matters.
+    """
+
+    def __init__(self, tts=global_tts):
+        self.tts = tts
+        self._synth_queue = queue.PriorityQueue()
+        self._play_queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._generation = 0  # bumped by interrupt(); anything queued before that is dropped
+        self._lock = threading.Lock()
+        self._output = None  # StreamingOutput of the phrase currently playing
+        self._workers = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for target in (self._synth_loop, self._play_loop):
+                worker = threading.Thread(target=target, daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def speak(self, text: str, priority: int = PRIORITY_NORMAL, interrupt: bool = False, speaker_id: str = TTS_SPEAKER) -> Future:
+        if interrupt:
+            self.interrupt()
+        self._ensure_workers()
+        future = Future()
+        self._synth_queue.put((priority, next(self._seq), self._generation, text, speaker_id, future))
+        return future
+
+    def interrupt(self):
+        """Stop the phrase currently playing and drop everything queued so far."""
+        with self._lock:
+            self._generation += 1
+            if self._output is not None:
+                self._output.abort()
+
+    def _synth_loop(self):
+        while True:
+            priority, seq, generation, text, speaker_id, future = self._synth_queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if generation != self._generation:
+                future.set_result(False)
+                continue
+
+            # Hand the stream to playback right away; it starts as soon as the first chunk lands
+            stream = SpeechStream()
+            self._play_queue.put((priority, seq, generation, stream, future))
+            error = None
+            for chunk in split_chunks(text):
+                if generation != self._generation:
+                    break
+                try:
+                    wav, sr = synthesize(self.tts, text=chunk, speaker_id=speaker_id)
+                except Exception as e:
+                    print(f"TTS error: {e}")
+                    error = e
+                    break
+                stream.put(wav, sr)
+            stream.close(error)
+
+    def _play_loop(self):
+        while True:
+            priority, seq, generation, stream, future = self._play_queue.get()
+            try:
+                self._play(generation, stream, future)
+            except Exception as e:
+                # An output device error (unplugged, busy) must not kill the only playback worker
+                print(f"Playback error: {e}")
+                with self._lock:
+                    output, self._output = self._output, None
+                if output is not None:
+                    try:
+                        output.abort()
+                    except Exception:
+                        pass
+                if not future.done():
+                    future.set_result(False)
+
+    def _play(self, generation, stream, future):
+        output = None
+        for wav, sr in stream:
+            with self._lock:
+                if generation != self._generation:
+                    break
+                if output is None:
+                    output = self._output = StreamingOutput(sr)
+                output.write(wav)
+
+        completed = False
+        if output is not None:
+            output.close()
+            completed = output.wait()
+            with self._lock:
+                self._output = None
+
+        if stream.error is not None and not completed:
+            future.set_exception(stream.error)
+        else:
+            future.set_result(completed and generation == self._generation)
+
 
-        wav, sr = sf.read(file_path)
-        sd.play(wav, samplerate=sr)
-        sd.wait()
+feedback = FeedbackPlayer()
 
-    except Exception as e:
-        print(f"TTS error: {e}")
 
-    
-    
\ No newline at end of file
+def speak(text: str, priority: int = PRIORITY_NORMAL, interrupt: bool = False) -> Future:
+    return feedback.speak(text, priority=priority, interrupt=interrupt)
@@ -0,0 +1,29 @@
+# core/audio_io.py — Reading WAV clips as mono float32 at the rate a consumer needs
+import wave
+import numpy as np
+from core.config import SAMPLE_RATE
+
+
+def read_wav(source) -> tuple[np.ndarray, int]:
+    """(mono float32 samples, sample_rate) of a 16-bit PCM WAV, from a path or a binary file object."""
+    with wave.open(source, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV is supported")
+        channels, sr = f.getnchannels(), f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    wav = pcm.reshape(-1, channels).mean(axis=1) / 32768.0
+    return wav.astype(np.float32), sr
+
+
+def resample(wav: np.ndarray, sr: int, samplerate: int = SAMPLE_RATE) -> np.ndarray:
+    """Linear-interpolation resample (good enough for speech and short cues)."""
+    wav = np.asarray(wav, dtype=np.float32)
+    if sr == samplerate or wav.size == 0:
+        return wav
+    n = int(round(wav.shape[0] * samplerate / sr))
+    return np.interp(np.arange(n) * (sr / samplerate), np.arange(wav.shape[0]), wav).astype(np.float32)
+
+
+def load_wav(source, samplerate: int = SAMPLE_RATE) -> np.ndarray:
+    """A WAV (path or file object) as mono float32 at `samplerate`: 16 kHz for the recognizer by default."""
+    return resample(*read_wav(source), samplerate)
@@ -0,0 +1,176 @@
+# core/batch_transcriber.py — Collects concurrent utterances into padded batches, optionally across model replicas
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+import numpy as np
+from core.config import (
+    RECOGNIZER_BACKEND, WHISPER_MODEL, RECOGNIZER_THREADS,
+    TRANSCRIBE_BATCH_SIZE, TRANSCRIBE_BATCH_WINDOW_MS, TRANSCRIBE_REPLICAS,
+)
+
+# Rough resident size of one CPU replica per model size (MB), used to size the process pool
+MODEL_MEMORY_MB = {"tiny": 400, "base": 600, "small": 1500, "medium": 3500, "large": 7000}
+
+
+def available_memory_mb() -> float | None:
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def replica_count(model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS) -> int:
+    """How many replicas fit: one per `threads` cores (2 if unset), capped by available RAM."""
+    threads_per_replica = threads or 2
+    by_cpu = max(1, (os.cpu_count() or 1) // threads_per_replica)
+    memory = available_memory_mb()
+    if memory is None:
+        return by_cpu
+    per_replica = MODEL_MEMORY_MB.get(model_size.split(".")[0].split("-")[0], 1500)
+    return max(1, min(by_cpu, int(memory // per_replica)))
+
+
+# ------------------- Replica processes -------------------
+_replica = None
+
+
+def _init_replica(backend: str, model_size: str, threads: int):
+    global _replica
+    from core.recognizer import create_backend
+    _replica = create_backend(backend, model_size, threads).load()
+
+
+def _replica_batch(audios: list, options: dict) -> list[dict]:
+    return _replica.transcribe_batch(audios, **options)
+
+
+# ------------------- Scheduler -------------------
+class BatchTranscriber:
+    """
+    Drop-in for a recognizer: transcribe() blocks like model.transcribe(), but requests from
+    concurrent callers are held for up to `window_ms` and decoded together (up to `max_batch`,
+    only requests with identical options share a batch).
+
+    With replicas == 0 batches run one at a time on the shared in-process `model`. Otherwise
+    they are sharded across a ProcessPoolExecutor of model replicas ("auto" sizes it to the
+    cores and memory available); while every replica is busy, new requests keep accumulating
+    so the next batch is larger.
+    """
+
+    def __init__(self, model=None, max_batch: int = TRANSCRIBE_BATCH_SIZE, window_ms: float = TRANSCRIBE_BATCH_WINDOW_MS,
+                 replicas=TRANSCRIBE_REPLICAS, backend: str = RECOGNIZER_BACKEND,
+                 model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.replicas = replica_count(model_size, threads) if replicas == "auto" else int(replicas)
+        self.batches = 0
+        self.batched_items = 0
+        self._pool = None
+        if self.replicas:
+            print(f"Starting {self.replicas} {backend} ({model_size}) transcription replicas")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.replicas, initializer=_init_replica, initargs=(backend, model_size, threads),
+            )
+        elif model is None:
+            raise ValueError("BatchTranscriber needs a model when no replicas are used")
+        self._pending = deque()
+        self._ready = threading.Condition()
+        self._slots = threading.Semaphore(max(1, self.replicas))
+        self._thread = threading.Thread(target=self._run, name="batch-transcriber", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio, **options) -> Future:
+        future = Future()
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        key = tuple(sorted((k, repr(v)) for k, v in options.items()))
+        with self._ready:
+            self._pending.append((key, audio, options, future))
+            self._ready.notify()
+        return future
+
+    def transcribe(self, audio, **options) -> dict:
+        return self.submit(audio, **options).result()
+
+    def _next_batch(self) -> list:
+        with self._ready:
+            while not self._pending:
+                self._ready.wait()
+            # Give concurrent callers a moment to join the first request
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch and (remaining := deadline - time.monotonic()) > 0:
+                self._ready.wait(remaining)
+            key = self._pending[0][0]
+            batch = [item for item in self._pending if item[0] == key][:self.max_batch]
+            taken = {id(item) for item in batch}
+            self._pending = deque(item for item in self._pending if id(item) not in taken)
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free replica first, so requests arriving meanwhile join the next batch
+            self._slots.acquire()
+            batch = self._next_batch()
+            batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                self._slots.release()
+                continue
+            self.batches += 1
+            self.batched_items += len(batch)
+            audios, options = [item[1] for item in batch], batch[0][2]
+            if self._pool:
+                done = self._pool.submit(_replica_batch, audios, options)
+                done.add_done_callback(lambda f, batch=batch: self._pool_done(batch, f))
+            else:
+                try:
+                    results = self._decode_local(audios, options)
+                except Exception as e:
+                    self._deliver(batch, e, None)
+                else:
+                    self._deliver(batch, None, results)
+
+    def _decode_local(self, audios: list, options: dict) -> list[dict]:
+        transcribe_batch = getattr(self.model, "transcribe_batch", None)
+        if transcribe_batch is None:
+            return [self.model.transcribe(audio, **options) for audio in audios]
+        return transcribe_batch(audios, **options)
+
+    def _pool_done(self, batch: list, done: Future):
+        # Batches still queued in the pool are cancelled at shutdown; exception() would raise for them
+        if done.cancelled():
+            self._deliver(batch, CancelledError("Transcriber shut down before the batch ran"), None)
+        elif done.exception() is not None:
+            self._deliver(batch, done.exception(), None)
+        else:
+            self._deliver(batch, None, done.result())
+
+    def _deliver(self, batch: list, error: Exception | None, results: list | None):
+        self._slots.release()
+        for i, (_, _, _, future) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "mean_batch": round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+            "replicas": self.replicas,
+            "pending": len(self._pending),
+        }
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
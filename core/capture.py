@@ -0,0 +1,410 @@
+# core/capture.py — Streams microphone PCM straight into memory (no temp files)
+import collections
+import subprocess
+import threading
+import time
+import numpy as np
+from core.config import (
+    SAMPLE_RATE, CAPTURE_BACKEND, CAPTURE_BLOCK_SIZE, MAX_RECORDING_SECONDS,
+    CAPTURE_WARM_START, CAPTURE_PREROLL_MS, CAPTURE_STALL_S, CAPTURE_INPUT_FORMAT, CAPTURE_DEVICE,
+)
+from core.utils import ffmpeg_exe, microphone
+
+STDERR_TAIL_LINES = 20  # FFmpeg stderr lines kept for the early-exit message
+
+
+# ------------------- Ring buffer -------------------
+class RingBuffer:
+    """Preallocated float32 ring buffer holding the most recent `capacity` samples."""
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._capacity = capacity
+        self._write_pos = 0
+        self._size = 0
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def written(self) -> int:
+        """Samples written since the last clear(), including those already overwritten."""
+        return self._written
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def clear(self):
+        with self._lock:
+            self._write_pos = 0
+            self._size = 0
+            self._written = 0
+
+    def write(self, samples: np.ndarray):
+        """Append samples, overwriting the oldest ones once the buffer is full."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = samples.shape[0]
+        if n == 0:
+            return
+        with self._lock:
+            self._written += n
+            if n >= self._capacity:
+                # Only the newest `capacity` samples survive
+                self._data[:] = samples[-self._capacity:]
+                self._write_pos = 0
+                self._size = self._capacity
+                return
+
+            end = self._write_pos + n
+            if end <= self._capacity:
+                self._data[self._write_pos:end] = samples
+            else:
+                first = self._capacity - self._write_pos
+                self._data[self._write_pos:] = samples[:first]
+                self._data[:n - first] = samples[first:]
+            self._write_pos = end % self._capacity
+            self._size = min(self._size + n, self._capacity)
+
+    def get(self, last: int | None = None) -> np.ndarray:
+        """Return a contiguous copy of the buffered samples (optionally only the `last` N), oldest first."""
+        with self._lock:
+            n = self._size if last is None else min(last, self._size)
+            start = (self._write_pos - n) % self._capacity
+            if start + n <= self._capacity:
+                return self._data[start:start + n].copy()
+            return np.concatenate((self._data[start:], self._data[:(start + n) % self._capacity]))
+
+
+# ------------------- Capture sources -------------------
+class SoundDeviceCapture:
+    """Capture 16 kHz mono float32 frames from the default input device via PortAudio."""
+
+    def __init__(self, buffer: RingBuffer, samplerate: int = SAMPLE_RATE, blocksize: int = CAPTURE_BLOCK_SIZE):
+        self.buffer = buffer
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.on_block = None  # optional hook called with every captured block (e.g. VAD)
+        self._stream = None
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            print(f"Capture status: {status}")
+        block = indata[:, 0]
+        self.buffer.write(block)
+        if self.on_block:
+            self.on_block(block)
+
+    def reset(self):
+        """Drop everything captured so far (e.g. the spoken prompt)."""
+        self.buffer.clear()
+
+    def start(self):
+        import sounddevice as sd
+        self._stream = sd.InputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def stop(self):
+        """Stop the stream; returns once the last block has been written to the buffer."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class FFmpegPipeCapture:
+    """
+    Capture through FFmpeg, reading raw f32le PCM from its stdout pipe instead of a file.
+    `input_format` is FFmpeg's input device ("dshow" on Windows, "alsa" or "pulse" on Linux).
+    stderr is drained on its own thread (a full pipe would block FFmpeg); if FFmpeg exits
+    before stop(), `error` holds its exit code and last stderr lines.
+    """
+
+    def __init__(self, buffer: RingBuffer, samplerate: int = SAMPLE_RATE, blocksize: int = CAPTURE_BLOCK_SIZE,
+                 input_format: str = CAPTURE_INPUT_FORMAT, device: str | None = CAPTURE_DEVICE):
+        self.buffer = buffer
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.input_format = input_format
+        self.device = device
+        self.on_block = None  # optional hook called with every captured block (e.g. VAD)
+        self.error = None
+        self._process = None
+        self._reader = None
+        self._stderr_reader = None
+        self._stopping = False
+        self._stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+
+    def _input_device(self) -> str:
+        if self.input_format != "dshow":
+            return self.device or "default"
+        # - If mic_name starts with @device use it directly (no quotes)
+        # - Otherwise quote it to handle spaces and parentheses
+        mic_name = self.device or microphone.get()
+        if str(mic_name).startswith('@device'):
+            return f'audio={mic_name}'
+        return f'audio="{mic_name}"'
+
+    def _read_loop(self, process):
+        bytes_per_block = self.blocksize * 4  # float32
+        stdout = process.stdout
+        while True:
+            chunk = stdout.read(bytes_per_block)
+            if not chunk:
+                break
+            # Drop a trailing partial sample, if any
+            usable = len(chunk) - (len(chunk) % 4)
+            block = np.frombuffer(chunk[:usable], dtype=np.float32)
+            self.buffer.write(block)
+            if self.on_block:
+                self.on_block(block)
+        if not self._stopping:
+            code = process.wait()
+            self._stderr_reader.join(timeout=1.0)  # let the last lines (usually the reason) arrive
+            self.error = f"FFmpeg exited unexpectedly (code {code}): " + " | ".join(self._stderr_tail)
+            print(self.error)
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            self._stderr_tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    def reset(self):
+        """Drop everything captured so far (e.g. the spoken prompt)."""
+        self.buffer.clear()
+
+    def start(self):
+        args = [
+            ffmpeg_exe, "-hide_banner", "-loglevel", "error",
+            "-f", self.input_format, "-i", self._input_device(),
+            "-ac", "1", "-ar", str(self.samplerate),
+            "-f", "f32le", "pipe:1",
+        ]
+        print("FFmpeg command:", ' '.join(args))
+        self.error = None
+        self._stopping = False
+        self._stderr_tail.clear()
+        self._process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._stderr_reader = threading.Thread(target=self._drain_stderr, args=(self._process,), daemon=True)
+        self._stderr_reader.start()
+        self._reader = threading.Thread(target=self._read_loop, args=(self._process,), daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        """Ask FFmpeg to quit ('q' on stdin), fall back to terminate(), then drain the pipe."""
+        if self._process is None:
+            return
+        self._stopping = True
+        try:
+            self._process.stdin.write(b'q')
+            self._process.stdin.flush()
+        except Exception:
+            pass
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            print("FFmpeg didn't exit after 'q' — terminating.")
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._reader:
+            self._reader.join(timeout=2.0)
+        self._process = None
+        self._reader = None
+
+
+class FileCapture:
+    """
+    Replay prerecorded 16 kHz mono float32 samples as if they came from a microphone (benchmarks,
+    headless runs). Blocks are paced at real time unless `realtime` is False; `finished` is set
+    once the whole clip has been written. With `paused`, nothing is written until resume().
+    """
+
+    def __init__(self, buffer: RingBuffer, samplerate: int = SAMPLE_RATE, blocksize: int = CAPTURE_BLOCK_SIZE,
+                 audio: np.ndarray | None = None, realtime: bool = True, paused: bool = False):
+        self.buffer = buffer
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.audio = np.zeros(0, dtype=np.float32) if audio is None else np.asarray(audio, dtype=np.float32)
+        self.realtime = realtime
+        self.on_block = None  # optional hook called with every captured block (e.g. VAD)
+        self.finished = threading.Event()
+        self._playing = threading.Event()
+        self._stopped = threading.Event()
+        self._reader = None
+        if not paused:
+            self._playing.set()
+
+    def resume(self):
+        self._playing.set()
+
+    def _read_loop(self):
+        interval = self.blocksize / self.samplerate
+        self._playing.wait()
+        for start in range(0, self.audio.shape[0], self.blocksize):
+            if self.realtime and self._stopped.wait(interval):
+                break
+            if self._stopped.is_set():
+                break
+            block = self.audio[start:start + self.blocksize]
+            self.buffer.write(block)
+            if self.on_block:
+                self.on_block(block)
+        self.finished.set()
+
+    def reset(self):
+        """Drop everything captured so far (e.g. the spoken prompt)."""
+        self.buffer.clear()
+
+    def start(self):
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._playing.set()
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=2.0)
+        self._reader = None
+
+
+CAPTURE_SOURCES = {
+    "sounddevice": SoundDeviceCapture,
+    "ffmpeg": FFmpegPipeCapture,
+    "file": FileCapture,
+}
+
+
+# ------------------- Warm start -------------------
+class WarmInput:
+    """
+    One input stream kept open for the whole session. It continuously fills a small pre-roll
+    ring buffer; while a CaptureSession is attached, blocks are also written to that session's
+    buffer. Starting a command therefore costs no device open or process spawn, and the moment
+    before capture was armed is not lost. The underlying source writes into this object (it
+    implements write()), so the pre-roll snapshot and the hand-over happen under one lock.
+    """
+
+    def __init__(self, backend: str = CAPTURE_BACKEND, preroll_ms: int = CAPTURE_PREROLL_MS,
+                 samplerate: int = SAMPLE_RATE, stall_s: float = CAPTURE_STALL_S):
+        try:
+            self._source_cls = CAPTURE_SOURCES[backend]
+        except KeyError:
+            raise ValueError(f"Unknown capture backend: {backend}")
+        self.samplerate = samplerate
+        self.stall_s = stall_s
+        self.preroll = RingBuffer(max(1, int(samplerate * preroll_ms / 1000)))
+        self._source = None
+        self._session = None
+        self._last_block = 0.0
+        self._lock = threading.Lock()     # pre-roll / session hand-over
+        self._open_lock = threading.Lock()
+
+    def open(self) -> "WarmInput":
+        """Start the stream (again, if it stalled, e.g. after the device went away)."""
+        with self._open_lock:
+            if self._source is not None and time.monotonic() - self._last_block < self.stall_s:
+                return self
+            if self._source is not None:
+                print("Warm input stalled — reopening the capture device.")
+                try:
+                    self._source.stop()
+                except Exception as e:
+                    print(f"Error while stopping stalled capture: {e}")
+            self._source = self._source_cls(self, samplerate=self.samplerate)
+            self._source.on_block = self._on_block
+            self._last_block = time.monotonic()
+            self._source.start()
+        return self
+
+    def write(self, samples: np.ndarray):
+        with self._lock:
+            self._last_block = time.monotonic()
+            self.preroll.write(samples)
+            if self._session is not None:
+                self._session.buffer.write(samples)
+
+    def _on_block(self, block: np.ndarray):
+        session = self._session
+        if session is not None and session.on_block:
+            session.on_block(block)
+
+    def attach(self, session: "CaptureSession", with_preroll: bool = True):
+        self.open()
+        with self._lock:
+            session.buffer.clear()
+            if with_preroll:
+                session.buffer.write(self.preroll.get())
+            self._session = session
+
+    def detach(self, session: "CaptureSession"):
+        with self._lock:
+            if self._session is session:
+                self._session = None
+
+    def close(self):
+        with self._open_lock:
+            if self._source is not None:
+                self._source.stop()
+                self._source = None
+
+
+class CaptureSession:
+    """A capture source backed by the shared WarmInput; start() and stop() only re-route blocks."""
+
+    def __init__(self, warm_input: WarmInput, buffer: RingBuffer):
+        self.warm_input = warm_input
+        self.buffer = buffer
+        self.samplerate = warm_input.samplerate
+        self.on_block = None  # optional hook called with every captured block (e.g. VAD)
+
+    def reset(self):
+        # No pre-roll here: right after a spoken prompt it would only hold the prompt's tail
+        self.warm_input.attach(self, with_preroll=False)
+
+    def start(self):
+        """Begin with the pre-roll, so speech that started just before the hotkey is kept."""
+        self.warm_input.attach(self)
+
+    def stop(self):
+        """Returns once no more blocks can be written to this session's buffer."""
+        self.warm_input.detach(self)
+
+
+warm_input = None
+warm_input_lock = threading.Lock()
+
+
+def open_warm_input(backend: str = CAPTURE_BACKEND, samplerate: int = SAMPLE_RATE) -> WarmInput:
+    """Open (once) the session-wide input stream; safe to call from the startup orchestrator."""
+    global warm_input
+    with warm_input_lock:
+        if warm_input is None:
+            warm_input = WarmInput(backend, samplerate=samplerate)
+    return warm_input.open()
+
+
+def create_capture(backend: str = CAPTURE_BACKEND, max_seconds: int = MAX_RECORDING_SECONDS,
+                   samplerate: int = SAMPLE_RATE, warm: bool = CAPTURE_WARM_START, **options):
+    """
+    Build a capture source writing into a freshly preallocated ring buffer. With `warm`, it is a
+    session on the always-open input stream instead of a newly opened device. `options` go to
+    the source class (e.g. audio= for "file").
+    """
+    buffer = RingBuffer(max_seconds * samplerate)
+    if warm and backend != "file":
+        return CaptureSession(open_warm_input(backend, samplerate), buffer)
+    try:
+        source_cls = CAPTURE_SOURCES[backend]
+    except KeyError:
+        raise ValueError(f"Unknown capture backend: {backend}")
+    return source_cls(buffer, samplerate=samplerate, **options)
@@ -1 +1,232 @@
-# Loads / saves settings from GUI.
\ No newline at end of file
+# Loads / saves settings from GUI.
+# Every setting can be overridden per host, without code edits: see "Overrides" at the bottom.
+import json
+import os
+import types
+
+IS_WINDOWS = os.name == "nt"
+
+# ------------------- Host tools -------------------
+
+FFMPEG_PATH = r"C:\ffmpeg\bin\ffmpeg.exe" if IS_WINDOWS else "ffmpeg"
+ESPEAK_PATH: str | None = r"F:\eSpeak\command-line" if IS_WINDOWS else None  # directory added to PATH for the VITS phonemizer
+
+# ------------------- Audio capture -------------------
+
+SAMPLE_RATE = 16000             # Whisper expects 16 kHz mono PCM
+CAPTURE_BACKEND = "sounddevice" # "sounddevice", "ffmpeg" (stdout pipe) or "file" (replays CAPTURE_FILE)
+CAPTURE_INPUT_FORMAT = "dshow" if IS_WINDOWS else "pulse"  # ffmpeg backend: "dshow", "alsa" or "pulse"
+CAPTURE_DEVICE: str | None = None   # ffmpeg input device; None = default microphone
+CAPTURE_FILE: str | None = None     # "file" backend: WAV replayed as the microphone on every command
+CAPTURE_BLOCK_SIZE = 1600       # samples per block (100 ms at 16 kHz)
+MAX_RECORDING_SECONDS = 30      # size of the preallocated capture buffer
+CAPTURE_WARM_START = True       # keep one input stream open for the whole session instead of per command
+CAPTURE_PREROLL_MS = 300        # audio from just before capture is armed that is kept (warm start only)
+CAPTURE_STALL_S = 1.0           # reopen the warm stream if no block arrived for this long
+MIC_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "microphones.json")
+
+# ------------------- Voice activity detection -------------------
+
+VAD_ENABLED = True              # auto-stop the recording once the speaker goes quiet
+VAD_FRAME_MS = 30               # analysis frame length
+VAD_TRAILING_SILENCE_MS = 800   # silence after speech that ends the utterance
+VAD_NO_SPEECH_TIMEOUT_S = 8     # give up if nothing is said at all
+VAD_ENERGY_MARGIN_DB = 10       # how far above the noise floor counts as speech
+VAD_MAX_ZCR = 0.35              # zero-crossing rate above this is treated as hiss/noise
+VAD_PAD_MS = 150                # audio kept around speech when trimming
+
+# ------------------- Streaming recognition -------------------
+
+STREAMING_RECOGNITION = True    # decode partial hypotheses while the user is still speaking
+STREAMING_INTERVAL_MS = 500     # how often the buffered audio is re-decoded
+STREAMING_WINDOW_S = 30         # sliding window handed to Whisper (its context limit is 30 s)
+SPECULATIVE_SEARCH = True       # start searching from stable partials before the user stops talking
+SPECULATION_PREFETCH_MIN_SCORE = 90  # speculative match score needed before recommendation metadata is prefetched
+
+# ------------------- Recognizer -------------------
+
+RECOGNIZER_BACKEND = "whisper"  # "whisper", "whisper-int8" or "ctranslate2" (needs faster-whisper)
+WHISPER_MODEL = "small.en"      # tiny.en / base.en / small.en / medium.en
+RECOGNIZER_THREADS = 0          # CPU threads for inference (0 = library default)
+RECOGNITION_PROFILE = "music"   # "music": tuned for short song requests, "default": Whisper's own settings
+RECOGNITION_BEAM_SIZE: int | None = None  # music profile: None = greedy, 2-3 = limited beam search
+RECOGNITION_MAX_TOKENS = 48     # music profile: a song request never needs more tokens than this
+RECOGNITION_SHORT_UTTERANCE_S = 10  # up to this long, decode one padded window directly (no seek loop)
+RECOGNITION_PROMPT_CHARS = 400  # budget for the library-derived initial prompt (Whisper keeps ~224 tokens)
+RECOGNIZER_WEIGHT_DTYPE = "float32"  # "float16": half-size Whisper weights, upcast per layer at inference (slower on CPU)
+
+# ------------------- Resident memory -------------------
+
+RESIDENT_BUDGET_MB = 0              # offload least recently used idle models while RSS is above this (0 = no budget)
+RESIDENT_IDLE_S = 0                 # offload a model nobody used for this long (0 = keep resident); the next
+                                    # hotkey press reloads it in the background, but a VITS reload still takes seconds
+RESIDENT_CHECK_INTERVAL_S = 30
+RESIDENT_MMAP_WEIGHTS = True        # map recognizer weights from a file: reloads are cheap, processes share one copy
+RESIDENT_WEIGHTS_DIR = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "weights")
+
+# ------------------- Spoken feedback -------------------
+
+TTS_BACKEND = "vits"            # "vits" (Coqui TTS) or "none" (silent, e.g. on servers)
+TTS_MODEL = "tts_models/en/vctk/vits"
+TTS_SPEAKER = "p347"
+TTS_LENGTH_SCALE = 1.5          # slightly slower speech
+TTS_NOISE_SCALE = 0.7           # reduces robotic artifacts
+TTS_NOISE_SCALE_W = 0.8         # affects prosody
+
+# ------------------- Audio cues -------------------
+
+CUE_STYLE = "both"              # "earcon" (tones only), "phrase" (prerendered clip) or "both" (tone, then clip)
+CUE_SAMPLE_RATE = 22050         # rate of the always-open cue output stream (VITS renders at 22.05 kHz)
+CUE_BLOCK_SIZE = 256            # ~12 ms per callback: a cue starts within one block of being requested
+CUE_SOUNDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "sounds")  # <cue>.wav replaces the rendered phrase
+CUE_WAIT_MARGIN_S = 2.0         # slack on top of a cue's length before startup stops waiting for it
+
+# ------------------- TTS cache -------------------
+
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "tts")
+TTS_CACHE_MAX_ITEMS = 64        # phrases kept decoded in memory (LRU)
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024  # disk tier cap; least recently used phrases are deleted beyond it
+
+# ------------------- Search cache -------------------
+
+SEARCH_CACHE_BACKEND = "sqlite" # "sqlite", "redis" (needs the redis package + server) or "none"
+SEARCH_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "search.sqlite3")
+SEARCH_CACHE_REDIS_URL = "redis://localhost:6379/0"
+SEARCH_CACHE_MAX_ENTRIES = 5000 # least recently used entries are evicted beyond this
+QUERY_CACHE_TTL_S = 7 * 24 * 3600   # transcript -> chosen track
+PAGE_CACHE_TTL_S = 24 * 3600        # raw search page -> items
+
+# ------------------- Matching and playback -------------------
+
+MATCHER = "spotify"                 # "spotify": cache, history, library, then search; "library": offline only
+PLAYER = "spotify"                  # "spotify" or "none" (dry run: the match is only printed)
+MATCH_CONFIDENCE_THRESHOLD = 94     # score at which a strategy wins outright (and answers get cached)
+MATCH_ARTIST_THRESHOLD = 40         # candidates whose artist scores below this are dropped
+SEARCH_MAX_TRACKS = 100             # search results fetched per strategy
+
+# ------------------- Local library index -------------------
+
+LIBRARY_INDEX_ENABLED = True    # match against the user's own tracks before calling search
+LIBRARY_SYNC_ON_STARTUP = True  # refresh the index from saved tracks / playlists / history
+LIBRARY_SYNC_INTERVAL_H = 6     # skip the startup refresh if the last one is more recent than this
+TRACK_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "library.json")
+
+# ------------------- Command history -------------------
+
+HISTORY_ENABLED = True              # log played commands and rank by how often / recently tracks were played
+HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "history.sqlite3")
+HISTORY_PRIOR_WEIGHT = 6            # score points the usage prior can add (or, for skipped tracks, take away)
+HISTORY_HALF_LIFE_DAYS = 30         # plays lose half their weight after this long
+HISTORY_SKIP_WINDOW_S = 30          # a new command this soon after playback started counts as a skip
+HISTORY_SKIP_PENALTY = 1.5          # weight a skip takes away (a play adds 1)
+HISTORY_SHORTCUT_MIN_WEIGHT = 2.5   # decayed plays of one answer before the request skips search entirely
+
+# ------------------- Recommendations -------------------
+
+ARTIST_CACHE_TTL_S = 7 * 24 * 3600  # related-artist lists change rarely
+TOP_TRACKS_CACHE_TTL_S = 24 * 3600
+QUEUE_REQUEST_INTERVAL_S = 0.15     # pacing between add_to_queue calls, once one was rate limited
+RATE_LIMIT_RETRIES = 3              # retries on HTTP 429 before giving up on a request
+
+# ------------------- Spotify transport -------------------
+
+SPOTIFY_POOL_SIZE = 16              # keep-alive connections shared by both clients
+SPOTIFY_TIMEOUT_S = 10              # per-request timeout
+MAX_RETRY_AFTER_S = 10              # cap on how long a 429 Retry-After may stall a request
+DEVICE_CACHE_TTL_S = 30             # how long the active device id is trusted
+TOKEN_REFRESH_INTERVAL_S = 20       # background check; must stay under spotipy's 60 s expiry margin
+
+# ------------------- Tracing -------------------
+
+TRACE_ENABLED = True
+TRACE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "speech-recognition-spotify", "traces.jsonl")
+TRACE_WINDOW = 200                  # commands kept for rolling p50/p95/p99
+TRACE_SUMMARY_EVERY = 10            # print the percentile table every N commands (0 = never)
+TRACE_PROFILE_STAGES = ()           # e.g. ("transcription",) -> cProfile dump per stage
+TRACE_TRACEMALLOC_STAGES = ()       # e.g. ("scoring",) -> allocation peak recorded on the span
+
+# ------------------- Daemon mode -------------------
+
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+DAEMON_SOCKET: str | None = None    # path of a Unix socket to serve on instead of TCP (POSIX only)
+DAEMON_WORKERS = 2                  # commands executed concurrently (hotkey + API share them)
+DAEMON_QUEUE_SIZE = 16              # pending commands before new requests are rejected with 503
+DAEMON_REQUEST_TIMEOUT_S = 60
+
+# ------------------- Batched transcription -------------------
+
+TRANSCRIBE_BATCH_SIZE = 8           # utterances decoded together in one padded batch
+TRANSCRIBE_BATCH_WINDOW_MS = 30     # how long the first utterance waits for others to join
+TRANSCRIBE_REPLICAS: int | str = 0  # 0 = decode in-process on the shared model, N = model replica processes, "auto" = sized to cores/RAM
+
+# ------------------- Overrides -------------------
+# Applied on import, before any other module reads a setting: first a JSON object from
+# SRS_CONFIG_FILE (default below), then SRS_<NAME> environment variables, e.g.
+#   SRS_CAPTURE_BACKEND=ffmpeg SRS_CAPTURE_INPUT_FORMAT=alsa SRS_TTS_BACKEND=none python main.py
+# Values are parsed to the setting's annotated type, or the type of its default.
+
+CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".config", "speech-recognition-spotify", "config.json")
+ENV_PREFIX = "SRS_"
+
+
+def setting_types(namespace: dict) -> dict:
+    """Setting name -> accepted types (annotation if present, else the default's type)."""
+    annotations = namespace.get("__annotations__", {})
+    settings = {}
+    for name, default in namespace.items():
+        if not name.isupper() or name in ("CONFIG_FILE", "ENV_PREFIX", "IS_WINDOWS"):
+            continue
+        hint = annotations.get(name, type(default))
+        settings[name] = hint.__args__ if isinstance(hint, types.UnionType) else (hint,)
+    return settings
+
+
+def parse_setting(name: str, value, accepted: tuple):
+    """Convert a file value or an environment string to one of the accepted types."""
+    for kind in sorted(accepted, key=lambda kind: kind is not type(None)):  # "none" means None, not the string
+        if kind is type(None):
+            if value is None or (isinstance(value, str) and value.strip().lower() in ("", "none", "null")):
+                return None
+        elif kind is bool:
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.strip().lower() in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+                return value.strip().lower() in ("1", "true", "yes", "on")
+        elif kind in (int, float):
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and (kind is float or value == int(value)):
+                return kind(value)
+            if isinstance(value, str):
+                try:
+                    return kind(value)
+                except ValueError:
+                    pass
+        elif kind is tuple:
+            if isinstance(value, (list, tuple)):
+                return tuple(value)
+            if isinstance(value, str):
+                return tuple(item.strip() for item in value.split(",") if item.strip())
+        elif isinstance(value, kind):
+            return value
+    names = " or ".join("None" if kind is type(None) else kind.__name__ for kind in accepted)
+    raise ValueError(f"Setting {name}: expected {names}, got {value!r}")
+
+
+def load_overrides(namespace: dict, environ=os.environ, path: str | None = None) -> dict:
+    """Typed overrides for the settings in `namespace` (the file first, then the environment)."""
+    path = path or environ.get(ENV_PREFIX + "CONFIG_FILE", CONFIG_FILE)
+    settings = setting_types(namespace)
+    overrides = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for name, value in json.load(f).items():
+                if name not in settings:
+                    raise ValueError(f"Unknown setting {name} in {path}")
+                overrides[name] = parse_setting(name, value, settings[name])
+    for name, accepted in settings.items():
+        if ENV_PREFIX + name in environ:
+            overrides[name] = parse_setting(name, environ[ENV_PREFIX + name], accepted)
+    return overrides
+
+
+globals().update(load_overrides(globals()))
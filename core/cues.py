@@ -0,0 +1,250 @@
+# core/cues.py — Status feedback from an in-memory bank of earcons and prerendered phrases
+"""
+The fixed states of a command (listening, searching, not found, no device, ...) don't need
+speech synthesis on the hot path. Each cue is decoded once into a float32 buffer: a short
+generated earcon, then (CUE_STYLE "both") the phrase clip, taken from assets/sounds/<cue>.wav
+or rendered once through TTS into the phrase cache. A cue whose clip isn't ready yet plays its
+earcon alone, so a cue never waits on TTS.
+
+Buffers are played through one sd.OutputStream opened at startup and kept running (silence
+when idle), so a cue starts within one CUE_BLOCK_SIZE block. TTS is left for dynamic text such
+as track names.
+"""
+import collections
+import os
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+from core.audio_io import read_wav, resample
+from core.config import CUE_STYLE, CUE_SAMPLE_RATE, CUE_BLOCK_SIZE, CUE_SOUNDS_DIR
+
+# name -> (earcon tones as (frequency Hz, seconds), phrase)
+CUES = {
+    "greeting": ((), "Hello! I'm Q, your virtual assistant!"),
+    "listening": (((660, 0.06), (880, 0.09)), "What song would you like to hear?"),
+    "searching": (((880, 0.05),), "Let me look it up for you"),
+    "not_found": (((660, 0.08), (440, 0.14)), "Sorry! Haven't quite caught that."),
+    "no_device": (((330, 0.09), (330, 0.09)), "No active Spotify device found."),
+}
+
+
+# ------------------- Buffers -------------------
+def earcon(tones, samplerate: int = CUE_SAMPLE_RATE, gap_s: float = 0.03, level: float = 0.25) -> np.ndarray:
+    """Sine tones with short raised-cosine fades (no clicks), separated by `gap_s` of silence."""
+    parts = []
+    fade = int(0.005 * samplerate)
+    ramp = 0.5 - 0.5 * np.cos(np.linspace(0, np.pi, fade, dtype=np.float32))
+    for frequency, seconds in tones:
+        t = np.arange(int(seconds * samplerate), dtype=np.float32) / samplerate
+        tone = level * np.sin(2 * np.pi * frequency * t, dtype=np.float32)
+        tone[:fade] *= ramp
+        tone[-fade:] *= ramp[::-1]
+        parts += [tone, np.zeros(int(gap_s * samplerate), dtype=np.float32)]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+
+class CueBank:
+    """Name -> ready-to-play float32 buffer at `samplerate`, built once and kept in memory."""
+
+    def __init__(self, cues: dict = CUES, style: str = CUE_STYLE, samplerate: int = CUE_SAMPLE_RATE,
+                 sounds_dir: str | None = CUE_SOUNDS_DIR, rendered=None):
+        if style not in ("earcon", "phrase", "both"):
+            raise ValueError(f"Unknown cue style: {style}")
+        self.cues = cues
+        self.style = style
+        self.samplerate = samplerate
+        self.sounds_dir = sounds_dir
+        self.rendered = rendered      # phrase -> (wav, sr) or None, looked up without running TTS
+        self._earcons = {}
+        self._clips = {}              # name -> resampled phrase clip
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, phrase: str):
+        if self.rendered is None:
+            from core.audio_feedback import cached_phrase
+            self.rendered = cached_phrase
+        return self.rendered(phrase)
+
+    def _clip(self, name: str):
+        path = os.path.join(self.sounds_dir, f"{name}.wav") if self.sounds_dir else None
+        try:
+            if path and os.path.exists(path):
+                return resample(*read_wav(path), self.samplerate)
+            rendered = self._lookup(self.cues[name][1])
+        except Exception as e:
+            print(f"Cue '{name}' clip error: {e}")
+            return None
+        return resample(*rendered, self.samplerate) if rendered is not None else None
+
+    def _build(self, name: str) -> np.ndarray:
+        tone = self._earcons.get(name)
+        if tone is None:
+            tone = self._earcons[name] = earcon(self.cues[name][0], self.samplerate)
+        clip = self._clips.get(name)
+        if clip is None and self.style != "earcon":
+            clip = self._clip(name)
+            if clip is not None:
+                self._clips[name] = clip
+        if clip is None:
+            return tone
+        if self.style == "phrase" or tone.size == 0:
+            return clip
+        return np.concatenate([tone, clip])
+
+    def get(self, name: str) -> np.ndarray:
+        if name not in self.cues:
+            raise KeyError(f"Unknown cue: {name}")
+        with self._lock:
+            buffer = self._buffers.get(name)
+            if buffer is None:
+                buffer = self._build(name)
+                # Keep the earcon-only fallback out of the bank so the clip is picked up once rendered
+                if self.style == "earcon" or name in self._clips:
+                    self._buffers[name] = buffer
+            return buffer
+
+    def load(self) -> "CueBank":
+        for name in self.cues:
+            self.get(name)
+        return self
+
+    def missing(self) -> list[str]:
+        """Cues still playing without their phrase clip."""
+        if self.style == "earcon":
+            return []
+        with self._lock:
+            return [name for name in self.cues if name not in self._clips]
+
+    def render_missing(self, tts):
+        """Render the phrases that have no clip yet through TTS (into the phrase cache) and rebuild them."""
+        from core.audio_feedback import synthesize
+        for name in self.missing():
+            try:
+                synthesize(tts, text=self.cues[name][1])
+            except Exception as e:
+                print(f"Cue '{name}' render error: {e}")
+        self.load()
+        print(f"Cues ready: {len(self.cues) - len(self.missing())}/{len(self.cues)} with phrases")
+
+
+# ------------------- Playback -------------------
+class CuePlayer:
+    """
+    One output stream, opened once and left running. The audio callback plays queued buffers
+    back to back and writes silence in between; play() returns a Future that resolves to True
+    once the buffer has played in full, or False if interrupt() cut it off.
+    """
+
+    def __init__(self, samplerate: int = CUE_SAMPLE_RATE, blocksize: int = CUE_BLOCK_SIZE, open_stream=None):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.open_stream = open_stream or self._output_stream
+        self._pending = collections.deque()  # (buffer, future)
+        self._offset = 0
+        self._stream = None
+        self._lock = threading.Lock()
+        # Futures are resolved off the audio thread: their callbacks may arm capture, start threads, ...
+        self._finished = queue.SimpleQueue()
+        self._notifier = None
+
+    def _output_stream(self, callback):
+        import sounddevice as sd
+        return sd.OutputStream(
+            samplerate=self.samplerate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.blocksize,
+            latency="low",
+            callback=callback,
+        )
+
+    def open(self) -> "CuePlayer":
+        with self._lock:
+            if self._stream is None:
+                self._stream = self.open_stream(self._callback)
+                self._stream.start()
+            if self._notifier is None:
+                self._notifier = threading.Thread(target=self._notify_loop, name="cue-events", daemon=True)
+                self._notifier.start()
+        return self
+
+    def _notify_loop(self):
+        while True:
+            future, completed = self._finished.get()
+            future.set_result(completed)
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        filled = 0
+        with self._lock:
+            while filled < frames and self._pending:
+                buffer, future = self._pending[0]
+                take = min(frames - filled, buffer.shape[0] - self._offset)
+                out[filled:filled + take] = buffer[self._offset:self._offset + take]
+                filled += take
+                self._offset += take
+                if self._offset >= buffer.shape[0]:
+                    self._pending.popleft()
+                    self._offset = 0
+                    self._finished.put((future, True))
+        out[filled:] = 0
+
+    def play(self, buffer: np.ndarray, interrupt: bool = False) -> Future:
+        """
+        Queue `buffer`. Cues are optional: if the output stream can't be opened (no device, busy)
+        the error is logged and the returned Future is already resolved to False.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        if interrupt:
+            self.interrupt()
+        if buffer.size == 0:
+            future.set_result(True)
+            return future
+        try:
+            self.open()
+        except Exception as e:
+            print(f"Cue output unavailable: {e}")
+            future.set_result(False)
+            return future
+        with self._lock:
+            self._pending.append((buffer, future))
+        return future
+
+    def interrupt(self):
+        """Cut the cue that is playing and drop the queued ones."""
+        with self._lock:
+            dropped = [future for _, future in self._pending]
+            self._pending.clear()
+            self._offset = 0
+        for future in dropped:
+            self._finished.put((future, False))
+
+    def close(self):
+        with self._lock:
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.close()
+
+
+bank = CueBank()
+player = CuePlayer()
+
+
+def prepare():
+    """Decode the bank and open the output stream, so the first cue plays without either delay."""
+    bank.load()
+    try:
+        player.open()
+    except Exception as e:
+        print(f"Cue output unavailable: {e}")
+
+
+def play_cue(name: str, interrupt: bool = False) -> Future:
+    return player.play(bank.get(name), interrupt=interrupt)
+
+
+def cue_seconds(name: str) -> float:
+    return bank.get(name).shape[0] / bank.samplerate
@@ -0,0 +1,231 @@
+# core/daemon.py — Long-lived service: one set of warm models behind a bounded command queue and a local API
+"""
+Endpoints (JSON responses; audio bodies are WAV, or raw 16 kHz mono float32 little-endian):
+
+    POST /transcribe   audio             -> {"text"}
+    POST /match        audio | {"text"}  -> {"text", "match"}
+    POST /play         audio | {"text"} | {"uri", "artist_uri"} -> {"text", "match", "played"}
+    GET  /health                         -> queue depth, component readiness, per-model memory
+
+    curl -s --data-binary @clip.wav -H "Content-Type: audio/wav" http://127.0.0.1:8765/play
+    curl -s -d '{"text": "gods plan by drake"}' http://127.0.0.1:8765/match
+"""
+import io
+import json
+import os
+import queue
+import socketserver
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from core.audio_io import load_wav
+from core.config import (
+    DAEMON_HOST, DAEMON_PORT, DAEMON_SOCKET, DAEMON_WORKERS, DAEMON_QUEUE_SIZE,
+    DAEMON_REQUEST_TIMEOUT_S,
+)
+from core.batch_transcriber import BatchTranscriber
+from core.pipeline import Pipeline, build_pipeline
+from core.recognizer import handle_transcription
+import core.resident as resident
+
+
+class QueueFull(Exception):
+    """Raised by CommandQueue.submit() when the backlog is at capacity."""
+
+
+# ------------------- Worker queue -------------------
+class CommandQueue:
+    """
+    Bounded FIFO of commands run by a fixed set of worker threads. Hotkey presses and API
+    requests go through the same queue, so they share the loaded models instead of each caller
+    running (or loading) its own. submit() never blocks: a full backlog raises QueueFull.
+    """
+
+    def __init__(self, workers: int = DAEMON_WORKERS, max_pending: int = DAEMON_QUEUE_SIZE):
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self) -> "CommandQueue":
+        with self._lock:
+            while len(self._threads) < self.workers:
+                worker = threading.Thread(target=self._run, name=f"daemon-worker-{len(self._threads)}", daemon=True)
+                worker.start()
+                self._threads.append(worker)
+        return self
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            self._queue.put_nowait((future, fn, args, kwargs))
+        except queue.Full:
+            raise QueueFull(f"{self._queue.maxsize} commands already pending")
+        return future
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+
+# ------------------- Commands -------------------
+def decode_audio(body: bytes, content_type: str = "") -> np.ndarray:
+    """WAV (16-bit PCM, any rate / channel count) or raw f32le at SAMPLE_RATE -> 16 kHz mono float32."""
+    if content_type.startswith("audio/") or body[:4] == b"RIFF":
+        return load_wav(io.BytesIO(body))
+    return np.frombuffer(body[:len(body) - len(body) % 4], dtype="<f4").copy()
+
+
+def match_summary(chosen) -> dict | None:
+    track, name, artist, uri, score = chosen
+    if not uri:
+        return None
+    return {
+        "name": name,
+        "artist": artist,
+        "uri": uri,
+        "artist_uri": track["artists"][0].get("uri") if track else None,
+        "score": score,
+    }
+
+
+class Daemon:
+    """Command implementations shared by every API request; the recognizer is loaded once."""
+
+    def __init__(self, whisper_model, commands: CommandQueue, recognizer=None, pipeline: Pipeline | None = None):
+        self.whisper_model = whisper_model
+        self.commands = commands
+        self.pipeline = pipeline or build_pipeline()
+        # Concurrent requests are decoded together in batches on the shared model (or its replicas)
+        self.recognizer = recognizer or BatchTranscriber(whisper_model)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return handle_transcription(self.recognizer, audio)
+
+    def match(self, text: str) -> dict | None:
+        return match_summary(self.pipeline.match(text))
+
+    def play(self, text: str | None = None, uri: str | None = None, artist_uri: str | None = None) -> dict:
+        match = None
+        if uri is None:
+            match = self.match(text)
+            if match is None:
+                return {"match": None, "played": False}
+            uri, artist_uri = match["uri"], match["artist_uri"]
+        return {"match": match, "played": self.pipeline.play(uri, artist_uri)}
+
+    def handle(self, action: str, audio: np.ndarray | None, payload: dict) -> dict:
+        """Run one API action (on a queue worker)."""
+        text = payload.get("text")
+        if audio is not None:
+            text = self.transcribe(audio)
+            if action == "transcribe":
+                return {"text": text}
+        if action == "match":
+            return {"text": text, "match": self.match(text)}
+        if action == "play":
+            return {"text": text, **self.play(text, payload.get("uri"), payload.get("artist_uri"))}
+        raise ValueError(f"'{action}' needs an audio body")
+
+    def health(self) -> dict:
+        return {
+            "pending": self.commands.pending(),
+            "workers": self.commands.workers,
+            "recognizer_ready": getattr(self.whisper_model, "ready", lambda: True)(),
+            "batching": self.recognizer.stats(),
+            "memory": resident.manager.report(),
+        }
+
+
+# ------------------- Local API -------------------
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ACTIONS = ("transcribe", "match", "play")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            return self._reply(200, self.server.service.health())
+        self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        daemon = self.server.service
+        action = self.path.strip("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if action not in self.ACTIONS:
+            return self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+
+        content_type = self.headers.get("Content-Type", "")
+        try:
+            if content_type.startswith("application/json") or body[:1] == b"{":
+                audio, payload = None, json.loads(body or b"{}")
+            else:
+                audio, payload = decode_audio(body, content_type), {}
+        except Exception as e:
+            return self._reply(400, {"error": f"Bad request body: {e}"})
+        if audio is None and not payload.get("text") and not (action == "play" and payload.get("uri")):
+            return self._reply(400, {"error": "Send audio, or JSON with 'text' (or 'uri' for /play)"})
+
+        try:
+            future = daemon.commands.submit(daemon.handle, action, audio, payload)
+        except QueueFull as e:
+            return self._reply(503, {"error": f"Busy: {e}"})
+        try:
+            self._reply(200, future.result(timeout=DAEMON_REQUEST_TIMEOUT_S))
+        except TimeoutError:
+            self._reply(504, {"error": "Timed out waiting for the command"})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+
+class DaemonHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class DaemonUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """HTTP over a Unix socket: `curl --unix-socket PATH http://localhost/health`."""
+        daemon_threads = True
+
+        def get_request(self):
+            request, _ = super().get_request()
+            return request, ("local", 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+def create_server(daemon: Daemon, host: str = DAEMON_HOST, port: int = DAEMON_PORT, socket_path: str | None = DAEMON_SOCKET):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = DaemonUnixServer(socket_path, DaemonRequestHandler)
+        print(f"Daemon API listening on unix:{socket_path}")
+    else:
+        server = DaemonHTTPServer((host, port), DaemonRequestHandler)
+        print(f"Daemon API listening on http://{host}:{server.server_address[1]}")
+    server.service = daemon
+    return server
+
+
+def serve_in_background(daemon: Daemon, **kwargs):
+    server = create_server(daemon, **kwargs)
+    threading.Thread(target=server.serve_forever, name="daemon-api", daemon=True).start()
+    return server
@@ -0,0 +1,183 @@
+# core/history.py — Append-only log of played commands and the usage priors derived from it
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from core.config import (
+    HISTORY_ENABLED, HISTORY_PATH, HISTORY_HALF_LIFE_DAYS, HISTORY_SKIP_WINDOW_S, HISTORY_SKIP_PENALTY,
+    HISTORY_SHORTCUT_MIN_WEIGHT,
+)
+from core.query_parser import strip_command
+from core.search_cache import normalize_query
+from core.track_index import compact_track
+
+
+def history_key(text: str) -> str:
+    return normalize_query(strip_command(text))
+
+
+class NullCommandHistory:
+    """History disabled: nothing is recorded and every track has a neutral prior."""
+
+    def record(self, transcript: str, chosen, latencies: dict | None = None, trace_id: str | None = None):
+        return None
+
+    def priors(self, uris: list[str]) -> np.ndarray:
+        return np.zeros(len(uris))
+
+    def favourite(self, query: str):
+        return None
+
+
+class CommandHistory(NullCommandHistory):
+    """
+    Every played command is appended to `commands` (transcript, chosen URI, score, stage
+    latencies, trace id). A new command within `skip_window_s` of the previous one marks that
+    one as skipped; rows are never changed otherwise.
+
+    Usage priors are kept up to date next to the log, so ranking never scans it: a recency-
+    decayed weight per track URI (`track_priors`) and per (query, URI) (`query_priors`). A play
+    adds 1, a skip subtracts `skip_penalty`, and weights halve every `half_life_days`.
+    `on_skip(transcript, uri)` is called once a command is marked skipped, so answers pinned
+    elsewhere (the query cache) can be dropped.
+    """
+
+    def __init__(self, path: str = HISTORY_PATH, half_life_days: float = HISTORY_HALF_LIFE_DAYS,
+                 skip_window_s: float = HISTORY_SKIP_WINDOW_S, skip_penalty: float = HISTORY_SKIP_PENALTY,
+                 shortcut_min_weight: float = HISTORY_SHORTCUT_MIN_WEIGHT, on_skip=None):
+        self.path = path
+        self.half_life = half_life_days * 24 * 3600
+        self.skip_window = skip_window_s
+        self.skip_penalty = skip_penalty
+        self.shortcut_min_weight = shortcut_min_weight
+        self.on_skip = on_skip
+        self._conn = None
+        self._track_priors = {}  # uri -> (weight, updated), mirrors track_priors
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Opened on first use so importing the module has no filesystem side effects
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, transcript TEXT NOT NULL,"
+                " query TEXT NOT NULL, uri TEXT NOT NULL, score REAL NOT NULL, latencies TEXT,"
+                " trace_id TEXT, skipped INTEGER NOT NULL DEFAULT 0);"
+                "CREATE INDEX IF NOT EXISTS commands_query ON commands (query);"
+                "CREATE INDEX IF NOT EXISTS commands_uri ON commands (uri);"
+                "CREATE INDEX IF NOT EXISTS commands_ts ON commands (ts);"
+                "CREATE TABLE IF NOT EXISTS track_priors ("
+                " uri TEXT PRIMARY KEY, plays INTEGER NOT NULL, skips INTEGER NOT NULL,"
+                " weight REAL NOT NULL, updated REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS query_priors ("
+                " query TEXT NOT NULL, uri TEXT NOT NULL, plays INTEGER NOT NULL, skips INTEGER NOT NULL,"
+                " weight REAL NOT NULL, updated REAL NOT NULL, result TEXT NOT NULL,"
+                " PRIMARY KEY (query, uri));"
+            )
+            self._track_priors = {
+                uri: (weight, updated)
+                for uri, weight, updated in self._conn.execute("SELECT uri, weight, updated FROM track_priors")
+            }
+        return self._conn
+
+    def _decayed(self, weight: float, updated: float, now: float) -> float:
+        return weight * 0.5 ** (max(0.0, now - updated) / self.half_life)
+
+    # ------------------- Recording -------------------
+    def _bump(self, conn, query: str, uri: str, delta: float, now: float, result: str | None = None):
+        played, skipped = int(delta > 0), int(delta < 0)
+        weight, updated = self._track_priors.get(uri, (0.0, now))
+        weight = self._decayed(weight, updated, now) + delta
+        self._track_priors[uri] = (weight, now)
+        conn.execute(
+            "INSERT INTO track_priors (uri, plays, skips, weight, updated) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (uri) DO UPDATE SET plays = plays + ?, skips = skips + ?, weight = ?, updated = ?",
+            (uri, played, skipped, weight, now, played, skipped, weight, now),
+        )
+        row = conn.execute("SELECT weight, updated FROM query_priors WHERE query = ? AND uri = ?", (query, uri)).fetchone()
+        weight = (self._decayed(*row, now) if row else 0.0) + delta
+        conn.execute(
+            "INSERT INTO query_priors (query, uri, plays, skips, weight, updated, result) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (query, uri) DO UPDATE SET plays = plays + ?, skips = skips + ?, weight = ?, updated = ?,"
+            " result = COALESCE(?, result)",
+            (query, uri, played, skipped, weight, now, result or "null", played, skipped, weight, now, result),
+        )
+
+    def record(self, transcript: str, chosen, latencies: dict | None = None, trace_id: str | None = None) -> int | None:
+        """Log a played command; returns its id. The previous command counts as skipped if it was recent."""
+        track, _, _, uri, score = chosen
+        if not uri:
+            return None
+        query = history_key(transcript)
+        result = json.dumps([compact_track(track) if track else None, *chosen[1:]])
+        now = time.time()
+        skipped = None
+        try:
+            with self._lock:
+                conn = self._connection()
+                previous = conn.execute(
+                    "SELECT id, ts, query, uri, skipped, transcript FROM commands ORDER BY id DESC LIMIT 1"
+                ).fetchone()
+                if previous and not previous[4] and now - previous[1] < self.skip_window:
+                    conn.execute("UPDATE commands SET skipped = 1 WHERE id = ?", (previous[0],))
+                    self._bump(conn, previous[2], previous[3], -self.skip_penalty, now)
+                    skipped = (previous[5], previous[3])
+                cursor = conn.execute(
+                    "INSERT INTO commands (ts, transcript, query, uri, score, latencies, trace_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (now, transcript, query, uri, float(score), json.dumps(latencies or {}), trace_id),
+                )
+                self._bump(conn, query, uri, 1.0, now, result)
+                conn.commit()
+                row_id = cursor.lastrowid
+        except Exception as e:
+            # Losing a history row must never break a command
+            print(f"Command history write error: {e}")
+            return None
+        if skipped and self.on_skip:
+            self.on_skip(*skipped)
+        return row_id
+
+    # ------------------- Ranking -------------------
+    def priors(self, uris: list[str]) -> np.ndarray:
+        """Usage prior per URI in (-1, 1): positive for tracks played often and recently, negative once skipped."""
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                try:
+                    self._connection()
+                except Exception as e:
+                    print(f"Command history read error: {e}")
+                    return np.zeros(len(uris))
+            priors = self._track_priors
+            weights = np.fromiter(
+                (self._decayed(*priors[uri], now) if uri in priors else 0.0 for uri in uris), dtype=np.float64, count=len(uris)
+            )
+        return weights / (np.abs(weights) + 1)
+
+    def favourite(self, query: str):
+        """The result played most for this request, if it's a habit (recent plays, no recent skips)."""
+        now = time.time()
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    "SELECT weight, updated, result FROM query_priors WHERE query = ?", (history_key(query),)
+                ).fetchall()
+        except Exception as e:
+            print(f"Command history read error: {e}")
+            return None
+        if not rows:
+            return None
+        weight, result = max((self._decayed(weight, updated, now), result) for weight, updated, result in rows)
+        if weight < self.shortcut_min_weight:
+            return None
+        return json.loads(result)
+
+
+def create_history(enabled: bool = HISTORY_ENABLED, on_skip=None):
+    return CommandHistory(on_skip=on_skip) if enabled else NullCommandHistory()
@@ -0,0 +1,141 @@
+# core/pipeline.py — Assembles capture -> recognizer -> matcher -> player (and spoken feedback) from config
+"""
+Each stage is chosen by a setting, so a host (or a benchmark variant) is reconfigured through
+the config file / SRS_* environment variables instead of code edits (see core/config.py):
+
+    capture     CAPTURE_BACKEND "sounddevice", "ffmpeg" (CAPTURE_INPUT_FORMAT "dshow", "alsa" or
+                "pulse", CAPTURE_DEVICE) or "file" (CAPTURE_FILE replayed on every command)
+    recognizer  RECOGNIZER_BACKEND, WHISPER_MODEL, RECOGNIZER_THREADS
+    tts         TTS_BACKEND "vits" (TTS_MODEL, TTS_SPEAKER) or "none"; also silences the status
+                cues (CUE_STYLE, see core/cues.py) when "none"
+    matcher     MATCHER "spotify" or "library" (offline, local index only)
+    player      PLAYER "spotify" or "none" (dry run)
+
+Building a pipeline loads nothing: models and clients stay behind lazy handles.
+"""
+import os
+from concurrent.futures import Future
+from core.audio_io import load_wav
+from core.config import (
+    CAPTURE_BACKEND, CAPTURE_FILE, RECOGNIZER_BACKEND, WHISPER_MODEL, RECOGNIZER_THREADS,
+    TTS_BACKEND, MATCHER, PLAYER, SPECULATIVE_SEARCH, ESPEAK_PATH, FFMPEG_PATH,
+)
+from core.capture import CAPTURE_SOURCES, create_capture
+from core.query_parser import strip_command
+from core.recognizer import initiate_recognizer
+from core.resident import ResidentModel
+import core.audio_feedback as af
+import core.cues as cues
+import core.spotify_player as sp
+
+
+class Pipeline:
+    """The stages a voice command runs through; see build_pipeline()."""
+
+    def __init__(self, capture, recognizer, speak, match, play, pause, tts=None, speculate: bool = False,
+                 uses_spotify: bool = False, cue=None):
+        self.capture = capture        # () -> unstarted capture source
+        self.recognizer = recognizer  # handle exposing transcribe()
+        self.speak = speak            # (text, priority=..., interrupt=...) -> Future[bool], for dynamic text
+        self.cue = cue or silent_cue  # (name, interrupt=...) -> Future[bool], fixed status feedback
+        self.match = match            # (query, pages=None) -> (track, name, artist, uri, score)
+        self.play = play              # (uri, artist_uri=None) -> bool
+        self.pause = pause            # () -> None, silences playback while the user speaks
+        self.tts = tts                # TTS model handle (None when feedback is silent)
+        self.speculate = speculate    # search from partial transcripts (needs the search API)
+        self.uses_spotify = uses_spotify
+
+
+def prepare_environment(espeak_path: str | None = ESPEAK_PATH, ffmpeg_path: str = FFMPEG_PATH):
+    """Put eSpeak (the VITS phonemizer) and FFmpeg on PATH. Called once by main(), never on import."""
+    entries = os.environ.get("PATH", "").split(os.pathsep)
+    for directory in (espeak_path, os.path.dirname(ffmpeg_path)):
+        if directory and directory not in entries:
+            entries.insert(0, directory)
+    os.environ["PATH"] = os.pathsep.join(entries)
+
+
+# ------------------- Stages -------------------
+def build_capture(backend: str = CAPTURE_BACKEND, path: str | None = CAPTURE_FILE):
+    if backend not in CAPTURE_SOURCES:
+        raise ValueError(f"Unknown capture backend: {backend}")
+    if backend == "file":
+        if not path:
+            raise ValueError("The file capture backend needs CAPTURE_FILE")
+        clip = load_wav(path)
+        return lambda: create_capture("file", audio=clip)
+    return lambda: create_capture(backend)
+
+
+def build_recognizer(backend: str = RECOGNIZER_BACKEND, model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS):
+    return ResidentModel("whisper", lambda: initiate_recognizer(backend, model_size, threads))
+
+
+def silent(text: str, priority: int = af.PRIORITY_NORMAL, interrupt: bool = False) -> Future:
+    print(f"(feedback) {text}")
+    done = Future()
+    done.set_result(True)
+    return done
+
+
+def silent_cue(name: str, interrupt: bool = False) -> Future:
+    return silent(f"<{name}>")
+
+
+def play_cue(name: str, interrupt: bool = False) -> Future:
+    if interrupt:
+        af.feedback.interrupt()  # a new status cuts off whatever is still being said
+    return cues.play_cue(name, interrupt=interrupt)
+
+
+def build_feedback(backend: str = TTS_BACKEND):
+    """(speak, cue, tts handle) for the configured voice."""
+    if backend == "vits":
+        return (lambda text, **kwargs: af.speak(text, **kwargs)), play_cue, af.global_tts
+    if backend == "none":
+        return silent, silent_cue, None
+    raise ValueError(f"Unknown TTS backend: {backend}")
+
+
+def build_matcher(matcher: str = MATCHER):
+    # Module functions are looked up at call time, so stand-ins patched onto them are used
+    if matcher == "spotify":
+        return lambda query, pages=None: sp.query_best_song(query, pages=pages)
+    if matcher == "library":
+        return lambda query, pages=None: sp.library_query(strip_command(query))
+    raise ValueError(f"Unknown matcher: {matcher}")
+
+
+def build_player(player: str = PLAYER, cue=silent_cue):
+    """(play, pause) for the configured player."""
+    if player == "spotify":
+        def play(uri, artist_uri=None):
+            if sp.play_track(uri, artist_uri):
+                return True
+            cue("no_device")
+            return False
+        return play, (lambda: sp.stop_current_playback())
+    if player == "none":
+        def dry_run(uri, artist_uri=None):
+            print(f"Dry run: would play {uri}")
+            return False
+        return dry_run, lambda: None
+    raise ValueError(f"Unknown player: {player}")
+
+
+def build_pipeline(capture: str = CAPTURE_BACKEND, recognizer: str = RECOGNIZER_BACKEND, tts: str = TTS_BACKEND,
+                   matcher: str = MATCHER, player: str = PLAYER, speculate: bool = SPECULATIVE_SEARCH) -> Pipeline:
+    speak, cue, tts_handle = build_feedback(tts)
+    play, pause = build_player(player, cue)
+    return Pipeline(
+        capture=build_capture(capture),
+        recognizer=build_recognizer(recognizer),
+        speak=speak,
+        cue=cue,
+        match=build_matcher(matcher),
+        play=play,
+        pause=pause,
+        tts=tts_handle,
+        speculate=speculate and matcher == "spotify",
+        uses_spotify="spotify" in (matcher, player),
+    )
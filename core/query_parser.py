@@ -0,0 +1,41 @@
+# core/query_parser.py — Turns a spoken song request into (title, artist)
+import re
+from core.search_cache import normalize_query
+
+# Spoken lead-ins that aren't part of the song name ("can you play ...", "put on ..."). No bare
+# "start": titles begin with it ("Start Me Up")
+COMMAND_PREFIX = re.compile(
+    r"^(?:(?:hey|ok|okay)\s+q\s+)?(?:(?:please|can you|could you|would you|will you)\s+)?"
+    r"(?:play|put on|queue(?: up)?|i want to hear|i wanna hear|i'd like to hear|id like to hear|let me hear|lets hear|let's hear)\s+",
+)
+COMMAND_SUFFIX = re.compile(r"\s+(?:please|on spotify|for me|thanks|thank you)$")
+ARTICLE_PREFIX = re.compile(r"^(?:the song|the track|song|track)\s+")
+
+# "stand by me", "killing me softly by ..." — words after ' by ' that can't be an artist
+NON_ARTIST_WORDS = {"me", "you", "us", "him", "her", "them", "myself", "yourself", "my side", "your side", "the way"}
+
+
+def strip_command(text: str) -> str:
+    """Normalized request without 'play' / 'please'-style filler around the song name."""
+    query = normalize_query(text)
+    previous = None
+    while query != previous:
+        previous = query
+        query = COMMAND_SUFFIX.sub("", COMMAND_PREFIX.sub("", query))
+    query = ARTICLE_PREFIX.sub("", query)
+    return query or normalize_query(text)
+
+
+def parse_song_request(text: str) -> tuple[str, str | None]:
+    """
+    Split 'title by artist' into (title, artist); artist is None when there is none.
+    The last ' by ' wins, since titles contain 'by' ("Stand by Me") far more often than artist
+    names do, unless what follows it is a pronoun-like tail that can't be an artist.
+    """
+    query = strip_command(text)
+    parts = query.split(" by ")
+    for split in range(len(parts) - 1, 0, -1):
+        title, artist = " by ".join(parts[:split]).strip(), " by ".join(parts[split:]).strip()
+        if title and artist and artist not in NON_ARTIST_WORDS:
+            return title, artist
+    return query, None
@@ -1,11 +1,21 @@
 import os
-import whisper
-from core.utils import output_filename, ffmpeg_exe
+import importlib.util
+import threading
+import numpy as np
+from core.config import (
+    SAMPLE_RATE, STREAMING_INTERVAL_MS, STREAMING_WINDOW_S,
+    RECOGNIZER_BACKEND, WHISPER_MODEL, RECOGNIZER_THREADS,
+    RECOGNITION_PROFILE, RECOGNITION_BEAM_SIZE, RECOGNITION_MAX_TOKENS, RECOGNITION_SHORT_UTTERANCE_S,
+    RECOGNIZER_WEIGHT_DTYPE, RESIDENT_MMAP_WEIGHTS, RESIDENT_WEIGHTS_DIR,
+)
+from core.resident import save_weights, load_mapped
+from core.vad import speech_bounds
 import unicodedata
 import string
 """
 1. The initiate_recognizer() function will be called once when the program starts.
-2. The handle_transcription() function will be called at the end of every recording.
+2. The handle_transcription() function will be called at the end of every recording
+   with the captured 16 kHz mono float32 samples (no intermediate audio file).
 """
 
 
@@ -34,43 +44,422 @@ def get_text_direction(text):
     else:
         return 'LTR'
 
-latest_transcription = None
+latest_transcription = None  # raw text of the last command, before cleaning (any caller's)
+_latest_lock = threading.Lock()
 
-def handle_transcription(whisper_model):
-    # Ensure FFmpeg is in PATH
-    os.environ["PATH"] = os.path.dirname(ffmpeg_exe) + os.pathsep
-    print(f"Using FFmpeg from: {ffmpeg_exe}")
-    print(f"Transcribing file: {output_filename}")
-    
-    # Transcribe the audio file
-    transcription = whisper_model.transcribe(output_filename)
+def remember_transcription(text: str):
+    """Record the raw text of the latest command; callers use their own copy, never this global."""
+    global latest_transcription
+    with _latest_lock:
+        latest_transcription = text
 
+
+def transcription_text(transcription) -> str:
     if isinstance(transcription, dict):
-        latest_transcription = transcription.get("text", "")
+        return transcription.get("text", "")
     elif isinstance(transcription, str):
-        latest_transcription = transcription
+        return transcription
     else:
         raise ValueError(f"Unexpected transcription type: {type(transcription)}")
-    
-    
-    text_direction = get_text_direction(latest_transcription)
-    cleaned_text  = remove_punctuation(latest_transcription)
-    if "by" in cleaned_text:
-        cleaned_text.replace("by", "-")
+
+
+def clean_transcription(text: str) -> str:
+    # "title by artist" is kept as spoken; core/query_parser.py splits it
+    text_direction = get_text_direction(text)
+    cleaned_text = " ".join(remove_punctuation(text).split())
     if text_direction == 'RTL':
         cleaned_text = cleaned_text[::-1]
+    return cleaned_text
+
+
+# ------------------- Recognition profile -------------------
+# Library-derived vocabulary (artist and title names) that biases the decoder; see set_music_prompt().
+# Without a library there is no prompt: example titles would be hallucinated on noisy audio.
+music_prompt = None
+
+
+def set_music_prompt(prompt: str | None):
+    global music_prompt
+    music_prompt = prompt or None
+    if music_prompt:
+        print(f"Recognizer prompt: {music_prompt[:80]}{'...' if len(music_prompt) > 80 else ''}")
 
+
+def recognition_options(audio: np.ndarray | None = None, profile: str = RECOGNITION_PROFILE) -> dict:
+    """
+    Decode options for a song request. The music profile runs a single greedy (or narrow beam)
+    pass with no temperature fallback, primes the decoder with names from the user's library (if any),
+    caps the output length, and decodes short utterances as one padded window.
+    """
+    if profile != "music":
+        return {}
+    options = {
+        "temperature": 0.0,
+        "condition_on_previous_text": False,
+        "sample_len": RECOGNITION_MAX_TOKENS,
+    }
+    if music_prompt:
+        options["initial_prompt"] = music_prompt
+    if RECOGNITION_BEAM_SIZE:
+        options["beam_size"] = RECOGNITION_BEAM_SIZE
+    if audio is not None and audio.shape[0] <= RECOGNITION_SHORT_UTTERANCE_S * SAMPLE_RATE:
+        options["single_window"] = True
+    return options
+
+
+def handle_transcription(whisper_model, audio: np.ndarray):
+    print(f"Transcribing {audio.shape[0] / SAMPLE_RATE:.2f}s of captured audio")
+
+    # Whisper accepts the 16 kHz float32 array directly, skipping FFmpeg decoding
+    transcription = whisper_model.transcribe(np.ascontiguousarray(audio, dtype=np.float32), **recognition_options(audio))
+    text = transcription_text(transcription)
+    remember_transcription(text)
+
+    cleaned_text = clean_transcription(text)
     print(f"Transcription (cleaned): {cleaned_text}")
     return cleaned_text
-    
-    
 
 
+# ------------------- Streaming recognition -------------------
+def common_prefix_words(a: list[str], b: list[str]) -> list[str]:
+    """Longest shared word prefix of two hypotheses (compared case/punctuation-insensitively)."""
+    prefix = []
+    for word_a, word_b in zip(a, b):
+        if remove_punctuation(word_a).lower() != remove_punctuation(word_b).lower():
+            break
+        prefix.append(word_b)
+    return prefix
+
+
+class StreamingTranscriber:
+    """
+    Re-decodes a sliding window of the live capture buffer every `interval_ms` while the user
+    is still speaking. Each pass emits a partial hypothesis; words that two consecutive passes
+    agree on are committed as the stable prefix (it only ever grows). finish() reuses the last
+    hypothesis when everything it didn't hear is trailing silence, so the final decode is
+    usually free.
+    """
+
+    def __init__(self, whisper_model, buffer, interval_ms: int = STREAMING_INTERVAL_MS,
+                 window_s: float = STREAMING_WINDOW_S, min_audio_s: float = 0.5,
+                 on_partial=None, on_stable=None):
+        self.whisper_model = whisper_model
+        self.buffer = buffer
+        self.interval = interval_ms / 1000
+        self.window_samples = int(window_s * SAMPLE_RATE)
+        self.min_samples = int(min_audio_s * SAMPLE_RATE)
+        self.on_partial = on_partial
+        self.on_stable = on_stable
+
+        self.partial = ""
+        self.committed: list[str] = []
+        self._previous_words: list[str] = []
+        # Positions are in buffer.written terms, so they keep advancing once the ring buffer is full
+        self._decoded_samples = 0   # audio covered by self.partial
+        self._decoding = None       # audio covered by the pass in flight, if any
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def stable_text(self) -> str:
+        return " ".join(self.committed)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _decode(self, audio: np.ndarray) -> str | None:
+        """A partial hypothesis, or None if finish() was called before the model was free."""
+        # Cheap settings for partials: single greedy pass, no fallback, no cross-window context
+        options = {**recognition_options(audio), "temperature": 0.0, "condition_on_previous_text": False}
+        transcribe_unless = getattr(self.whisper_model, "transcribe_unless", None)
+        if transcribe_unless is not None:
+            result = transcribe_unless(self._stop, audio, **options)
+        else:
+            result = self.whisper_model.transcribe(audio, **options)
+        return None if result is None else transcription_text(result).strip()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            written = self.buffer.written
+            if len(self.buffer) < self.min_samples or written == self._decoded_samples:
+                continue
+            self._decoding = written
+            try:
+                text = self._decode(self.buffer.get(last=self.window_samples))
+            except Exception as e:
+                print(f"Partial transcription error: {e}")
+                continue
+            finally:
+                self._decoding = None
+            if text is None:
+                continue
+            with self._lock:
+                self._decoded_samples = written
+                self.partial = text
+            if not self._stop.is_set():
+                self._update(text)
+
+    def _update(self, text: str):
+        words = text.split()
+        stable = common_prefix_words(self._previous_words, words)
+        self._previous_words = words
+        self.partial = text
+        if self.on_partial:
+            self.on_partial(text)
+        if len(stable) > len(self.committed):
+            self.committed = stable
+            if self.on_stable:
+                self.on_stable(self.stable_text)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _speech_end(self) -> int:
+        """Where the speech in the buffer ends (padded), in buffer.written terms."""
+        audio = self.buffer.get()
+        bounds = speech_bounds(audio)
+        return self.buffer.written - audio.shape[0] + (bounds[1] if bounds else 0)
+
+    def _covers(self, speech_end: int) -> bool:
+        with self._lock:
+            return bool(self.partial) and self._decoded_samples >= speech_end
+
+    def finish(self, audio: np.ndarray | None = None) -> str:
+        """
+        Stop streaming and return the cleaned final transcript. Call it once capture has
+        stopped. The last partial is reused if only trailing silence came after it, and a
+        pass still running is used if it already covers all the speech; otherwise the
+        remaining audio is decoded once the model is free.
+        """
+        self._stop.set()
+        speech_end = self._speech_end()
+        decoding = self._decoding
+        if not self._covers(speech_end) and decoding is not None and decoding >= speech_end and self._thread:
+            self._thread.join()
+        if self._covers(speech_end):
+            print("Final transcript already available from streaming pass")
+            text = self.partial
+        else:
+            # A pass still waiting for the model skips itself (the stop flag is set). One that is
+            # already decoding can't be interrupted: the model is serialized, so this decode
+            # starts once that pass is done, and the pass's result is ignored.
+            if audio is None:
+                audio = self.buffer.get(last=self.window_samples)
+            print(f"Transcribing remaining {audio.shape[0] / SAMPLE_RATE:.2f}s of captured audio")
+            audio = np.ascontiguousarray(audio, dtype=np.float32)
+            text = transcription_text(self.whisper_model.transcribe(audio, **recognition_options(audio)))
+
+        remember_transcription(text)
+        cleaned_text = clean_transcription(text)
+        print(f"Transcription (cleaned): {cleaned_text}")
+        return cleaned_text
+
+
+# ------------------- Recognizer backends -------------------
+class RecognizerBackend:
+    """
+    Common interface for speech-to-text engines. transcribe() takes 16 kHz mono float32 audio
+    and returns a Whisper-style dict ({"text": ..., "segments": [...]}), so callers don't care
+    which engine is loaded. Options follow whisper's transcribe() / DecodingOptions names, plus
+    `single_window` (decode a short clip in one pass), which engines may ignore.
+
+    One instance is shared by the hotkey path, the streaming thread and the daemon, and no engine
+    is safe to call concurrently (whisper installs kv-cache hooks on the shared model for each
+    decode), so every call is serialized on `lock`. Engines implement _transcribe().
+    """
+    name = "base"
+
+    def __init__(self, model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS):
+        self.model_size = model_size
+        self.threads = threads
+        self.model = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+    def load(self):
+        raise NotImplementedError
+
+    def transcribe(self, audio, **options) -> dict:
+        with self.lock:
+            return self._transcribe(audio, **options)
+
+    def transcribe_batch(self, audios: list, **options) -> list[dict]:
+        with self.lock:
+            return self._transcribe_batch(audios, **options)
+
+    def transcribe_unless(self, cancelled: threading.Event, audio, **options) -> dict | None:
+        """transcribe(), or None if `cancelled` is set by the time the model is free."""
+        with self.lock:
+            if cancelled.is_set():
+                return None
+            return self._transcribe(audio, **options)
+
+    def _transcribe(self, audio, **options) -> dict:
+        raise NotImplementedError
+
+    def _transcribe_batch(self, audios: list, **options) -> list[dict]:
+        """Transcribe several utterances; engines that can decode a padded batch override this."""
+        return [self._transcribe(audio, **options) for audio in audios]
+
+
+class WhisperBackend(RecognizerBackend):
+    """
+    Reference openai-whisper model, PyTorch on CPU. With RESIDENT_MMAP_WEIGHTS the downloaded
+    checkpoint is converted once to a mappable weight file (in RECOGNIZER_WEIGHT_DTYPE) and
+    every load maps that file instead of reading it into private memory.
+    """
+    name = "whisper"
+    weight_dtype = RECOGNIZER_WEIGHT_DTYPE
+
+    def load(self):
+        import torch
+        import whisper
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        if RESIDENT_MMAP_WEIGHTS:
+            self.model = self._load_mapped()
+        else:
+            self.model = self._convert(whisper.load_model(self.model_size, device="cpu"))
+        return self
+
+    def weights_path(self) -> str:
+        return os.path.join(RESIDENT_WEIGHTS_DIR, f"whisper-{self.model_size}-{self.weight_dtype}.pt")
+
+    def _convert(self, model):
+        """Store the projection/convolution/embedding weights in half precision if configured."""
+        if self.weight_dtype == "float16":
+            import torch
+            import whisper
+            # whisper's Linear and Conv1d cast their weights to the input dtype on every call, and
+            # the token embedding is cast where it's used, so fp32 activations still work on CPU
+            for module in model.modules():
+                if isinstance(module, (whisper.model.Linear, whisper.model.Conv1d, torch.nn.Embedding)):
+                    module.half()
+        elif self.weight_dtype != "float32":
+            raise ValueError(f"Unsupported recognizer weight dtype: {self.weight_dtype}")
+        return model
+
+    def _load_mapped(self):
+        from dataclasses import asdict
+        import whisper
+        path = self.weights_path()
+        if not os.path.exists(path):
+            print(f"Writing mappable {self.weight_dtype} weights to {path}")
+            model = self._convert(whisper.load_model(self.model_size, device="cpu"))
+            save_weights(model, path, {"dims": asdict(model.dims)})
+            del model
+        return load_mapped(path, lambda meta: whisper.model.Whisper(whisper.model.ModelDimensions(**meta["dims"])))
+
+    def _transcribe(self, audio, **options) -> dict:
+        import whisper
+        if options.pop("single_window", False) and audio.shape[0] <= whisper.audio.N_SAMPLES:
+            # Short request: one decode() of one padded window, skipping transcribe()'s seek loop
+            return self._decode_windows([audio], options)[0]
+        options.setdefault("fp16", False)  # fp16 isn't supported on CPU; avoids a warning per call
+        return self.model.transcribe(audio, **options)
+
+    def _transcribe_batch(self, audios: list, **options) -> list[dict]:
+        """
+        Utterances that fit in one 30 s window are padded, stacked into a single mel batch and
+        run through one decode() call (no timestamps) instead of one transcribe() each.
+        """
+        import whisper
+        if len(audios) < 2 or any(audio.shape[0] > whisper.audio.N_SAMPLES for audio in audios):
+            return super()._transcribe_batch(audios, **options)
+        return self._decode_windows(audios, options)
+
+    def _decode_windows(self, audios: list, options: dict) -> list[dict]:
+        import torch
+        import whisper
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(np.ascontiguousarray(audio, dtype=np.float32)), self.model.dims.n_mels)
+            for audio in audios
+        ]).to(self.model.device)
+        temperature = options.get("temperature", 0.0)
+        if isinstance(temperature, (tuple, list)):
+            temperature = temperature[0]  # no fallback ladder for batched decodes
+        decoding = whisper.DecodingOptions(
+            # English-only checkpoints have no language token to detect
+            language=options.get("language") or (None if self.model.is_multilingual else "en"),
+            temperature=temperature,
+            beam_size=options.get("beam_size"),
+            sample_len=options.get("sample_len"),
+            prompt=options.get("initial_prompt"),
+            without_timestamps=True,
+            fp16=False,
+        )
+        results = whisper.decode(self.model, mel, decoding)
+        return [{"text": r.text, "segments": [], "language": r.language} for r in results]
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """Same Whisper model with its Linear layers dynamically quantized to int8."""
+    name = "whisper-int8"
+
+    def load(self):
+        import torch
+        super().load()
+        # whisper.model.Linear only overrides forward() to cast weights; quantize_dynamic
+        # matches exact module types, so turn them back into plain nn.Linear first (and fp32,
+        # which is what the quantizer expects when weights are stored in half precision)
+        for module in self.model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+                module.float()
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return self
+
+
+class CTranslate2Backend(RecognizerBackend):
+    """faster-whisper (CTranslate2) int8 engine, used only when the package is installed."""
+    name = "ctranslate2"
+    supported_options = {"language", "task", "beam_size", "best_of", "patience", "temperature",
+                         "initial_prompt", "condition_on_previous_text", "without_timestamps", "max_new_tokens"}
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return importlib.util.find_spec("faster_whisper") is not None
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(self.model_size, device="cpu", compute_type="int8", cpu_threads=self.threads)
+        return self
+
+    def _transcribe(self, audio, **options) -> dict:
+        if "sample_len" in options:
+            options["max_new_tokens"] = options.pop("sample_len")
+        options = {k: v for k, v in options.items() if k in self.supported_options}
+        segments, info = self.model.transcribe(audio, **options)
+        segments = [{"start": seg.start, "end": seg.end, "text": seg.text} for seg in segments]
+        return {"text": "".join(seg["text"] for seg in segments), "segments": segments, "language": info.language}
+
+
+RECOGNIZER_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    QuantizedWhisperBackend.name: QuantizedWhisperBackend,
+    CTranslate2Backend.name: CTranslate2Backend,
+}
+
+
+def create_backend(name: str = RECOGNIZER_BACKEND, model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS) -> RecognizerBackend:
+    try:
+        backend_cls = RECOGNIZER_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown recognizer backend: {name}")
+    if not backend_cls.is_available():
+        raise RuntimeError(f"Recognizer backend '{name}' is not installed")
+    return backend_cls(model_size=model_size, threads=threads)
+
 
-def initiate_recognizer():
-    # Add FFmpeg to PATH
-    os.environ["PATH"] = os.path.dirname(ffmpeg_exe) + os.pathsep + os.environ["PATH"]
-    
-    # Load and return the Whisper model
-    whisper_model = whisper.load_model("small.en")
-    return whisper_model
+def initiate_recognizer(backend: str = RECOGNIZER_BACKEND, model_size: str = WHISPER_MODEL, threads: int = RECOGNIZER_THREADS):
+    # Load and return the configured recognizer (exposes .transcribe like a Whisper model)
+    print(f"Loading recognizer: {backend} ({model_size})")
+    return create_backend(backend, model_size, threads).load()
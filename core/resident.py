@@ -0,0 +1,283 @@
+# core/resident.py — Keeps loaded models within a memory budget: idle offload, mmap-backed weights, per-model report
+import functools
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import chain
+from core.config import RESIDENT_BUDGET_MB, RESIDENT_IDLE_S, RESIDENT_CHECK_INTERVAL_S
+from core.startup import LazyHandle
+
+
+def process_rss_mb() -> float | None:
+    """Current resident set size of this process."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# ------------------- Weight accounting -------------------
+def torch_modules(obj, depth: int = 3) -> list:
+    """PyTorch modules held by a loaded model (a recognizer backend, a Coqui TTS object, ...)."""
+    try:
+        import torch
+    except ImportError:
+        return []
+    if isinstance(obj, torch.nn.Module):
+        return [obj]
+    found = []
+    if depth:
+        for attr in ("model", "synthesizer", "tts_model", "vocoder_model"):
+            child = getattr(obj, attr, None)
+            if child is not None:
+                found += torch_modules(child, depth - 1)
+    return list({id(module): module for module in found}.values())
+
+
+def weights_mb(obj) -> float | None:
+    """Size of the weights (parameters, buffers, packed int8 params) of every module in `obj`."""
+    import torch
+    modules = torch_modules(obj)
+    if not modules:
+        return None
+    seen, total = set(), 0
+
+    def count(value):
+        nonlocal total
+        if isinstance(value, torch.Tensor):
+            key = (value.data_ptr(), value.dtype) if not value.is_sparse and not value.is_quantized else id(value)
+            if key not in seen:
+                seen.add(key)
+                total += value.numel() * value.element_size()
+        elif isinstance(value, (tuple, list)):
+            for item in value:
+                count(item)
+
+    for module in modules:
+        for value in module.state_dict(keep_vars=True).values():
+            count(value)
+    return total / (1024 * 1024)
+
+
+# ------------------- Memory-mapped weight files -------------------
+def save_weights(module, path: str, meta: dict):
+    """
+    Write every parameter and buffer (non-persistent ones too, so nothing has to be recomputed)
+    in torch's zip format, which torch.load(mmap=True) can map instead of reading.
+    """
+    import torch
+    tensors, sparse = {}, []
+    for name, tensor in chain(module.named_parameters(), module.named_buffers()):
+        if tensor.is_sparse:
+            sparse.append(name)
+            tensor = tensor.to_dense()
+        tensors[name] = tensor.detach().contiguous()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save({"meta": meta, "tensors": tensors, "sparse": sparse}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_mapped(path: str, build):
+    """
+    Build a module with `build(meta)` and point its tensors at the mapped file. Pages are
+    shared through the OS page cache, so every process mapping the same file holds one copy,
+    and a reload after an offload is mostly page-ins.
+    """
+    import torch
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    try:
+        # Skip allocating weights that are replaced right away
+        with torch.device("meta"):
+            module = build(checkpoint["meta"])
+    except Exception:
+        module = build(checkpoint["meta"])  # constructor doesn't support the meta device: costs one transient copy
+    sparse = set(checkpoint["sparse"])
+    for name, tensor in checkpoint["tensors"].items():
+        owner_name, _, attr = name.rpartition(".")
+        owner = module.get_submodule(owner_name)
+        if name in sparse:
+            tensor = tensor.to_sparse()
+        if attr in owner._parameters:
+            owner._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+        else:
+            owner._buffers[attr] = tensor
+    return module.eval()
+
+
+# ------------------- Resident models -------------------
+class ResidentModel(LazyHandle):
+    """
+    LazyHandle that can be offloaded: offload() drops the loaded object and the next use
+    loads it again (from a mapped weight file when the loader uses one, so a reload is mostly
+    page-ins). Calls made through the handle count as in use and are never offloaded mid-call.
+    """
+
+    def __init__(self, name: str, loader):
+        super().__init__(name, loader)
+        self.loads = 0
+        self.offloads = 0
+        self.last_used = time.monotonic()
+        self.weights_mb = None
+        self._busy = 0
+
+    def _load(self):
+        if not self.loads:
+            value = super()._load()
+        else:
+            start = time.perf_counter()
+            value = self._loader()
+            self.load_time = time.perf_counter() - start
+            print(f"[resident] {self.name} reloaded in {self.load_time:.2f}s")
+        self.loads += 1
+        self.last_used = time.monotonic()
+        try:
+            self.weights_mb = weights_mb(value)
+        except ImportError:
+            self.weights_mb = None
+        return value
+
+    def get(self):
+        self.last_used = time.monotonic()
+        return super().get()
+
+    @contextmanager
+    def in_use(self):
+        with self._lock:
+            self._busy += 1
+        try:
+            yield self.get()
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self.last_used = time.monotonic()
+
+    def __getattr__(self, attr):
+        value = super().__getattr__(attr)
+        if not callable(value):
+            return value
+
+        @functools.wraps(value)
+        def call(*args, **kwargs):
+            with self.in_use():
+                return value(*args, **kwargs)
+        return call
+
+    def loaded(self) -> bool:
+        return self._future is not None and self._future.done() and self._future.exception() is None
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self.last_used
+
+    def offload(self) -> bool:
+        """Drop the loaded object unless it is in use or still loading."""
+        with self._lock:
+            if self._busy or not self.loaded():
+                return False
+            self._future = None
+        gc.collect()
+        self.offloads += 1
+        return True
+
+    def status(self) -> dict:
+        state = "loaded" if self.loaded() else "loading" if self._future is not None else "offloaded"
+        return {
+            "state": state,
+            "weights_mb": round(self.weights_mb, 1) if self.weights_mb is not None else None,
+            "idle_s": round(self.idle_for(), 1),
+            "busy": self._busy > 0,
+            "loads": self.loads,
+            "offloads": self.offloads,
+        }
+
+
+class MemoryManager:
+    """
+    Applies the offload policy to registered models: anything idle for `idle_s` is offloaded,
+    and while the process RSS is over `budget_mb` the least recently used idle models go too.
+    """
+
+    def __init__(self, budget_mb: float = RESIDENT_BUDGET_MB, idle_s: float = RESIDENT_IDLE_S,
+                 interval_s: float = RESIDENT_CHECK_INTERVAL_S, rss=process_rss_mb):
+        self.budget_mb = budget_mb
+        self.idle_s = idle_s
+        self.interval = interval_s
+        self.rss = rss
+        self.models: list[ResidentModel] = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def register(self, model: ResidentModel) -> ResidentModel:
+        with self._lock:
+            if model not in self.models:
+                self.models.append(model)
+        return model
+
+    def enforce(self) -> list[str]:
+        """Offload whatever the policy says should go; returns the names offloaded."""
+        offloaded = []
+        with self._lock:
+            loaded = sorted((m for m in self.models if m.loaded()), key=lambda m: m.last_used)
+        for model in loaded:
+            if self.idle_s and model.idle_for() >= self.idle_s and model.offload():
+                print(f"[resident] {model.name} offloaded after {model.idle_for():.0f}s idle")
+                offloaded.append(model.name)
+        if self.budget_mb:
+            for model in loaded:
+                rss = self.rss()
+                if rss is None or rss <= self.budget_mb:
+                    break
+                if model.name not in offloaded and model.offload():
+                    print(f"[resident] {model.name} offloaded: RSS {rss:.0f} MB over the {self.budget_mb:.0f} MB budget")
+                    offloaded.append(model.name)
+        return offloaded
+
+    def wake(self):
+        """Start reloading offloaded models in the background, e.g. as soon as the hotkey is pressed."""
+        with self._lock:
+            models = [m for m in self.models if m.loads and m.status()["state"] == "offloaded"]
+        for model in models:
+            threading.Thread(target=model.get, name=f"resident-wake-{model.name}", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.enforce():
+                    self.print_report()
+            except Exception as e:
+                print(f"[resident] enforcement error: {e}")
+
+    def start(self) -> "MemoryManager":
+        if self._thread is None and (self.budget_mb or self.idle_s):
+            self._thread = threading.Thread(target=self._run, name="resident-memory", daemon=True)
+            self._thread.start()
+        return self
+
+    def report(self) -> dict:
+        rss = self.rss()
+        return {
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "budget_mb": self.budget_mb or None,
+            "models": {model.name: model.status() for model in self.models},
+        }
+
+    def print_report(self):
+        report = self.report()
+        print(f"[resident] RSS {report['rss_mb']} MB (budget {report['budget_mb'] or 'none'})")
+        for name, status in report["models"].items():
+            size = f"{status['weights_mb']:.0f} MB" if status["weights_mb"] is not None else "?"
+            print(f"[resident]   {name:<12} {status['state']:<10} weights {size:>8}  idle {status['idle_s']:.0f}s"
+                  f"  loads {status['loads']}  offloads {status['offloads']}")
+
+
+# Shared by every model handle in the process
+manager = MemoryManager()
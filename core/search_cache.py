@@ -0,0 +1,169 @@
+# core/search_cache.py — Persistent TTL cache for search pages and resolved queries
+import json
+import os
+import sqlite3
+import string
+import threading
+import time
+from collections import Counter
+from core.config import (
+    SEARCH_CACHE_BACKEND, SEARCH_CACHE_PATH, SEARCH_CACHE_REDIS_URL, SEARCH_CACHE_MAX_ENTRIES,
+)
+
+
+def normalize_query(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a transcript, used as a cache key."""
+    return " ".join(text.lower().translate(str.maketrans('', '', string.punctuation)).split())
+
+
+class SearchCache:
+    """
+    Base class: namespaced JSON values with per-entry TTL. Subclasses implement _get/_set.
+    Hit/miss counters are kept per namespace (e.g. "query", "page").
+    """
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def get(self, namespace: str, key: str):
+        try:
+            value = self._get(namespace, key)
+        except Exception as e:
+            # A broken cache must never break a command; treat it as a miss
+            print(f"Search cache read error: {e}")
+            value = None
+        if value is None:
+            self.misses[namespace] += 1
+        else:
+            self.hits[namespace] += 1
+        return value
+
+    def set(self, namespace: str, key: str, value, ttl: float):
+        try:
+            self._set(namespace, key, value, ttl)
+        except Exception as e:
+            print(f"Search cache write error: {e}")
+
+    def delete(self, namespace: str, key: str):
+        try:
+            self._delete(namespace, key)
+        except Exception as e:
+            print(f"Search cache write error: {e}")
+
+    def stats(self) -> dict:
+        namespaces = set(self.hits) | set(self.misses)
+        return {ns: {"hits": self.hits[ns], "misses": self.misses[ns]} for ns in sorted(namespaces)}
+
+    def _get(self, namespace: str, key: str):
+        return None
+
+    def _set(self, namespace: str, key: str, value, ttl: float):
+        pass
+
+    def _delete(self, namespace: str, key: str):
+        pass
+
+
+class NullSearchCache(SearchCache):
+    """Cache disabled: every lookup misses."""
+
+
+class SQLiteSearchCache(SearchCache):
+    """Single-file store; least recently used entries are evicted once `max_entries` is exceeded."""
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Opened on first use so importing the module has no filesystem side effects
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, last_access REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        return self._conn
+
+    def _get(self, namespace: str, key: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                conn.commit()
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+            conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, namespace: str, key: str, value, ttl: float):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl, now),
+            )
+            conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+            overflow = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+            conn.commit()
+
+    def _delete(self, namespace: str, key: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.commit()
+
+
+class RedisSearchCache(SearchCache):
+    """Redis-backed store; TTLs map to SETEX and size bounds are left to the server's maxmemory policy."""
+
+    def __init__(self, url: str = SEARCH_CACHE_REDIS_URL):
+        super().__init__()
+        import redis
+        self._client = redis.Redis.from_url(url)
+
+    def _get(self, namespace: str, key: str):
+        raw = self._client.get(f"{namespace}:{key}")
+        return None if raw is None else json.loads(raw)
+
+    def _set(self, namespace: str, key: str, value, ttl: float):
+        self._client.setex(f"{namespace}:{key}", int(ttl), json.dumps(value))
+
+    def _delete(self, namespace: str, key: str):
+        self._client.delete(f"{namespace}:{key}")
+
+
+def create_search_cache(backend: str = SEARCH_CACHE_BACKEND) -> SearchCache:
+    if backend == "sqlite":
+        return SQLiteSearchCache()
+    if backend == "redis":
+        try:
+            return RedisSearchCache()
+        except ImportError:
+            print("redis package not installed; falling back to the SQLite search cache")
+            return SQLiteSearchCache()
+    if backend == "none":
+        return NullSearchCache()
+    raise ValueError(f"Unknown search cache backend: {backend}")
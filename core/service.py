@@ -1,190 +1,229 @@
 # core/service.py
-import ffmpeg
-import time
 import threading
-import core.audio_feedback as af
-import os
-from core.utils import output_filename, ffmpeg_exe, mic_name
-from core.recognizer import handle_transcription
+import core.resident as resident
+import core.tracing as tracing
+from core.config import VAD_ENABLED, STREAMING_RECOGNITION
+from core.pipeline import Pipeline, build_pipeline
+from core.recognizer import handle_transcription, StreamingTranscriber
+from core.speculation import Speculator
+from core.vad import EnergyVAD, trim_silence
 import core.spotify_player as sp
 
 # ------------------- Global variables -------------------
 is_recording = False
-recording_thread = None
-process = None
+capture = None
+streamer = None
+speculator = None
+trace = tracing.NullTrace()  # trace of the command being recorded / run (one at a time)
+pipeline = None  # stages commands run through; main() installs one, otherwise built from config
+state_lock = threading.Lock()    # serializes hotkey / VAD stop handling
+capture_lock = threading.Lock()  # guards capture / streamer swaps (held only briefly)
 
-def record_audio():
-    """
-    Record audio with FFmpeg in a separate thread.
-    """
-    global process, is_recording
 
-    try:
-        print("\nStarting FFmpeg recording...")
-        # Choose how to send the device to ffmpeg:
+def use_pipeline(stages: Pipeline) -> Pipeline:
+    global pipeline
+    pipeline = stages
+    return stages
 
-        # - If mic_name starts with @device use it directly (no quotes)
-        # - Otherwise quote it to handle spaces and parentheses
 
-        if str(mic_name).startswith('@device'):
-            input_device = f'audio={mic_name}'
-        else:
-            
-            input_device = f'audio="{mic_name}"'
-
-        # Build FFmpeg command
-        stream = (
-            ffmpeg
-            .input(input_device, f='dshow')
-            .output(output_filename, acodec='flac', ar='16000', ac=1)
-            .overwrite_output()
-        )
-
-        # Print command for debugging (exact args passed to ffmpeg)
-        args = stream.get_args()
-        # ffmpeg-python may produce args like ['-f', 'dshow', '-i', 'audio="Mic Name"', ...]
-        print("FFmpeg command:", ' '.join(args))
-
-        # Start FFmpeg processs
-        process = stream.run_async(
-            cmd=ffmpeg_exe,
-            pipe_stdin=True,
-            pipe_stdout=True,
-            pipe_stderr=True
-        )
-
-        # Verify process started
-        if not process or process.poll() is not None:
-            raise Exception("Failed to start FFmpeg process")
-
-        print("FFmpeg process started with PID:", process.pid)
-
-        # Timer loop with proper state checking
-        seconds = 0
-        while is_recording:
-            if process.poll() is not None:  # Process terminated unexpectedly
-                # read stderr non-blocking: read whatever is available
-                try:
-                    err = process.stderr.read().decode() if process.stderr else "Unknown error"
-                except Exception:
-                    err = "Could not read stderr"
-                raise Exception(f"FFmpeg process terminated unexpectedly: {err}")
-
-            print(f"Recording audio... {seconds}s", end='\r', flush=True)
-            seconds += 1
-            time.sleep(1)
+def stages() -> Pipeline:
+    if pipeline is None:
+        use_pipeline(build_pipeline())
+    return pipeline
+
+
+def start_capture(whisper_model, prompt=None):
+    """
+    Open the configured capture source and stream PCM into its in-memory ring buffer.
+    The device opens right away; VAD and streaming decode are armed once `prompt` (a feedback
+    Future) has finished playing, so the prompt itself isn't transcribed.
+    With VAD enabled, the utterance ends by itself once the speaker goes quiet.
+    """
+    global capture, is_recording
 
+    try:
+        print("\nStarting audio capture...")
+        with tracing.span("capture_start"):
+            source = stages().capture()
+            source.start()
     except Exception as e:
         print(f"\nError during recording: {str(e)}")
-        is_recording = False
-        if process and process.stderr:
-            try:
-                error = process.stderr.read().decode()
-                print(f"FFmpeg error: {error}")
-            except Exception:
-                pass
+        finish_trace(error=str(e))
+        return
+
+    with capture_lock:
+        capture = source
+        is_recording = True
+
+    if prompt is None:
+        arm_capture(whisper_model, source)
+    else:
+        prompt.add_done_callback(tracing.bind(lambda _: arm_capture(whisper_model, source, prompted=True)))
 
 
-def toggle_recording(whisper_model):
+def arm_capture(whisper_model, source, prompted: bool = False):
     """
-    Toggle recording state and handle file processing.
-    Stops FFmpeg gracefully by sending 'q' to stdin, then falls back to terminate().
+    Attach VAD and the streaming recognizer (whose stable partials drive speculative search).
+    After a prompt, what was captured while it played is dropped first; otherwise the buffer
+    keeps what start() seeded it with (the warm input's pre-roll).
     """
-    global is_recording, recording_thread, process
+    global streamer, speculator
+
+    with capture_lock:
+        if capture is not source or not is_recording:
+            return
+        if prompted:
+            source.reset()
+        if VAD_ENABLED:
+            source.on_block = make_vad_hook(whisper_model, source)
+        if STREAMING_RECOGNITION:
+            guess = speculator = Speculator() if stages().speculate else None
+            if guess:
+                guess.start()
+
+            def on_partial(text):
+                print(f"Partial: {text}")
+                if guess:
+                    guess.on_partial(text)
+
+            def on_stable(text):
+                print(f"Stable: {text}")
+                if guess:
+                    guess.on_stable(text)
+
+            # The streamer's thread reports (speculative search pages) into this command's trace
+            streamer = StreamingTranscriber(whisper_model, source.buffer, on_partial=tracing.bind(on_partial),
+                                            on_stable=tracing.bind(on_stable))
+            streamer.start()
+
+
+def make_vad_hook(whisper_model, source):
+    """Build the per-block VAD callback; it fires auto_stop once, off the audio thread."""
+    vad = EnergyVAD()
+
+    def on_block(block):
+        if vad.ended:
+            return
+        if vad.process(block):
+            print("\nSilence detected — ending utterance.")
+            # The capture callback can't stop its own stream, so finish on a worker thread
+            threading.Thread(target=auto_stop, args=(whisper_model, source), daemon=True).start()
+
+    return on_block
+
+
+def stop_capture():
+    """
+    Stop the capture source and return the buffered samples (empty array if nothing was captured).
+    """
+    global capture, is_recording
 
-    if is_recording:
-        af.initiate_tts(text="Let me look it up for you")
-        print("\nStopping recording...")
-        time.sleep(1)
+    with capture_lock:
         is_recording = False
+        source, capture = capture, None
+    if source is None:
+        return None
+    with tracing.span("capture_stop"):
+        try:
+            source.stop()
+        except Exception as e:
+            print(f"Error while stopping capture: {e}")
+        return source.buffer.get()
+
+
+def finish_trace(**attrs):
+    global trace
+    with capture_lock:
+        done, trace = trace, tracing.NullTrace()
+    tracing.end_command(done, **attrs)
+
+
+def finish_recording(whisper_model):
+    """Stop capturing, trim dead air and run the transcription -> playback chain."""
+    try:
+        with tracing.use(trace):
+            run_command(whisper_model)
+    finally:
+        finish_trace()
+
+
+def run_command(whisper_model):
+    global streamer, speculator
+
+    print("\nStopping recording...")
+    tracing.active().mark("stop")
+    audio = stop_capture()
+    with capture_lock:
+        active_streamer, streamer = streamer, None
+        active_speculator, speculator = speculator, None
+    stages().cue("searching")
+
+    speech = trim_silence(audio) if audio is not None and audio.size > 0 else None
+    if speech is None or speech.size == 0:
+        print("No speech captured")
+        stages().cue("not_found")
+        if active_streamer:
+            active_streamer.stop()
+        if active_speculator:
+            active_speculator.cancel()
+        return
 
-        if process:
-            time.sleep(0.5)
-            try:
-                # 1) Try graceful stop: send 'q' to ffmpeg stdin and wait
-                if process.stdin:
-                    try:
-                        process.stdin.write(b'q')
-                        process.stdin.flush()
-                    except Exception:
-                        # some Popen objects close stdin automatically; ignore
-                        pass
-
-                # Wait a short while for ffmpeg to finish normally
-                try:
-                    stdout, stderr = process.communicate(timeout=None)
-                except Exception:
-                    # If it doesn't exit in time, fall back to terminate
-                    print("FFmpeg didn't exit after 'q' — terminating.")
-                    try:
-                        process.terminate()
-                    except Exception:
-                        pass
-                    try:
-                        stdout, stderr = process.communicate(timeout=3)
-                    except Exception:
-                        stdout, stderr = (b'', b'Could not collect output after terminate.')
-
-                # Ensure process is cleaned up
-                if process.poll() is None:
-                    try:
-                        process.kill()
-                    except Exception:
-                        pass
-
-            except Exception as e:
-                print(f"Error while stopping FFmpeg: {e}")
-            finally:
-                # Read/print stderr (helpful diagnostics)
-                try:
-                    if stderr:
-                        print("FFmpeg stderr (on stop):")
-                        # print(stderr.decode(errors='ignore'))
-                    else:
-                        # try reading from process.stderr if still present
-                        if process and process.stderr:
-                            try:
-                                tail = process.stderr.read().decode(errors='ignore')
-                                if tail:
-                                    print("FFmpeg stderr (tail):")
-                                    # print(tail)
-                            except Exception:
-                                pass
-                except Exception:
-                    pass
-
-                process = None
-
-        if recording_thread:
-            recording_thread.join(timeout=2.0)
-            recording_thread = None
-
-        # small wait to let file system flush
-        time.sleep(1.5)
-
-        if os.path.exists(output_filename) and os.path.getsize(output_filename) > 0:
-            print(f"Recording saved ({os.path.getsize(output_filename)} bytes)")
-            try:
-                transcription = handle_transcription(whisper_model)
-                query_and_play_track(transcription)
-            except Exception as e:
-                print(f"Error during transcription: {str(e)}")
-        else:
-            print("No recording file created")
+    print(f"Captured {audio.size} samples ({speech.size} after trimming silence)")
+    try:
+        with tracing.span("transcription", streaming=active_streamer is not None, samples=int(speech.size)):
+            if active_streamer:
+                transcription = active_streamer.finish(speech)
+            else:
+                transcription = handle_transcription(whisper_model, speech)
+        query_and_play_track(transcription, active_speculator)
+    except Exception as e:
+        print(f"Error during transcription: {str(e)}")
 
-    else:
-        print("\nStarting new recording...")
-        af.initiate_tts(text="What song would you like to hear?")
-        sp.stop_current_playback()
-        is_recording = True
-        recording_thread = threading.Thread(target=record_audio, daemon=True)
-        recording_thread.start()
+
+def auto_stop(whisper_model, source):
+    """Called by the VAD; only stops if `source` is still the active recording."""
+    with state_lock:
+        if not is_recording or capture is not source:
+            return
+        finish_recording(whisper_model)
 
 
-def query_and_play_track(query):
-    chosen, chosen_name, chosen_artist, chosen_uri, chosen_score = sp.query_best_song(query)
+def toggle_recording(whisper_model):
+    """
+    Toggle recording state; on stop, hand the captured samples straight to Whisper.
+    """
+    global trace
+
+    with state_lock:
+        if is_recording:
+            finish_recording(whisper_model)
+        else:
+            print("\nStarting new recording...")
+            trace = tracing.start_command()
+            trace.mark("hotkey")
+            resident.manager.wake()  # models offloaded while idle reload while the user speaks
+            with tracing.use(trace):
+                # Prompt, pause and device start all run in parallel; capture is armed when the prompt ends
+                prompt = stages().cue("listening", interrupt=True)
+                prompt_span = trace.begin("prompt")
+                prompt.add_done_callback(lambda _: prompt_span.end())
+                threading.Thread(target=stages().pause, daemon=True).start()
+                start_capture(whisper_model, prompt)
+
+
+def query_and_play_track(query, speculator=None):
+    # Reuse page requests a speculative search already sent for this query
+    pages = speculator.adopt(query) if speculator else None
+    with tracing.span("match", query=query) as match:
+        chosen, chosen_name, chosen_artist, chosen_uri, chosen_score = stages().match(query, pages=pages)
+        match.attrs.update(uri=chosen_uri, score=chosen_score)
     if not chosen_uri:
         print("No valid track found. Skipping playback...")
+        stages().cue("not_found")
         return
-    af.initiate_tts(text=f"Currently playing - {chosen_name} by {chosen_artist}")
-    sp.play_track(chosen_uri, chosen["artists"][0]["uri"] if chosen else None)
\ No newline at end of file
+    # Track names are dynamic, so only this announcement goes through TTS; it plays while playback starts
+    stages().speak(f"Currently playing - {chosen_name} by {chosen_artist}")
+    if stages().play(chosen_uri, chosen["artists"][0]["uri"] if chosen else None):
+        command = tracing.active()
+        sp.history.record(query, (chosen, chosen_name, chosen_artist, chosen_uri, chosen_score),
+                          latencies=command.stage_ms(), trace_id=command.id)
@@ -0,0 +1,123 @@
+# core/speculation.py — Starts searching and prefetching from partial transcripts, before the user stops talking
+import threading
+from core.config import SPECULATION_PREFETCH_MIN_SCORE, SEARCH_MAX_TRACKS
+from core.query_parser import strip_command
+import core.spotify_player as sp
+import core.tracing as tracing
+
+
+class Speculator:
+    """
+    One per command. Fed by the streaming recognizer: once a partial hypothesis is stable (and
+    looks complete), it sends the page requests the final search would send, keyed the same
+    way, resolves the playback device, and for a confident candidate pre-fetches the track,
+    related-artist and top-track metadata the recommendation pipeline needs (all cached).
+
+    adopt() hands the matching in-flight pages to query_best_song(); requests for a guess that
+    turned out wrong are cancelled, and its prefetch stops at the next step.
+    """
+
+    def __init__(self, max_tracks: int = SEARCH_MAX_TRACKS, prefetch_min_score: float = SPECULATION_PREFETCH_MIN_SCORE):
+        self.max_tracks = max_tracks
+        self.prefetch_min_score = prefetch_min_score
+        self.pages = {}        # (query, limit, offset) -> Future, same keys as search_best_song
+        self.key = None        # (title, artist) currently speculated on
+        self.partial = ""
+        self.generation = 0    # bumped whenever the current guess is abandoned
+        self.closed = False
+        self.prefetcher = None  # thread of the latest guess
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Resolve the playback device while the user is still talking."""
+        sp.search_pool.submit(self._warm_device)
+
+    def _warm_device(self):
+        try:
+            sp.devices.get(sp.sp)
+        except Exception as e:
+            print(f"Device pre-resolve failed: {e}")
+
+    # ------------------- Streaming hooks -------------------
+    def on_partial(self, text: str):
+        self.partial = text
+
+    def on_stable(self, text: str):
+        query = strip_command(text)
+        title, artist = sp.split_query(query)
+        # Only guess once the whole hypothesis is agreed on: a stable prefix that already names
+        # an artist ("blinding lights by the") may still be growing. A trailing "by" means the
+        # artist is still coming.
+        complete = text.split() == self.partial.split()
+        if not complete or query.endswith(" by") or query == "by":
+            return
+        with self._lock:
+            if self.closed or (title, artist) == self.key:
+                return
+            self._cancel_locked()
+            self.key = (title, artist)
+            generation = self.generation
+            futures = sp.submit_pages(title, self.max_tracks, self.pages)
+            if artist:
+                sp.submit_pages(query, self.max_tracks, self.pages)
+        print(f"Speculating: '{title}'" + (f" by '{artist}'" if artist else ""))
+        self.prefetcher = threading.Thread(target=tracing.bind(self._prefetch), args=(futures, title, artist, generation),
+                                           daemon=True)
+        self.prefetcher.start()
+
+    # ------------------- Prefetch -------------------
+    def _stale(self, generation: int) -> bool:
+        return generation != self.generation
+
+    def _prefetch(self, futures, title, artist, generation):
+        try:
+            tracks = sp.collect_pages(futures)
+        except Exception:  # cancelled or failed; the final search will retry
+            return
+        if self._stale(generation):
+            return
+        best, name, _, uri, score = sp.score_tracks(tracks, title, artist, query_name="Speculative")
+        if best is None or score < self.prefetch_min_score or "id" not in best:
+            return
+        # Search items already carry the artist ids, so the track lookup costs no request
+        info = sp.remember_track(best)
+        for artist_info in info["artists"]:
+            if self._stale(generation):
+                return
+            related_ids = sp.related_artist_ids(artist_info["id"])
+            for artist_id in related_ids:
+                if self._stale(generation):
+                    return
+                sp.artist_top_tracks(artist_id)
+        print(f"Prefetched recommendation metadata for {name}")
+
+    # ------------------- Hand-over -------------------
+    def _cancel_locked(self, keep: set[str] = frozenset()):
+        self.generation += 1
+        for key, future in self.pages.items():
+            if key[0] not in keep:
+                future.cancel()
+        # Requests already running stay (they finish into the page cache); cancelled ones must
+        # not be picked up again by a later guess with the same key
+        self.pages = {key: future for key, future in self.pages.items() if not future.cancelled()}
+
+    def adopt(self, query: str) -> dict:
+        """Pages for the final `query` (possibly still in flight); everything else is cancelled."""
+        query = strip_command(query)
+        title, artist = sp.split_query(query)
+        wanted = {title.lower().strip(), query.lower().strip()}
+        with self._lock:
+            self.closed = True
+            hit = self.key == (title, artist)
+            if not hit:
+                self._cancel_locked(keep=wanted)
+            pages = {key: future for key, future in self.pages.items() if key[0] in wanted}
+        if self.key is not None:
+            print(f"Speculation {'hit' if hit else 'miss'} ({len(pages)} pages reused)")
+            tracing.active().mark("speculation_hit" if hit else "speculation_miss")
+        return pages
+
+    def cancel(self):
+        with self._lock:
+            self.closed = True
+            self._cancel_locked()
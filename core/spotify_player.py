@@ -1,70 +1,212 @@
 # spotify_player.py — Handles querying & playing songs + AUTH
 import os
 import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-from rapidfuzz import fuzz
+import numpy as np
+from rapidfuzz import fuzz, process
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
+from core.config import (
+    QUERY_CACHE_TTL_S, PAGE_CACHE_TTL_S, LIBRARY_INDEX_ENABLED, LIBRARY_SYNC_INTERVAL_H,
+    ARTIST_CACHE_TTL_S, TOP_TRACKS_CACHE_TTL_S, QUEUE_REQUEST_INTERVAL_S, SPOTIFY_TIMEOUT_S,
+    HISTORY_PRIOR_WEIGHT, MATCH_CONFIDENCE_THRESHOLD, MATCH_ARTIST_THRESHOLD, SEARCH_MAX_TRACKS,
+)
+from core.history import create_history
+from core.spotify_transport import build_session, DeviceCache, TokenRefresher, is_no_active_device, is_rate_limited
+from core.query_parser import parse_song_request, strip_command
+from core.search_cache import create_search_cache
+from core.startup import LazyHandle
+import core.tracing as tracing
+from core.track_index import TrackIndex
 
-load_dotenv()
-
-CLIENT_ID = os.getenv("CLIENT_ID")
-CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = "http://127.0.0.1:8888/callback"
-SCOPE = "user-read-playback-state user-modify-playback-state user-read-currently-playing user-read-private"
+SCOPE = (
+    "user-read-playback-state user-modify-playback-state user-read-currently-playing user-read-private "
+    "user-library-read playlist-read-private user-read-recently-played"
+)
+
+# ------------------- Spotify clients -------------------
+# Both clients (and their auth managers) share one pooled keep-alive session
+session = build_session()
+
+
+def credentials() -> tuple[str | None, str | None]:
+    load_dotenv()  # read when a client is first built, not on import
+    return os.getenv("CLIENT_ID"), os.getenv("CLIENT_SECRET")
+
+
+def create_user_client():
+    client_id, client_secret = credentials()
+    return spotipy.Spotify(auth_manager=SpotifyOAuth(
+        client_id=client_id,
+        client_secret=client_secret,
+        redirect_uri=REDIRECT_URI,
+        scope=SCOPE,
+        requests_session=session
+    ), requests_session=session, requests_timeout=SPOTIFY_TIMEOUT_S)
+
+
+def create_app_client():
+    client_id, client_secret = credentials()
+    return spotipy.Spotify(auth_manager=SpotifyClientCredentials(
+        client_id=client_id,
+        client_secret=client_secret,
+        requests_session=session
+    ), requests_session=session, requests_timeout=SPOTIFY_TIMEOUT_S)
+
+
+# Built on first use, so importing this module needs no credentials
+sp = LazyHandle("spotify-user", create_user_client)
+sp_client = LazyHandle("spotify-app", create_app_client)
+
+devices = DeviceCache()
+token_refresher = TokenRefresher([])
+
+
+def warm_up():
+    """
+    Fetch (or refresh) both access tokens now so the first command skips the auth round-trips,
+    then keep renewing them in the background before they expire.
+    """
+    token_refresher.auth_managers = [sp.auth_manager, sp_client.auth_manager]
+    token_refresher.refresh()
+    token_refresher.start()
+
+
+def on_device(action):
+    """
+    Run action(device_id) on the cached device. A 404 (no active device) drops the cached id
+    and retries once with a fresh lookup. Returns None when no device is available.
+    """
+    device_id = devices.get(sp)
+    if not device_id:
+        print("No active Spotify devices detected")
+        return None
+    try:
+        return action(device_id)
+    except spotipy.exceptions.SpotifyException as e:
+        if not is_no_active_device(e):
+            raise
+        devices.invalidate()
+        device_id = devices.get(sp)
+        if not device_id:
+            print("No active Spotify devices detected")
+            return None
+        return action(device_id)
 
-# Spotify clients
-sp = spotipy.Spotify(auth_manager=SpotifyOAuth(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET,
-    redirect_uri=REDIRECT_URI,
-    scope=SCOPE
-))
 
-sp_client = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
+# ------------------- Search Helpers -------------------
+SEARCH_PAGE_LIMIT = 50
 
+# Shared pool for search page requests (both strategies, all pages, in flight at once)
+search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="spotify-search")
 
-# ------------------- Search Helpers -------------------
-def regular_query(query: str, max_tracks: int = 100, artist_name: str | None = None, artist_threshold: int = 40, query_name: str = "Regular Query"):
-    """Search Spotify tracks with fuzzy scoring."""
-    tracks = []
-    offset = 0
-    limit = 50
 
-    while len(tracks) < max_tracks:
-        result = sp.search(q=query, type="track", limit=limit, offset=offset)
-        items = result.get("tracks", {}).get("items", [])
-        if not items:
-            break
+# Persistent cache: raw search pages and transcripts that resolved confidently
+search_cache = create_search_cache()
+
+def forget_answer(transcript: str, uri: str):
+    """The user skipped `uri`: stop serving it as the pinned answer to that request."""
+    key = strip_command(transcript)
+    cached = search_cache.get("query", key)
+    if cached is not None and cached[3] == uri:
+        search_cache.delete("query", key)
+
+
+# Played commands, skips and the usage priors used in ranking (see core/history.py)
+history = create_history(on_skip=forget_answer)
+
+
+def search_page(query: str, limit: int, offset: int) -> list:
+    key = f"{query}|{limit}|{offset}"
+    with tracing.span("search_page", offset=offset) as page:
+        items = search_cache.get("page", key)
+        page.attrs["cached"] = items is not None
+        if items is None:
+            result = sp.search(q=query, type="track", limit=limit, offset=offset)
+            items = result.get("tracks", {}).get("items", [])
+            search_cache.set("page", key, items, PAGE_CACHE_TTL_S)
+    return items
+
+
+def submit_pages(query: str, max_tracks: int, pages: dict, limit: int = SEARCH_PAGE_LIMIT) -> list:
+    """
+    Start every page request needed for `max_tracks` results at once. `pages` maps
+    (normalized query, limit, offset) -> Future and is shared between strategies, so identical
+    requests are only sent once. A short page cancels the later pages that haven't been sent yet.
+    """
+    futures = []
+    for offset in range(0, max_tracks, limit):
+        key = (query.lower().strip(), limit, offset)
+        if key not in pages:
+            pages[key] = search_pool.submit(tracing.bind(search_page), *key)
+        futures.append(pages[key])
+    for i, future in enumerate(futures[:-1]):
+        future.add_done_callback(lambda done, later=futures[i + 1:]: stop_paging(done, later, limit))
+    return futures
+
+
+def stop_paging(page: Future, later: list, limit: int):
+    if not page.cancelled() and page.exception() is None and len(page.result()) < limit:
+        for future in later:
+            future.cancel()
+
+
+def pages_ready(futures: list, limit: int = SEARCH_PAGE_LIMIT) -> bool:
+    """True once every page up to (and including) the first short page has arrived."""
+    for future in futures:
+        if not future.done():
+            return False
+        if len(future.result()) < limit:
+            return True
+    return True
+
+
+def collect_pages(futures: list, limit: int = SEARCH_PAGE_LIMIT) -> list:
+    tracks = []
+    for future in futures:
+        items = future.result()
         tracks.extend(items)
         if len(items) < limit:
             break
-        offset += limit
+    return tracks
 
+
+def score_tracks(tracks: list, query: str, artist_name: str | None = None, artist_threshold: int = MATCH_ARTIST_THRESHOLD, query_name: str = "Regular Query"):
+    """Fuzzy-score candidate tracks against the query (and optional artist); returns the best match."""
     if not tracks:
         return None, None, None, None, 0
 
-    # Fuzzy matching
-    best_match, best_score = None, 0
-    query_lower = query.lower()
-    for track in tracks:
-        title_score = fuzz.token_set_ratio(query_lower, track["name"].lower())
-        artist_score = 0
+    with tracing.span("scoring", strategy=query_name, candidates=len(tracks)):
+        # Normalize every candidate string once into flat arrays; artists carry their track index
+        titles = [track["name"].lower() for track in tracks]
+        artists = [a["name"].lower() for track in tracks for a in track["artists"]]
+        owners = np.fromiter((i for i, track in enumerate(tracks) for _ in track["artists"]), dtype=np.intp, count=len(artists))
+
+        # One batched cdist call per query string: the title against every title, the artist
+        # against every artist (no title x artist cross terms)
+        title_scores = process.cdist([query.lower()], titles, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1)[0]
+
+        artist_scores = np.zeros(len(tracks))
         if artist_name:
-            artist_scores = [fuzz.token_set_ratio(artist_name.lower(), a["name"].lower()) for a in track["artists"]]
-            artist_score = max(artist_scores)
-            if artist_score < artist_threshold:
-                continue
-        combined_score = 0.7 * title_score + 0.3 * artist_score
-        if combined_score > best_score:
-            best_match = track
-            best_score = combined_score
-
-    if not best_match:
+            scores = process.cdist([artist_name.lower()], artists, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1)[0]
+            np.maximum.at(artist_scores, owners, scores)
+
+        # Weighted combination + threshold filtering (tracks with no good artist match are dropped)
+        combined = 0.7 * title_scores + 0.3 * artist_scores
+        if artist_name:
+            combined[artist_scores < artist_threshold] = 0
+        # Usage prior: what the user keeps playing (and doesn't skip) wins close calls
+        if HISTORY_PRIOR_WEIGHT:
+            priors = history.priors([track["uri"] for track in tracks])
+            combined = np.where(combined > 0, combined + HISTORY_PRIOR_WEIGHT * priors, 0)
+        best_index = int(np.argmax(combined))
+        best_score = float(combined[best_index])
+    if best_score <= 0:
         return None, None, None, None, 0
+    best_match = tracks[best_index]
 
     track_name = best_match["name"]
     artist_name_final = ", ".join([a["name"] for a in best_match["artists"]])
@@ -75,47 +217,139 @@ def regular_query(query: str, max_tracks: int = 100, artist_name: str | None = N
     return best_match, track_name, artist_name_final, uri, best_score
 
 
+def regular_query(query: str, max_tracks: int = SEARCH_MAX_TRACKS, artist_name: str | None = None, artist_threshold: int = MATCH_ARTIST_THRESHOLD, query_name: str = "Regular Query"):
+    """Search Spotify tracks with fuzzy scoring."""
+    tracks = collect_pages(submit_pages(query, max_tracks, {}))
+    return score_tracks(tracks, query, artist_name, artist_threshold, query_name)
+
+
 def simplify_title(title: str) -> str:
     """Remove '(feat. ...)' or '(with ...)' from titles."""
     return re.sub(r'\(feat[^\)]*\)|\(with[^\)]*\)', '', title, flags=re.IGNORECASE).strip()
 
 
-def new_query(query: str, max_tracks: int = 100, artist_threshold: int = 40):
+def split_query(query: str):
+    """Split 'title by artist' into (title, artist); artist is None when there is no ' by '."""
+    return parse_song_request(query)
+
+
+def new_query(query: str, max_tracks: int = SEARCH_MAX_TRACKS, artist_threshold: int = MATCH_ARTIST_THRESHOLD):
     """Artist-aware fuzzy search."""
-    query_lower = query.lower()
-    if " by " in query_lower:
-        track_name, artist_name = map(str.strip, query_lower.split(" by ", 1))
-    else:
-        track_name, artist_name = query_lower, None
+    track_name, artist_name = split_query(query)
     return regular_query(track_name, max_tracks=max_tracks, artist_name=artist_name, artist_threshold=artist_threshold, query_name="New Query")
 
 
-def query_best_song(query: str, max_tracks: int = 100, confidence_threshold: int = 94):
-    """Return the best matching track based on fuzzy scoring."""
-    new_track, new_name, new_artist, new_uri, new_score = new_query(query, max_tracks)
-    if new_score >= confidence_threshold:
-        print(f"Chosen Track (artist-aware): {new_name} - {new_artist} | Score: {new_score}")
-        return new_track, new_name, new_artist, new_uri, new_score
+# ------------------- Local library -------------------
+library = LazyHandle("library", TrackIndex.load)
 
-    reg_track, reg_name, reg_artist, reg_uri, reg_score = regular_query(query, max_tracks)
-    if reg_score >= confidence_threshold:
-        print(f"Chosen Track (regular fallback): {reg_name} - {reg_artist} | Score: {reg_score}")
-        return reg_track, reg_name, reg_artist, reg_uri, reg_score
 
-    chosen = (new_track, new_name, new_artist, new_uri, new_score) if new_score >= reg_score else (reg_track, reg_name, reg_artist, reg_uri, reg_score)
+def refresh_library(force: bool = False):
+    """
+    Pull what changed in saved tracks, playlists and play history since the last sync into the
+    local index and persist it; at most once every LIBRARY_SYNC_INTERVAL_H unless forced.
+    """
+    if not force and library.synced_within(LIBRARY_SYNC_INTERVAL_H * 3600):
+        print("Library index is recent; skipping sync")
+        return
+    added = library.add_from_spotify(sp)
+    library.save()
+    print(f"Library index refreshed: {added} new tracks ({len(library.get())} total)")
+
+
+def library_query(query: str, artist_threshold: int = MATCH_ARTIST_THRESHOLD):
+    """Match against the local index only (no network); same result tuple as regular_query."""
+    track_name, artist_name = split_query(query)
+    candidates = library.candidates(f"{track_name} {artist_name or ''}")
+    return score_tracks(candidates, track_name, artist_name, artist_threshold, query_name="Library")
+
+
+def query_best_song(query: str, max_tracks: int = SEARCH_MAX_TRACKS, confidence_threshold: int = MATCH_CONFIDENCE_THRESHOLD, pages: dict | None = None):
+    """
+    Return the best matching track: query cache first, then the user's habitual answer from the
+    command history, then the local library index, and the search API only when none of those
+    is confident enough. `pages` may hold page requests already in
+    flight (see core/speculation.py); matching ones are reused instead of sent again.
+    """
+    query = strip_command(query)  # "play X please" and "X" are the same request
+    cache_key = query
+    cached = search_cache.get("query", cache_key)
+    if cached is not None:
+        print(f"Chosen Track (cached): {cached[1]} - {cached[2]} | Score: {cached[4]}")
+        return tuple(cached)
+
+    favourite = history.favourite(query)
+    if favourite is not None:
+        print(f"Chosen Track (history): {favourite[1]} - {favourite[2]} | Score: {favourite[4]}")
+        return tuple(favourite)
+
+    chosen = library_query(query) if LIBRARY_INDEX_ENABLED else (None, None, None, None, 0)
+    if chosen[4] >= confidence_threshold:
+        print(f"Chosen Track (library): {chosen[1]} - {chosen[2]} | Score: {chosen[4]}")
+    else:
+        chosen = search_best_song(query, max_tracks, confidence_threshold, pages)
+    # Only confident answers are pinned; anything weaker is re-scored (from cached pages) next time
+    if chosen[3] and chosen[4] >= confidence_threshold:
+        search_cache.set("query", cache_key, list(chosen), QUERY_CACHE_TTL_S)
+    print(f"Search cache: {search_cache.stats()}")
+    return chosen
+
+
+def search_best_song(query: str, max_tracks: int = SEARCH_MAX_TRACKS, confidence_threshold: int = MATCH_CONFIDENCE_THRESHOLD, pages: dict | None = None):
+    """
+    Return the best matching track based on fuzzy scoring.
+
+    The artist-aware and regular strategies (and all their pages) are fetched concurrently with
+    identical requests deduplicated. The artist-aware result still decides first: once it clears
+    `confidence_threshold` the remaining requests are cancelled, otherwise the better of the two wins.
+    """
+    track_name, artist_name = split_query(query)
+    pages = {} if pages is None else pages
+    strategies = [("artist-aware", submit_pages(track_name, max_tracks, pages), track_name, artist_name, "New Query")]
+    if artist_name:
+        # Without ' by ' both strategies would score the very same pages the same way
+        strategies.append(("regular fallback", submit_pages(query, max_tracks, pages), query, None, "Regular Query"))
+
+    results = []
+    for label, futures, strategy_query, strategy_artist, query_name in strategies:
+        wait_for_pages(futures)
+        result = score_tracks(collect_pages(futures), strategy_query, strategy_artist, query_name=query_name)
+        if result[4] >= confidence_threshold:
+            for future in pages.values():
+                future.cancel()
+            print(f"Chosen Track ({label}): {result[1]} - {result[2]} | Score: {result[4]}")
+            return result
+        results.append(result)
+
+    chosen = max(results, key=lambda result: result[4])  # ties keep the artist-aware result
     print(f"Choosing best available: {chosen[1]} - {chosen[2]} | Score: {chosen[4]}")
     return chosen
 
 
+def wait_for_pages(futures: list):
+    """Block until pages_ready(futures): later pages after a short one aren't waited for."""
+    while not pages_ready(futures):
+        wait([future for future in futures if not future.done()], return_when=FIRST_COMPLETED)
+
+
 # ------------------- Playback Helpers -------------------
 def get_track_info(track_id: str) -> dict | None:
+    cached = search_cache.get("track", track_id)
+    if cached is not None:
+        return cached
     try:
-        return sp_client.track(track_id)
+        return remember_track(sp_client.track(track_id))
     except Exception as e:
         print(f"Error fetching track info: {e}")
         return None
 
 
+def remember_track(track: dict) -> dict:
+    """Cache what the recommendation pipeline needs from a full track object (search items included)."""
+    info = {"name": track["name"], "artists": [{"id": a["id"], "name": a["name"]} for a in track["artists"] if a.get("id")]}
+    search_cache.set("track", track["id"], info, ARTIST_CACHE_TTL_S)
+    return info
+
+
 def get_artist_info(artist_id: str) -> dict | None:
     try:
         return sp_client.artist_related_artists(artist_id)
@@ -124,70 +358,139 @@ def get_artist_info(artist_id: str) -> dict | None:
         return None
 
 
-def play_track(uri: str, artist_uri: str | None = None):
-    """Play a track and queue recommendations based on related artists."""
-    devices = sp.devices().get("devices", [])
-    if not devices:
-        print("No active Spotify devices detected [NEED TTS]")
-        return
-    device_id = devices[0]["id"]
-
-    sp.start_playback(device_id=device_id, uris=[uri])
+def play_track(uri: str, artist_uri: str | None = None) -> bool:
+    """
+    Play a track and queue recommendations (in the background) based on related artists.
+    Returns False when no device was available.
+    """
+    def start(device_id):
+        sp.start_playback(device_id=device_id, uris=[uri])
+        return device_id
+
+    with tracing.span("playback_start"):
+        device_id = on_device(start)
+    if not device_id:
+        return False
+    tracing.active().mark("playing")
     print(f"Now playing: {uri}")
 
     if artist_uri:
-        queue_recommendations(uri, artist_uri=artist_uri, max_results=20)
+        queue_recommendations_async(uri, artist_uri=artist_uri, max_results=20, device_id=device_id)
+    return True
+
+
+# ------------------- Recommendation pipeline -------------------
+# Fan-out pool for artist lookups; the single-worker pool runs whole pipelines one after another
+# so queue order stays stable across commands and the hotkey thread never waits on them.
+recommendation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="spotify-recs")
+recommendation_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spotify-queue")
+
+
+def spotify_id(uri: str) -> str:
+    return uri.split(":")[-1] if ":" in uri else uri.split("/")[-1]
+
+
+def related_artist_ids(artist_id: str) -> list[str]:
+    cached = search_cache.get("related", artist_id)
+    if cached is not None:
+        return cached
+    artist_info = get_artist_info(artist_id)
+    if not artist_info:
+        return []
+    ids = [a["id"] for a in artist_info["artists"]]
+    search_cache.set("related", artist_id, ids, ARTIST_CACHE_TTL_S)
+    return ids
 
 
-def queue_recommendations(track_uri, artist_uri = None, max_results = 30):
+def artist_top_tracks(artist_id: str) -> list[dict]:
+    cached = search_cache.get("top_tracks", artist_id)
+    if cached is not None:
+        return cached
+    try:
+        tracks = sp_client.artist_top_tracks(artist_id).get("tracks", [])
+    except Exception as e:
+        print(f"Error fetching top tracks for artist {artist_id}: {e}")
+        return []
+    tracks = [{"uri": t["uri"], "name": t["name"]} for t in tracks]
+    search_cache.set("top_tracks", artist_id, tracks, TOP_TRACKS_CACHE_TTL_S)
+    return tracks
+
+
+def queue_recommendations(track_uri, artist_uri = None, max_results = 30, device_id = None):
     """Queue recommended tracks using related artists and their top tracks."""
-    track_id = track_uri.split(":")[-1] if ":" in track_uri else track_uri.split("/")[-1]
+    track_id = spotify_id(track_uri)
 
     track_info = get_track_info(track_id)
     if not track_info:
         print(f"Cannot fetch track info for {track_id}")
         return []
 
-    related_artist_ids = [a["id"] for artist in track_info["artists"] if (artist_info := get_artist_info(artist["id"])) for a in artist_info["artists"]]
+    # Related artists of every track artist, fetched concurrently (and cached)
+    related_lists = recommendation_pool.map(related_artist_ids, [artist["id"] for artist in track_info["artists"]])
+    related_ids = list(dict.fromkeys(artist_id for ids in related_lists for artist_id in ids))
 
     if artist_uri:
-        artist_id = artist_uri.split(":")[-1] if ":" in artist_uri else artist_uri.split("/")[-1]
-        if artist_id not in related_artist_ids:
-            related_artist_ids.append(artist_id)
+        artist_id = spotify_id(artist_uri)
+        if artist_id not in related_ids:
+            related_ids.append(artist_id)
 
-    if not related_artist_ids:
+    if not related_ids:
         print("No related artists found for recommendations.")
         return []
 
-    recommended_tracks = []
-    for artist_id in related_artist_ids:
-        try:
-            recommended_tracks.extend(sp_client.artist_top_tracks(artist_id).get("tracks", []))
-        except Exception as e:
-            print(f"Error fetching top tracks for artist {artist_id}: {e}")
-
+    # Top tracks for all related artists concurrently; map() keeps the original artist order
+    recommended_tracks = [t for tracks in recommendation_pool.map(artist_top_tracks, related_ids) for t in tracks]
     if not recommended_tracks:
         print("No recommended tracks found.")
         return []
 
     recommended_tracks = recommended_tracks[:max_results]
 
-    devices = sp.devices().get("devices", [])
-    if not devices:
-        print("No active Spotify devices detected [NEED TTS]")
-        return []
-
-    device_id = devices[0]["id"]
+    # add_to_queue must stay sequential to keep the order. The shared transport already waits out
+    # Retry-After on a 429; only once a 429 gets through anyway are the remaining calls paced.
+    paced = False
     for t in recommended_tracks:
+        if paced:
+            time.sleep(QUEUE_REQUEST_INTERVAL_S)
         try:
-            sp.add_to_queue(t["uri"], device_id=device_id)
+            if device_id is None:
+                on_device(lambda d: sp.add_to_queue(t["uri"], device_id=d))
+            else:
+                sp.add_to_queue(t["uri"], device_id=device_id)
         except Exception as e:
             print(f"Error adding track {t['uri']} to queue: {e}")
+            if is_no_active_device(e):
+                devices.invalidate()
+                device_id = None
+            elif is_rate_limited(e):
+                paced = True
 
     print(f"Queued {len(recommended_tracks)} recommended tracks based on {track_info['name']}")
     return recommended_tracks
 
 
+def queue_recommendations_async(track_uri, artist_uri = None, max_results = 30, device_id = None):
+    """Run queue_recommendations on the background pipeline; returns a Future."""
+    # The command's trace stays open until the pipeline has queued its tracks
+    trace = tracing.active().hold()
+
+    def run():
+        try:
+            with trace.span("recommendations"):
+                return queue_recommendations(track_uri, artist_uri, max_results, device_id)
+        finally:
+            trace.release()
+
+    future = recommendation_worker.submit(run)
+    future.add_done_callback(log_pipeline_error)
+    return future
+
+
+def log_pipeline_error(future):
+    if future.exception() is not None:
+        print(f"Recommendation pipeline error: {future.exception()}")
+
+
 def stop_current_playback():
     try:
         sp.pause_playback()
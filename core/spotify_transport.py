@@ -0,0 +1,119 @@
+# core/spotify_transport.py — Shared keep-alive HTTP transport, device cache and token refresh
+import threading
+import time
+import requests
+import spotipy
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.config import (
+    SPOTIFY_POOL_SIZE, MAX_RETRY_AFTER_S, RATE_LIMIT_RETRIES, DEVICE_CACHE_TTL_S, TOKEN_REFRESH_INTERVAL_S,
+)
+
+
+class CappedRetry(Retry):
+    """
+    Honours Retry-After on 429/503, but never sleeps longer than MAX_RETRY_AFTER_S. Only GETs
+    are resent after a 5xx or a read error: a POST/PUT may already have been applied (a track
+    queued twice), so those are retried on 429 only, which Spotify sends before doing anything.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER_S)
+
+
+def build_session(pool_size: int = SPOTIFY_POOL_SIZE) -> requests.Session:
+    """
+    One pooled session for every Spotify call (API and auth), sized for the concurrent search
+    and recommendation pools, so connections and TLS sessions are reused. 429s are retried
+    uniformly here instead of at each call site.
+    """
+    retry = CappedRetry(
+        total=RATE_LIMIT_RETRIES,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),  # 5xx / read-error retries; 429 is retried for every method
+        backoff_factor=0.3,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# ------------------- Active device -------------------
+def is_no_active_device(error: Exception) -> bool:
+    """A player 404 saying there is no device to play on (not an unknown track or endpoint)."""
+    if not isinstance(error, spotipy.exceptions.SpotifyException) or error.http_status != 404:
+        return False
+    return error.reason == "NO_ACTIVE_DEVICE" or "no active device" in str(error.msg).lower()
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """A 429 that outlasted the transport's own Retry-After retries."""
+    return isinstance(error, spotipy.exceptions.SpotifyException) and error.http_status == 429
+
+
+class DeviceCache:
+    """Short-TTL cache of the device id to play on; invalidate() it when Spotify says 404."""
+
+    def __init__(self, ttl: float = DEVICE_CACHE_TTL_S):
+        self.ttl = ttl
+        self._device_id = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, client) -> str | None:
+        with self._lock:
+            if self._device_id and time.monotonic() < self._expires_at:
+                return self._device_id
+        devices = client.devices().get("devices", [])
+        # Prefer the device that is currently active, fall back to the first one listed
+        device = next((d for d in devices if d.get("is_active")), devices[0] if devices else None)
+        with self._lock:
+            self._device_id = device["id"] if device else None
+            self._expires_at = time.monotonic() + self.ttl
+            return self._device_id
+
+    def invalidate(self):
+        with self._lock:
+            self._device_id = None
+            self._expires_at = 0.0
+
+
+# ------------------- Token refresh -------------------
+class TokenRefresher:
+    """Background thread that renews access tokens before they expire, off the command path."""
+
+    def __init__(self, auth_managers, interval: float = TOKEN_REFRESH_INTERVAL_S):
+        self.auth_managers = auth_managers
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        for auth_manager in self.auth_managers:
+            try:
+                # spotipy renews the token when it is within 60 s of expiring
+                auth_manager.get_access_token(as_dict=False)
+            except Exception as e:
+                print(f"Token refresh error: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
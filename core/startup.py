@@ -0,0 +1,85 @@
+# core/startup.py — Loads heavy components concurrently behind lazy handles
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class LazyHandle:
+    """
+    Stand-in for a value that is expensive to build (a model, a client, a device probe).
+
+    start(executor) begins loading on a background thread; get() blocks only until that load
+    finishes. If nothing started it, the first get() loads inline. Attribute access is proxied,
+    so a handle can be passed anywhere the real object is expected (e.g. handle.transcribe(...)).
+    """
+
+    def __init__(self, name: str, loader):
+        self.name = name
+        self.load_time = None
+        self._loader = loader
+        self._future = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            return self._loader()
+        finally:
+            self.load_time = time.perf_counter() - start
+            print(f"[startup] {self.name} ready in {self.load_time:.2f}s")
+
+    def start(self, executor: ThreadPoolExecutor) -> "LazyHandle":
+        with self._lock:
+            if self._future is None:
+                self._future = executor.submit(self._load)
+        return self
+
+    def get(self):
+        owner = False
+        with self._lock:
+            if self._future is None:
+                self._future = Future()
+                owner = True
+        if owner:
+            try:
+                self._future.set_result(self._load())
+            except Exception as e:
+                self._future.set_exception(e)
+        return self._future.result()
+
+    def ready(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def __getattr__(self, attr):
+        # Only reached for attributes the handle itself doesn't have
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+class StartupOrchestrator:
+    """Runs component loaders on a thread pool and logs per-component startup timings."""
+
+    def __init__(self, max_workers: int = 4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self.handles: list[LazyHandle] = []
+        self.started_at = time.perf_counter()
+
+    def start(self, handle: LazyHandle) -> LazyHandle:
+        self.handles.append(handle.start(self.executor))
+        return handle
+
+    def submit(self, name: str, loader) -> LazyHandle:
+        return self.start(LazyHandle(name, loader))
+
+    def report(self):
+        """Block until every component finished, then print a timing summary."""
+        wait([h._future for h in self.handles])
+        print(f"[startup] all components ready after {time.perf_counter() - self.started_at:.2f}s")
+        for handle in self.handles:
+            error = handle._future.exception()
+            status = f"FAILED ({error})" if error else f"{handle.load_time:.2f}s"
+            print(f"[startup]   {handle.name:<12} {status}")
+
+    def report_in_background(self):
+        threading.Thread(target=self.report, daemon=True).start()
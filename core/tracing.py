@@ -0,0 +1,264 @@
+# core/tracing.py — Per-command latency spans, JSON-lines records and rolling percentiles
+import contextvars
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import numpy as np
+from core.config import (
+    TRACE_ENABLED, TRACE_PATH, TRACE_WINDOW, TRACE_SUMMARY_EVERY, TRACE_PROFILE_STAGES, TRACE_TRACEMALLOC_STAGES,
+)
+
+
+class Span:
+    """One timed stage. Created by CommandTrace.begin(); end() may be called from any thread."""
+
+    def __init__(self, trace: "CommandTrace", name: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.start = time.monotonic()
+        self.end_time = None
+
+    def end(self, **attrs):
+        if self.end_time is None:
+            self.end_time = time.monotonic()
+            self.attrs.update(attrs)
+            self.trace._record(self)
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round((self.end_time - self.start) * 1000, 2),
+            **self.attrs,
+        }
+
+
+class CommandTrace:
+    """
+    All spans of one voice command. The trace is written once the last holder releases it, so
+    work that outlives the hotkey handler (e.g. recommendation queueing) still lands in it as
+    its own spans. total_ms is the command's latency (hotkey -> playing, or -> the end of the
+    command if nothing played); elapsed_ms includes that background work.
+    """
+
+    def __init__(self, recorder: "TraceRecorder", **attrs):
+        self.recorder = recorder
+        self.id = uuid.uuid4().hex[:12]
+        self.attrs = attrs
+        self.origin = time.monotonic()
+        self.wall_time = time.time()
+        self.spans: list[Span] = []
+        self.marks: dict[str, float] = {}
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        """Point-in-time event (e.g. hotkey press), stored as ms since the trace started."""
+        with self._lock:
+            self.marks[name] = round((time.monotonic() - self.origin) * 1000, 2)
+
+    def begin(self, name: str, **attrs) -> Span:
+        return Span(self, name, attrs)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        profiler = cProfile.Profile() if name in TRACE_PROFILE_STAGES else None
+        trace_memory = name in TRACE_TRACEMALLOC_STAGES
+        if trace_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        current = self.begin(name, **attrs)
+        if profiler:
+            profiler.enable()
+        try:
+            yield current
+        finally:
+            if profiler:
+                profiler.disable()
+                current.attrs["profile"] = self.recorder.dump_profile(profiler, self.id, name)
+            if trace_memory:
+                current.attrs["alloc_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                if started_tracing:
+                    tracemalloc.stop()
+            current.end()
+
+    def _record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def stage_ms(self) -> dict:
+        """Duration of each finished stage so far (ms, repeated stages summed)."""
+        per_stage = defaultdict(float)
+        with self._lock:
+            for span in self.spans:
+                per_stage[span.name] += (span.end_time - span.start) * 1000
+        return {name: round(duration, 2) for name, duration in per_stage.items()}
+
+    def hold(self) -> "CommandTrace":
+        with self._lock:
+            self._holds += 1
+        return self
+
+    def release(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+            self._holds -= 1
+            done = self._holds == 0
+        if done:
+            self.recorder.finish(self)
+
+    def as_dict(self) -> dict:
+        elapsed = round((time.monotonic() - self.origin) * 1000, 2)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+            return {
+                "id": self.id,
+                "timestamp": self.wall_time,
+                "total_ms": self.marks.get("playing", self.marks.get("end", elapsed)),
+                "elapsed_ms": elapsed,
+                "marks": dict(self.marks),
+                "spans": [s.as_dict(self.origin) for s in spans],
+                **self.attrs,
+            }
+
+
+class NullTrace:
+    """Used when no command is active or tracing is disabled; every call is a no-op."""
+    id = None
+
+    def mark(self, name):
+        pass
+
+    def begin(self, name, **attrs):
+        return NullSpan()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield NullSpan()
+
+    def stage_ms(self):
+        return {}
+
+    def hold(self):
+        return self
+
+    def release(self, **attrs):
+        pass
+
+
+class NullSpan:
+    def __init__(self):
+        self.attrs = {}
+
+    def end(self, **attrs):
+        pass
+
+
+class TraceRecorder:
+    """Appends finished traces to a JSON-lines file and keeps rolling per-stage latency windows."""
+
+    def __init__(self, path: str | None = TRACE_PATH, window: int = TRACE_WINDOW):
+        self.path = path
+        self.window = window
+        self.durations = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def finish(self, trace: CommandTrace):
+        record = trace.as_dict()
+        with self._lock:
+            self.durations["total"].append(record["total_ms"])
+            # Repeated stages (e.g. several search pages) are summed per command
+            per_stage = defaultdict(float)
+            for span in record["spans"]:
+                per_stage[span["name"]] += span["duration_ms"]
+            for name, duration in per_stage.items():
+                self.durations[name].append(duration)
+            if self.path:
+                try:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+                except Exception as e:
+                    print(f"Trace write error: {e}")
+        print(f"[trace {record['id']}] total {record['total_ms']:.0f} ms")
+        if TRACE_SUMMARY_EVERY and len(self.durations["total"]) % TRACE_SUMMARY_EVERY == 0:
+            self.print_summary()
+        return record
+
+    def summary(self) -> dict:
+        """p50/p95/p99 (ms) per stage over the rolling window."""
+        with self._lock:
+            return {
+                name: dict(zip(("p50", "p95", "p99"), np.percentile(list(values), [50, 95, 99]).round(1).tolist()), n=len(values))
+                for name, values in self.durations.items() if values
+            }
+
+    def print_summary(self):
+        for name, stats in sorted(self.summary().items()):
+            print(f"[trace] {name:<18} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  p99 {stats['p99']:8.1f} ms  (n={stats['n']})")
+
+    def dump_profile(self, profiler: cProfile.Profile, trace_id: str, stage: str) -> str | None:
+        if not self.path:
+            return None
+        path = os.path.join(os.path.dirname(self.path), "profiles", f"{trace_id}-{stage}.prof")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        profiler.dump_stats(path)
+        return path
+
+
+# ------------------- Active command -------------------
+# The trace spans report into, per thread / context: concurrent commands (daemon workers) each
+# see their own. Work handed to another thread carries it along through use() or bind().
+recorder = TraceRecorder()
+_active = contextvars.ContextVar("command_trace", default=NullTrace())
+_command_ids = itertools.count(1)
+
+
+def start_command(**attrs):
+    """Create the trace of a new voice command; activate it with use() wherever its stages run."""
+    return CommandTrace(recorder, command=next(_command_ids), **attrs) if TRACE_ENABLED else NullTrace()
+
+
+def end_command(trace, **attrs):
+    """The command itself is done; it is written once background work holding it finishes too."""
+    trace.mark("end")
+    trace.release(**attrs)
+
+
+@contextmanager
+def use(trace):
+    """Make `trace` the active one in this thread for the duration of the block."""
+    token = _active.set(trace)
+    try:
+        yield trace
+    finally:
+        _active.reset(token)
+
+
+def bind(fn):
+    """Wrap `fn` so it runs with the currently active trace, whichever thread calls it."""
+    trace = _active.get()
+
+    def run(*args, **kwargs):
+        with use(trace):
+            return fn(*args, **kwargs)
+    return run
+
+
+def active():
+    return _active.get()
+
+
+def span(name: str, **attrs):
+    """Time a stage of the active command (no-op when none is active)."""
+    return _active.get().span(name, **attrs)
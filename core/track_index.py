@@ -0,0 +1,255 @@
+# core/track_index.py — Local catalog of the user's tracks for offline, instant matching
+import json
+import os
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from itertools import zip_longest
+import numpy as np
+from core.config import TRACK_INDEX_PATH, RECOGNITION_PROMPT_CHARS
+from core.search_cache import normalize_query
+
+
+def trigrams(text: str) -> set[str]:
+    """Character trigrams of each word, padded so short words still produce grams."""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def compact_track(track: dict) -> dict:
+    """Keep only what matching and playback need from a Spotify track object."""
+    return {
+        "name": track["name"],
+        "uri": track["uri"],
+        "artists": [{"name": a["name"], "uri": a.get("uri")} for a in track.get("artists", [])],
+        "external_urls": {"spotify": track.get("external_urls", {}).get("spotify", "")},
+    }
+
+
+class TrackIndex:
+    """
+    Array-backed catalog with a trigram inverted index. Every string (title, URI, artist name)
+    is interned once in a string table; a track is a row of int32 columns pointing into it,
+    with its artists as a slice of two parallel artist columns. Tracks are deduplicated by URI;
+    each trigram maps to a sorted int32 array of track ids. candidates() ranks tracks by how many
+    query trigrams they share, so fuzzy scoring only runs on a short list, and only those rows
+    are turned back into track dicts.
+
+    `sync_state` holds the cursors of the last add_from_spotify(), so the next sync only pulls
+    what changed: newer saved tracks, playlists with a new snapshot, plays after the last one.
+    """
+
+    def __init__(self, path: str = TRACK_INDEX_PATH):
+        self.path = path
+        self.sync_state: dict = {}
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._names = array("i")          # per track: string ids
+        self._uris = array("i")
+        self._urls = array("i")
+        self._artist_start = array("i", [0])  # per track: its slice of the artist columns
+        self._artist_names = array("i")
+        self._artist_uris = array("i")     # -1 when the artist has no URI
+        self._ids: dict[str, int] = {}     # track URI -> row
+        self._postings: dict[str, np.ndarray] = {}
+        self._dirty = True
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _intern(self, text: str) -> int:
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = self._string_ids[text] = len(self._strings)
+            self._strings.append(text)
+        return string_id
+
+    def _artists(self, row: int) -> list[tuple[str, str | None]]:
+        strings = self._strings
+        return [(strings[self._artist_names[i]], strings[self._artist_uris[i]] if self._artist_uris[i] >= 0 else None)
+                for i in range(self._artist_start[row], self._artist_start[row + 1])]
+
+    def track(self, row: int) -> dict:
+        """Row `row` as a compact track dict (the shape search results are scored in)."""
+        strings = self._strings
+        return {
+            "name": strings[self._names[row]],
+            "uri": strings[self._uris[row]],
+            "artists": [{"name": name, "uri": uri} for name, uri in self._artists(row)],
+            "external_urls": {"spotify": strings[self._urls[row]]},
+        }
+
+    @property
+    def tracks(self) -> list[dict]:
+        with self._lock:
+            return [self.track(row) for row in range(len(self))]
+
+    # ------------------- Population -------------------
+    def add(self, track: dict) -> bool:
+        if not track or not track.get("uri") or not track.get("name"):
+            return False
+        if track["uri"].startswith("spotify:local:"):
+            return False  # local files can't be started through the Web API
+        track = compact_track(track)
+        with self._lock:
+            if track["uri"] in self._ids:
+                return False
+            self._ids[track["uri"]] = len(self)
+            self._names.append(self._intern(track["name"]))
+            self._uris.append(self._intern(track["uri"]))
+            self._urls.append(self._intern(track["external_urls"]["spotify"]))
+            for artist in track["artists"]:
+                self._artist_names.append(self._intern(artist["name"]))
+                self._artist_uris.append(self._intern(artist["uri"]) if artist["uri"] else -1)
+            self._artist_start.append(len(self._artist_names))
+            self._dirty = True
+        return True
+
+    def add_many(self, tracks) -> int:
+        return sum(self.add(track) for track in tracks)
+
+    def import_json(self, path: str) -> int:
+        """
+        Import a JSON export: either a list of Spotify track objects, or Spotify's account export
+        (YourLibrary.json: {"tracks": [{"track": ..., "artist": ..., "uri": ...}]}).
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("tracks", []) if isinstance(data, dict) else data
+        tracks = []
+        for entry in entries:
+            if "name" in entry:
+                tracks.append(entry)
+            elif "track" in entry and "uri" in entry:
+                tracks.append({"name": entry["track"], "uri": entry["uri"], "artists": [{"name": entry.get("artist", "")}]})
+        return self.add_many(tracks)
+
+    def synced_within(self, seconds: float) -> bool:
+        return time.time() - self.sync_state.get("synced_at", 0) < seconds
+
+    def add_from_spotify(self, client, max_playlists: int = 50) -> int:
+        """
+        Pull saved tracks, playlist tracks and recently played tracks from the Web API, stopping
+        at what the previous sync already saw (see sync_state).
+        """
+        state = self.sync_state
+        added = 0
+
+        # Saved tracks come newest first: stop at the first one the last sync already had
+        newest_saved, seen_saved = None, state.get("saved_added_at")
+        offset = 0
+        while True:
+            page = client.current_user_saved_tracks(limit=50, offset=offset)
+            items = page.get("items", [])
+            fresh = [item for item in items if not seen_saved or item.get("added_at", "") > seen_saved]
+            newest_saved = newest_saved or (items[0].get("added_at") if items else None)
+            added += self.add_many(item["track"] for item in fresh)
+            if len(fresh) < len(items) or not page.get("next"):
+                break
+            offset += 50
+
+        # A playlist's snapshot_id changes with every edit; unchanged ones are skipped
+        snapshots = dict(state.get("playlists", {}))
+        playlists = client.current_user_playlists(limit=max_playlists).get("items", [])
+        for playlist in playlists:
+            if playlist.get("snapshot_id") and snapshots.get(playlist["id"]) == playlist["snapshot_id"]:
+                continue
+            offset = 0
+            while True:
+                page = client.playlist_items(playlist["id"], limit=100, offset=offset, additional_types=("track",))
+                added += self.add_many(item.get("track") for item in page.get("items", []))
+                if not page.get("next"):
+                    break
+                offset += 100
+            snapshots[playlist["id"]] = playlist.get("snapshot_id")
+
+        recent = client.current_user_recently_played(limit=50, after=state.get("played_after"))
+        added += self.add_many(item["track"] for item in recent.get("items", []))
+
+        self.sync_state = {
+            "synced_at": time.time(),
+            "saved_added_at": newest_saved or seen_saved,
+            "playlists": snapshots,
+            "played_after": (recent.get("cursors") or {}).get("after") or state.get("played_after"),
+        }
+        return added
+
+    # ------------------- Persistence -------------------
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sync": self.sync_state, "tracks": self.tracks}, f)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, path: str = TRACK_INDEX_PATH) -> "TrackIndex":
+        index = cls(path)
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, list):  # written before sync state was kept
+                    data = {"tracks": data}
+                index.add_many(data["tracks"])
+                index.sync_state = data.get("sync", {})
+            except Exception as e:
+                print(f"Could not load track index: {e}")
+        print(f"Track index: {len(index)} tracks")
+        return index
+
+    # ------------------- Recognizer prompt -------------------
+    def prompt_text(self, max_chars: int = RECOGNITION_PROMPT_CHARS) -> str:
+        """
+        Most frequent artists in the library, then titles of their tracks, as a comma-separated
+        vocabulary for the recognizer's initial prompt (spelling of unusual names mostly).
+        """
+        tracks = self.tracks
+        counts = Counter(a["name"] for track in tracks for a in track["artists"][:1] if a["name"])
+        terms = [name for name, _ in counts.most_common()]
+        ranked_artists = {name: rank for rank, name in enumerate(terms)}
+        titles = sorted(
+            (track for track in tracks if track["artists"]),
+            key=lambda track: ranked_artists.get(track["artists"][0]["name"], len(terms)),
+        )
+        # Interleave so both kinds of names fit in the budget
+        names, seen, length = [], set(), 0
+        for name in (n for pair in zip_longest(terms, (t["name"] for t in titles)) for n in pair if n):
+            if name.lower() in seen:
+                continue
+            length += len(name) + 2
+            if length > max_chars:
+                break
+            seen.add(name.lower())
+            names.append(name)
+        return ", ".join(names)
+
+    # ------------------- Retrieval -------------------
+    def _build(self):
+        postings = defaultdict(list)
+        for track_id in range(len(self)):
+            names = [self._strings[self._names[track_id]]] + [name for name, _ in self._artists(track_id)]
+            text = normalize_query(" ".join(names))
+            for gram in trigrams(text):
+                postings[gram].append(track_id)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._dirty = False
+
+    def candidates(self, query: str, limit: int = 200) -> list[dict]:
+        """Tracks sharing the most trigrams with the query (title and/or artist words)."""
+        with self._lock:
+            if self._dirty:
+                self._build()
+            hits = [self._postings[g] for g in trigrams(normalize_query(query)) if g in self._postings]
+            if not hits:
+                return []
+            counts = np.bincount(np.concatenate(hits), minlength=len(self))
+            matched = np.flatnonzero(counts)
+            if matched.shape[0] > limit:
+                matched = matched[np.argpartition(counts[matched], -limit)[-limit:]]
+            return [self.track(i) for i in matched]
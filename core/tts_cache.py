@@ -0,0 +1,116 @@
+# core/tts_cache.py — Content-addressed cache of synthesized speech (memory LRU + disk)
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from core.config import TTS_CACHE_DIR, TTS_CACHE_MAX_ITEMS, TTS_CACHE_MAX_BYTES
+
+
+def make_key(text: str, speaker_id: str, length_scale: float, noise_scale: float, noise_scale_w: float, model: str) -> str:
+    """Hash of everything that changes the rendered audio."""
+    payload = json.dumps([text, speaker_id, length_scale, noise_scale, noise_scale_w, model])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier phrase cache. The memory tier is an LRU of (wav, sample_rate) NumPy arrays; the disk
+    tier keeps one .npz per key so fixed prompts survive restarts without re-running VITS. Dynamic
+    text (track names) lands on disk too, so the disk tier is an LRU capped at `max_bytes`: a
+    hit refreshes the file's mtime and the oldest files go first.
+    """
+
+    def __init__(self, cache_dir: str | None = TTS_CACHE_DIR, max_items: int = TTS_CACHE_MAX_ITEMS,
+                 max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _remember(self, key: str, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        """Return (wav, sample_rate) or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.cache_dir and os.path.exists(self._path(key)):
+            try:
+                with np.load(self._path(key)) as data:
+                    entry = (data["wav"], int(data["sr"]))
+                os.utime(self._path(key))
+            except Exception as e:
+                print(f"TTS cache read error ({key[:12]}): {e}")
+            else:
+                with self._lock:
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, wav: np.ndarray, sr: int):
+        wav = np.asarray(wav, dtype=np.float32)
+        with self._lock:
+            self._remember(key, (wav, sr))
+
+        if self.cache_dir:
+            tmp_path = None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # A private temp file per writer: two threads rendering the same phrase can't interleave
+                fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, wav=wav, sr=sr)
+                os.replace(tmp_path, self._path(key))
+                tmp_path = None
+                self._trim_disk()
+            except Exception as e:
+                print(f"TTS cache write error ({key[:12]}): {e}")
+            finally:
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _trim_disk(self):
+        """Delete the least recently used .npz files until the disk tier fits in max_bytes."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # removed by another writer
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "items": len(self._memory)}
@@ -1,28 +1,30 @@
 # core/utils.py
 import os
-import sounddevice as sd
 import subprocess
-from TTS.api import TTS
 import re
+import json
+from core.config import MIC_CACHE_PATH, FFMPEG_PATH, TTS_MODEL
+from core.resident import ResidentModel
+from core.startup import LazyHandle
 
-# ------------------- Paths -------------------
-
-output_folder = os.path.join(os.path.expanduser("~"), "Documents", "recordings")
-os.makedirs(output_folder, exist_ok=True)
+# ------------------- FFmpeg executable -------------------
 
-output_filename = os.path.join(output_folder, "user_audio.flac")
+ffmpeg_exe = FFMPEG_PATH
 
-# ------------------- FFmpeg executable -------------------
+# ------------------- TTS model -------------------
 
-ffmpeg_exe = r"C:\ffmpeg\bin\ffmpeg.exe"
+def load_tts():
+    from TTS.api import TTS
+    return TTS(model_name=TTS_MODEL, progress_bar=True)
 
-global_tts = TTS(model_name="tts_models/en/vctk/vits", progress_bar=True)
+# Loaded on first use (or in the background by the startup orchestrator); offloadable, since
+# the fixed prompts are served from the phrase cache once rendered
+global_tts = ResidentModel("tts", load_tts)
 
-def get_alternative_mic_name(friendly_name):
+def list_dshow_devices():
     """
-    Use ffmpeg -list_devices to find the alternative DirectShow name for a friendly device name.
-    Returns the alternative name string beginning with '@device' (no surrounding quotes),
-    or None if not found.
+    Run ffmpeg -list_devices once and map every DirectShow friendly name to its alternative
+    name (beginning with '@device', no surrounding quotes). Returns {} if FFmpeg can't list devices.
     """
     try:
         # ffmpeg prints devices to stderr
@@ -32,38 +34,67 @@ def get_alternative_mic_name(friendly_name):
             text=True,
             check=False
         )
-        out_lines = result.stderr.splitlines()
-        # look for the line containing the friendly name, then find a nearby line containing '@device'
-        for i, line in enumerate(out_lines):
-            if friendly_name in line:
-                # scan forward a few lines for '@device'
-                for j in range(i+1, min(i+6, len(out_lines))):
-                    if '@device' in out_lines[j]:
-                        match = re.search(r'@device[^"]+', out_lines[j])
-                        if match:
-                            return match.group(0).strip()
-        return None
     except Exception as e:
-        print(f"get_alternative_mic_name error: {e}")
-        return None
+        print(f"list_dshow_devices error: {e}")
+        return {}
+    devices, friendly_name = {}, None
+    for line in result.stderr.splitlines():
+        alternative = re.search(r'(@device[^"]+)', line)
+        if alternative and friendly_name:
+            devices[friendly_name] = alternative.group(1).strip()
+            friendly_name = None
+        elif (match := re.search(r'"([^"]+)"', line)) and "Alternative name" not in line:
+            friendly_name = match.group(1)
+    return devices
 
-# ------------------- Mic info -------------------
 
-default_device_index = sd.default.device[0]  # default input device index
-friendly_mic_name = sd.query_devices(default_device_index, kind='input')['name']  # type: ignore
+def load_mic_cache() -> dict:
+    try:
+        with open(MIC_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_mic_cache(names: dict):
+    try:
+        os.makedirs(os.path.dirname(MIC_CACHE_PATH), exist_ok=True)
+        with open(MIC_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(names, f, indent=2)
+    except OSError as e:
+        print(f"Could not save microphone cache: {e}")
 
-# try to resolve an alternative DirectShow name (recommended)
-alt_name = get_alternative_mic_name(friendly_mic_name)
-if alt_name:
-    mic_name = alt_name
-else:
-    mic_name = friendly_mic_name
 
-print(f"Using microphone (friendly): {friendly_mic_name}")
-print(f"Using microphone (for ffmpeg): {mic_name}")
+def get_alternative_mic_name(friendly_name):
+    """
+    Alternative DirectShow name for a friendly device name, or None if there is none.
+    Served from the on-disk cache; FFmpeg is only asked to enumerate devices again when the
+    name isn't known yet, i.e. when the set of devices has changed.
+    """
+    names = load_mic_cache()
+    if friendly_name not in names:
+        print("Input devices changed — enumerating with FFmpeg")
+        names = list_dshow_devices()
+        names.setdefault(friendly_name, None)  # remember misses too, so they don't re-run FFmpeg
+        save_mic_cache(names)
+    return names[friendly_name]
+
+# ------------------- Mic info -------------------
+def discover_microphone():
+    """Resolve the default input device to the name FFmpeg's dshow expects."""
+    import sounddevice as sd
+    default_device_index = sd.default.device[0]  # default input device index
+    friendly_mic_name = sd.query_devices(default_device_index, kind='input')['name']  # type: ignore
 
-# ------------------- State variables -------------------
+    # try to resolve an alternative DirectShow name (recommended)
+    alt_name = get_alternative_mic_name(friendly_mic_name)
+    if alt_name:
+        mic_name = alt_name
+    else:
+        mic_name = friendly_mic_name
 
-is_recording = False
-process = None
+    print(f"Using microphone (friendly): {friendly_mic_name}")
+    print(f"Using microphone (for ffmpeg): {mic_name}")
+    return mic_name
 
+microphone = LazyHandle("microphone", discover_microphone)
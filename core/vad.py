@@ -0,0 +1,137 @@
+# core/vad.py — Energy / zero-crossing voice activity detection on the live capture stream
+import numpy as np
+from core.config import (
+    SAMPLE_RATE, VAD_FRAME_MS, VAD_TRAILING_SILENCE_MS, VAD_NO_SPEECH_TIMEOUT_S,
+    VAD_ENERGY_MARGIN_DB, VAD_MAX_ZCR, VAD_PAD_MS,
+)
+
+MIN_NOISE_FLOOR_DB = -70.0  # keeps digital silence from making every frame look like speech
+MAX_NOISE_FLOOR_DB = -35.0  # a "background" louder than this is someone already talking
+
+
+# ------------------- Frame features -------------------
+def frame_features(samples: np.ndarray, frame_len: int):
+    """Return per-frame energy (dBFS) and zero-crossing rate; trailing partial frame is dropped."""
+    n_frames = samples.shape[0] // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db.astype(np.float32), zcr.astype(np.float32)
+
+
+def classify_frames(energy_db: np.ndarray, zcr: np.ndarray, noise_floor_db: float,
+                    margin_db: float = VAD_ENERGY_MARGIN_DB, max_zcr: float = VAD_MAX_ZCR) -> np.ndarray:
+    """
+    Boolean speech mask. A frame is speech when it is loud enough above the noise floor and
+    not hiss-like (high ZCR), or when it is loud enough that the ZCR check is irrelevant.
+    """
+    threshold = max(noise_floor_db, MIN_NOISE_FLOOR_DB) + margin_db
+    voiced = (energy_db > threshold) & (zcr < max_zcr)
+    loud = energy_db > threshold + margin_db
+    return voiced | loud
+
+
+def estimate_noise_floor(energy_db: np.ndarray) -> float:
+    """Quiet-percentile estimate of the background level."""
+    if energy_db.size == 0:
+        return MIN_NOISE_FLOOR_DB
+    return max(float(np.percentile(energy_db, 10)), MIN_NOISE_FLOOR_DB)
+
+
+# ------------------- Streaming detector -------------------
+class EnergyVAD:
+    """
+    Streaming end-of-utterance detector. Feed capture blocks to process(); it returns True once
+    speech has been heard and followed by `trailing_silence_ms` of silence (or nothing was said
+    within `no_speech_timeout_s`).
+
+    The noise floor is a running minimum of each block's quiet percentile (drifting up slowly
+    with the non-speech frames), clamped to MAX_NOISE_FLOOR_DB, so a first block that is
+    already speech (pre-roll, talking right after the prompt) can't set it at speech level.
+    """
+
+    def __init__(self, samplerate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 trailing_silence_ms: int = VAD_TRAILING_SILENCE_MS,
+                 no_speech_timeout_s: float = VAD_NO_SPEECH_TIMEOUT_S,
+                 margin_db: float = VAD_ENERGY_MARGIN_DB, max_zcr: float = VAD_MAX_ZCR):
+        self.frame_len = int(samplerate * frame_ms / 1000)
+        self.trailing_frames = max(1, int(trailing_silence_ms / frame_ms))
+        self.timeout_frames = int(no_speech_timeout_s * 1000 / frame_ms)
+        self.margin_db = margin_db
+        self.max_zcr = max_zcr
+        self.noise_floor_db = None
+        self.speech_started = False
+        self.silent_frames = 0
+        self.total_frames = 0
+        self.ended = False
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> bool:
+        if self.ended:
+            return True
+
+        samples = np.concatenate((self._pending, np.asarray(block, dtype=np.float32).reshape(-1)))
+        energy_db, zcr = frame_features(samples, self.frame_len)
+        self._pending = samples[energy_db.shape[0] * self.frame_len:].copy()
+        if energy_db.size == 0:
+            return False
+
+        block_floor = estimate_noise_floor(energy_db)
+        if self.noise_floor_db is None or block_floor < self.noise_floor_db:
+            self.noise_floor_db = min(block_floor, MAX_NOISE_FLOOR_DB)
+
+        speech = classify_frames(energy_db, zcr, self.noise_floor_db, self.margin_db, self.max_zcr)
+        self.total_frames += speech.shape[0]
+
+        if speech.any():
+            self.speech_started = True
+            last_speech = speech.shape[0] - 1 - int(np.argmax(speech[::-1]))
+            self.silent_frames = speech.shape[0] - 1 - last_speech
+        else:
+            self.silent_frames += speech.shape[0]
+
+        # Track slow changes in the background level using non-speech frames only
+        quiet = energy_db[~speech]
+        if quiet.size:
+            self.noise_floor_db = min(0.95 * self.noise_floor_db + 0.05 * float(np.mean(quiet)), MAX_NOISE_FLOOR_DB)
+
+        if self.speech_started and self.silent_frames >= self.trailing_frames:
+            self.ended = True
+        elif not self.speech_started and self.total_frames >= self.timeout_frames:
+            self.ended = True
+        return self.ended
+
+
+# ------------------- Offline trimming -------------------
+def speech_bounds(audio: np.ndarray, samplerate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                  pad_ms: int = VAD_PAD_MS, margin_db: float = VAD_ENERGY_MARGIN_DB,
+                  max_zcr: float = VAD_MAX_ZCR) -> tuple[int, int] | None:
+    """(start, end) sample range of the speech in `audio`, padded by `pad_ms`; None if there is none."""
+    frame_len = int(samplerate * frame_ms / 1000)
+    energy_db, zcr = frame_features(audio, frame_len)
+    if energy_db.size == 0:
+        return 0, audio.shape[0]
+
+    speech = classify_frames(energy_db, zcr, estimate_noise_floor(energy_db), margin_db, max_zcr)
+    if not speech.any():
+        return None
+
+    speech_idx = np.flatnonzero(speech)
+    pad = int(samplerate * pad_ms / 1000)
+    start = max(0, speech_idx[0] * frame_len - pad)
+    end = min(audio.shape[0], (speech_idx[-1] + 1) * frame_len + pad)
+    return start, end
+
+
+def trim_silence(audio: np.ndarray, samplerate: int = SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 pad_ms: int = VAD_PAD_MS, margin_db: float = VAD_ENERGY_MARGIN_DB,
+                 max_zcr: float = VAD_MAX_ZCR) -> np.ndarray:
+    """Drop leading/trailing silence (keeping `pad_ms` around speech). Returns an empty array if no speech."""
+    bounds = speech_bounds(audio, samplerate, frame_ms, pad_ms, margin_db, max_zcr)
+    if bounds is None:
+        return audio[:0]
+    return audio[bounds[0]:bounds[1]]
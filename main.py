@@ -1,20 +1,99 @@
 
-import core.recognizer, core.service, keyboard
-import os
-from core.utils import global_tts
-import core.audio_feedback as af
+import core.capture, core.recognizer, core.service, keyboard
+import argparse
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from core.config import (
+    CAPTURE_WARM_START, CAPTURE_BACKEND, CAPTURE_INPUT_FORMAT, CAPTURE_DEVICE, LIBRARY_SYNC_ON_STARTUP,
+    CUE_WAIT_MARGIN_S,
+)
+from core.pipeline import build_pipeline, prepare_environment
+from core.resident import manager as resident
+from core.startup import StartupOrchestrator
+from core.utils import microphone
+import core.cues as cues
+import core.spotify_player as sp
 
 
-ESPEAK_PATH = r"F:\eSpeak\command-line"
-os.environ["PATH"] += ";" + ESPEAK_PATH
+def greet(tts):
+    # Decode the cue bank and open its output stream, greet, then render any phrase clip that
+    # isn't on disk yet (only the first run loads TTS for this)
+    cues.prepare()
+    try:
+        # Only the audio callback resolves the future; don't hang startup on a stalled device
+        cues.play_cue("greeting").result(timeout=cues.cue_seconds("greeting") + CUE_WAIT_MARGIN_S)
+    except FutureTimeout:
+        print("Greeting cue didn't finish playing; continuing.")
+    cues.bank.render_missing(tts)
 
-def main():
-    
-    af.initiate_tts(global_tts, text="Hello! I'm Q, your virtual assistant!")
-    
-    whisper_model = core.recognizer.initiate_recognizer()
+def prime_recognizer():
+    # Bias recognition toward the artist and title names in the local library
+    core.recognizer.set_music_prompt(sp.library.get().prompt_text())
 
-    keyboard.add_hotkey('ctrl+alt+k', lambda: core.service.toggle_recording(whisper_model))
+def sync_library():
+    sp.refresh_library()
+    prime_recognizer()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice-controlled Spotify assistant")
+    parser.add_argument("--daemon", action="store_true", help="also serve the local command API (see core/daemon.py)")
+    parser.add_argument("--no-hotkey", action="store_true", help="daemon only: don't register the keyboard hotkey")
+    args = parser.parse_args(argv)
+
+    # Stages come from config (file / SRS_* environment overrides); nothing is loaded yet
+    prepare_environment()
+    pipeline = core.service.use_pipeline(build_pipeline())
+
+    # Load everything heavy in parallel; handles only block when first used
+    startup = StartupOrchestrator()
+    if pipeline.tts is not None:
+        startup.start(pipeline.tts)
+    if CAPTURE_BACKEND == "ffmpeg" and CAPTURE_INPUT_FORMAT == "dshow" and not CAPTURE_DEVICE:
+        startup.start(microphone)
+    if CAPTURE_WARM_START and CAPTURE_BACKEND != "file":
+        startup.submit("capture", core.capture.open_warm_input)
+    whisper_model = startup.start(pipeline.recognizer)
+    if pipeline.uses_spotify:
+        startup.submit("spotify", sp.warm_up)
+    startup.start(sp.library)
+    startup.submit("music-prompt", prime_recognizer)
+    if LIBRARY_SYNC_ON_STARTUP and pipeline.uses_spotify:
+        startup.submit("library-sync", sync_library)
+    if pipeline.tts is not None:
+        startup.submit("cues", lambda: greet(pipeline.tts))
+    startup.report_in_background()
+
+    # Idle models are offloaded (and reloaded on next use) to stay within the memory budget
+    for model in (pipeline.tts, whisper_model):
+        if model is not None:
+            resident.register(model)
+    resident.start()
+
+    if args.daemon:
+        from core.batch_transcriber import BatchTranscriber
+        from core.daemon import CommandQueue, Daemon, QueueFull, serve_in_background
+        # Hotkey presses and API requests share one worker queue and one batching recognizer
+        commands = CommandQueue().start()
+        recognizer = BatchTranscriber(whisper_model)
+        server = serve_in_background(Daemon(whisper_model, commands, recognizer, pipeline))
+
+        def toggle():
+            try:
+                commands.submit(core.service.toggle_recording, recognizer)
+            except QueueFull:
+                print("Busy — hotkey ignored, too many commands pending.")
+    else:
+        toggle = lambda: core.service.toggle_recording(whisper_model)
+
+    if args.daemon and args.no_hotkey:
+        print("Press Ctrl+C in terminal to quit.")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    keyboard.add_hotkey('ctrl+alt+k', toggle)
     print("Press Ctrl+Alt+K to start/stop recording.")
     print("Press Ctrl+C in terminal to quit.")
 
@@ -0,0 +1,23 @@
+# Shared fixtures: keep every test away from the caches and databases under the real HOME
+import sys
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Point the module-level history, search cache, library index and phrase cache at tmp_path."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    player = sys.modules.get("core.spotify_player")
+    if player is not None:
+        from core.history import CommandHistory
+        from core.search_cache import SQLiteSearchCache
+        from core.startup import LazyHandle
+        from core.track_index import TrackIndex
+        monkeypatch.setattr(player, "history", CommandHistory(str(tmp_path / "history.sqlite3"), on_skip=player.forget_answer))
+        monkeypatch.setattr(player, "search_cache", SQLiteSearchCache(str(tmp_path / "search.sqlite3")))
+        monkeypatch.setattr(player, "library", LazyHandle("library", lambda: TrackIndex(str(tmp_path / "library.json"))))
+    feedback = sys.modules.get("core.audio_feedback")
+    if feedback is not None:
+        from core.tts_cache import TTSCache
+        monkeypatch.setattr(feedback, "phrase_cache", TTSCache(cache_dir=str(tmp_path / "tts")))
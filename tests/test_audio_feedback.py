@@ -0,0 +1,73 @@
+# Unit tests for the non-blocking feedback player
+import threading
+import time
+import numpy as np
+import core.audio_feedback as af
+
+
+class FakeOutput:
+    """Stands in for StreamingOutput; the first phrase plays until it is aborted."""
+
+    written = []
+    hold = threading.Event()
+
+    def __init__(self, samplerate):
+        self.samplerate = samplerate
+        self.aborted = False
+
+    def write(self, wav):
+        FakeOutput.written.append((self.samplerate, wav.shape[0]))
+
+    def close(self):
+        pass
+
+    def abort(self):
+        self.aborted = True
+        FakeOutput.hold.set()
+
+    def wait(self):
+        FakeOutput.hold.wait(2)
+        return not self.aborted
+
+
+def test_split_chunks_merges_short_pieces():
+    assert af.split_chunks("Hello! I'm Q, your virtual assistant!") == ["Hello! I'm Q,", "your virtual assistant!"]
+    assert af.split_chunks("Currently playing - Gods Plan by Drake") == ["Currently playing", "Gods Plan by Drake"]
+
+
+def test_speak_returns_immediately_and_interrupt_drops_queue(monkeypatch):
+    monkeypatch.setattr(af, "StreamingOutput", FakeOutput)
+    monkeypatch.setattr(af, "synthesize", lambda tts, text, speaker_id: (np.zeros(len(text), dtype=np.float32), 22050))
+
+    player = af.FeedbackPlayer(tts=None)
+    first = player.speak("first")
+    queued = player.speak("second phrase")
+    while player._output is None:  # wait until "first" is actually playing
+        time.sleep(0.005)
+    assert not first.done()
+
+    urgent = player.speak("go", interrupt=True)
+    assert first.result(2) is False
+    assert queued.result(2) is False
+    assert urgent.result(2) is True
+    assert FakeOutput.written[-1] == (22050, len("go"))
+
+
+def test_output_error_resolves_the_phrase_and_keeps_the_worker_alive(monkeypatch):
+    opened = []
+
+    class FlakyOutput(FakeOutput):
+        def __init__(self, samplerate):
+            opened.append(samplerate)
+            if len(opened) == 1:
+                raise OSError("Device unavailable")
+            super().__init__(samplerate)
+
+        def wait(self):
+            return True
+
+    monkeypatch.setattr(af, "StreamingOutput", FlakyOutput)
+    monkeypatch.setattr(af, "synthesize", lambda tts, text, speaker_id: (np.zeros(len(text), dtype=np.float32), 22050))
+    player = af.FeedbackPlayer(tts=None)
+    assert player.speak("first").result(2) is False
+    assert player.speak("second").result(2) is True
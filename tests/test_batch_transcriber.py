@@ -0,0 +1,70 @@
+# Unit tests for the batching transcription scheduler
+import threading
+from concurrent.futures import CancelledError, Future
+import numpy as np
+import pytest
+from core.batch_transcriber import BatchTranscriber
+
+
+class BatchModel:
+    """Echoes each utterance's length and records the batch sizes it was called with."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def transcribe_batch(self, audios, **options):
+        self.batch_sizes.append(len(audios))
+        return [{"text": f"{audio.shape[0]} {options.get('temperature')}"} for audio in audios]
+
+
+def transcribe_concurrently(scheduler, requests):
+    results = [None] * len(requests)
+
+    def run(i, samples, options):
+        results[i] = scheduler.transcribe(np.zeros(samples, dtype=np.float32), **options)["text"]
+
+    threads = [threading.Thread(target=run, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_requests_share_one_batch():
+    model = BatchModel()
+    scheduler = BatchTranscriber(model, max_batch=8, window_ms=200)
+    results = transcribe_concurrently(scheduler, [(100 * (i + 1), {"temperature": 0.0}) for i in range(4)])
+    assert results == [f"{100 * (i + 1)} 0.0" for i in range(4)]
+    assert model.batch_sizes == [4]
+
+
+def test_requests_with_different_options_are_not_mixed():
+    model = BatchModel()
+    scheduler = BatchTranscriber(model, max_batch=8, window_ms=200)
+    results = transcribe_concurrently(scheduler, [(10, {"temperature": 0.0}), (20, {"temperature": 0.2}), (30, {"temperature": 0.0})])
+    assert results == ["10 0.0", "20 0.2", "30 0.0"]
+    assert sorted(model.batch_sizes) == [1, 2]
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    class Broken:
+        def transcribe(self, audio, **options):
+            raise RuntimeError("decoder failed")
+
+    scheduler = BatchTranscriber(Broken(), window_ms=0)
+    with pytest.raises(RuntimeError, match="decoder failed"):
+        scheduler.transcribe(np.zeros(10, dtype=np.float32))
+
+
+def test_batch_cancelled_in_the_pool_at_shutdown_fails_its_callers():
+    class ShutDownPool:
+        def submit(self, fn, *args):
+            future = Future()
+            future.cancel()
+            return future
+
+    scheduler = BatchTranscriber(BatchModel(), window_ms=0)
+    scheduler._pool = ShutDownPool()
+    with pytest.raises(CancelledError):
+        scheduler.submit(np.zeros(10, dtype=np.float32)).result(timeout=2)
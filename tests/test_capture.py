@@ -0,0 +1,129 @@
+# Unit tests for the in-memory capture buffer
+import os
+import sys
+import time
+import numpy as np
+import pytest
+import core.capture as capture
+from core.capture import CAPTURE_SOURCES, CaptureSession, FFmpegPipeCapture, FileCapture, RingBuffer, WarmInput
+
+
+def test_ring_buffer_returns_samples_in_order():
+    buf = RingBuffer(8)
+    buf.write(np.arange(5, dtype=np.float32))
+    assert len(buf) == 5
+    np.testing.assert_array_equal(buf.get(), np.arange(5, dtype=np.float32))
+
+
+def test_ring_buffer_wraps_and_keeps_newest():
+    buf = RingBuffer(8)
+    buf.write(np.arange(6, dtype=np.float32))
+    buf.write(np.arange(6, 11, dtype=np.float32))
+    assert len(buf) == 8
+    np.testing.assert_array_equal(buf.get(), np.arange(3, 11, dtype=np.float32))
+    np.testing.assert_array_equal(buf.get(last=3), np.arange(8, 11, dtype=np.float32))
+
+
+def test_ring_buffer_oversized_write():
+    buf = RingBuffer(4)
+    buf.write(np.arange(10, dtype=np.float32))
+    np.testing.assert_array_equal(buf.get(), np.arange(6, 10, dtype=np.float32))
+    buf.clear()
+    assert buf.get().size == 0
+
+
+def test_file_capture_replays_clip_after_resume():
+    audio = np.arange(10, dtype=np.float32)
+    blocks = []
+    source = FileCapture(RingBuffer(16), blocksize=4, audio=audio, realtime=False, paused=True)
+    source.on_block = blocks.append
+    source.start()
+    assert not source.finished.wait(0.05)
+    source.resume()
+    assert source.finished.wait(1.0)
+    source.stop()
+    np.testing.assert_array_equal(source.buffer.get(), audio)
+    assert [b.size for b in blocks] == [4, 4, 2]
+
+
+class ManualSource:
+    """Capture source stand-in whose blocks are pushed by the test."""
+
+    def __init__(self, buffer, samplerate=16000):
+        self.buffer = buffer
+        self.on_block = None
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+
+    def stop(self):
+        pass
+
+    def push(self, block):
+        self.buffer.write(block)
+        if self.on_block:
+            self.on_block(block)
+
+
+def test_warm_session_starts_from_preroll_without_reopening(monkeypatch):
+    monkeypatch.setitem(CAPTURE_SOURCES, "manual", ManualSource)
+    warm = WarmInput("manual", preroll_ms=1, samplerate=4000)  # 4-sample pre-roll
+    warm.open()
+    source = warm._source
+    source.push(np.arange(6, dtype=np.float32))
+
+    blocks = []
+    session = CaptureSession(warm, RingBuffer(32))
+    session.on_block = blocks.append
+    session.start()
+    source.push(np.array([6, 7], dtype=np.float32))
+    np.testing.assert_array_equal(session.buffer.get(), np.arange(2, 8, dtype=np.float32))
+
+    session.reset()
+    assert len(session.buffer) == 0
+    session.stop()
+    source.push(np.array([8], dtype=np.float32))
+    assert len(session.buffer) == 0 and len(blocks) == 1
+
+    CaptureSession(warm, RingBuffer(32)).start()
+    assert source.starts == 1
+
+
+def test_unprompted_capture_keeps_the_preroll(monkeypatch):
+    import core.service as service
+    from core.pipeline import build_pipeline
+    monkeypatch.setitem(CAPTURE_SOURCES, "manual", ManualSource)
+    monkeypatch.setattr(service, "VAD_ENABLED", False)
+    monkeypatch.setattr(service, "STREAMING_RECOGNITION", False)
+    warm = WarmInput("manual", preroll_ms=1, samplerate=4000)
+    warm.open()
+    warm._source.push(np.arange(4, dtype=np.float32))
+
+    stages = build_pipeline(capture="sounddevice", tts="none", player="none")
+    stages.capture = lambda: CaptureSession(warm, RingBuffer(32))
+    monkeypatch.setattr(service, "pipeline", stages)
+    service.start_capture(whisper_model=None)
+    warm._source.push(np.array([4, 5], dtype=np.float32))
+    np.testing.assert_array_equal(service.stop_capture(), np.arange(6, dtype=np.float32))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake ffmpeg is a shell script")
+def test_ffmpeg_capture_drains_stderr_and_reports_early_exit(tmp_path, monkeypatch):
+    # More stderr than a pipe buffer holds, then 1000 samples of audio, then a crash
+    fake = tmp_path / "ffmpeg"
+    fake.write_text("#!/bin/sh\n"
+                    "i=0; while [ $i -lt 2000 ]; do echo \"warning $i: a line of ffmpeg noise\" >&2; i=$((i+1)); done\n"
+                    "head -c 4000 /dev/zero\n"
+                    "echo 'Device disappeared' >&2; exit 3\n")
+    os.chmod(fake, 0o755)
+    monkeypatch.setattr(capture, "ffmpeg_exe", str(fake))
+
+    source = FFmpegPipeCapture(RingBuffer(16000), blocksize=100, input_format="alsa")
+    source.start()
+    deadline = time.monotonic() + 5
+    while source.error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(source.buffer) == 1000
+    assert source.error.startswith("FFmpeg exited unexpectedly (code 3)") and "Device disappeared" in source.error
+    source.stop()
@@ -0,0 +1,47 @@
+# Unit tests for typed config overrides and the pipeline builder
+import json
+import pytest
+import core.config as config
+from core.pipeline import build_pipeline
+
+
+def test_overrides_are_typed_and_environment_wins_over_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"WHISPER_MODEL": "base.en", "VAD_ENABLED": False, "TRANSCRIBE_REPLICAS": 2}))
+    environ = {
+        "SRS_WHISPER_MODEL": "tiny.en",
+        "SRS_RECOGNITION_BEAM_SIZE": "3",
+        "SRS_DAEMON_SOCKET": "none",
+        "SRS_TRACE_PROFILE_STAGES": "transcription, scoring",
+        "SRS_CAPTURE_STALL_S": "2",
+    }
+    overrides = config.load_overrides(vars(config), environ=environ, path=str(path))
+    assert overrides == {
+        "WHISPER_MODEL": "tiny.en",
+        "VAD_ENABLED": False,
+        "TRANSCRIBE_REPLICAS": 2,
+        "RECOGNITION_BEAM_SIZE": 3,
+        "DAEMON_SOCKET": None,
+        "TRACE_PROFILE_STAGES": ("transcription", "scoring"),
+        "CAPTURE_STALL_S": 2.0,
+    }
+    assert config.load_overrides(vars(config), {"SRS_TRANSCRIBE_REPLICAS": "auto"}, str(path))["TRANSCRIBE_REPLICAS"] == "auto"
+
+
+def test_bad_overrides_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="VAD_ENABLED"):
+        config.load_overrides(vars(config), {"SRS_VAD_ENABLED": "maybe"}, str(tmp_path / "missing.json"))
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"NOT_A_SETTING": 1}))
+    with pytest.raises(ValueError, match="NOT_A_SETTING"):
+        config.load_overrides(vars(config), {}, str(path))
+
+
+def test_pipeline_stages_come_from_config():
+    stages = build_pipeline(capture="sounddevice", tts="none", matcher="library", player="none")
+    assert stages.tts is None and not stages.speculate and not stages.uses_spotify
+    assert stages.speak("hello").result() is True
+    assert stages.cue("listening").result() is True
+    assert stages.play("spotify:track:1") is False
+    with pytest.raises(ValueError):
+        build_pipeline(matcher="telepathy")
@@ -0,0 +1,70 @@
+# Unit tests for the status cue bank and the persistent cue player
+import wave
+import numpy as np
+from core.cues import CueBank, CuePlayer, earcon
+
+CUES = {"listening": (((660, 0.05), (880, 0.05)), "What song would you like to hear?"),
+        "greeting": ((), "Hello!")}
+
+
+def write_wav(path, samples, sr):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sr)
+        f.writeframes((np.asarray(samples) * 32767).astype("<i2").tobytes())
+
+
+def test_bank_prefers_asset_clips_and_falls_back_to_earcons(tmp_path):
+    write_wav(tmp_path / "greeting.wav", np.full(1000, 0.5), 11025)
+    rendered = {}
+    bank = CueBank(CUES, style="both", samplerate=22050, sounds_dir=str(tmp_path), rendered=rendered.get)
+
+    greeting = bank.get("greeting")
+    assert greeting.dtype == np.float32 and greeting.shape[0] == 2000  # resampled to the stream rate
+    tone = earcon(CUES["listening"][0], 22050)
+    assert np.array_equal(bank.get("listening"), tone)  # no clip yet: earcon only, no TTS
+    assert bank.missing() == ["listening"]
+
+    rendered[CUES["listening"][1]] = (np.ones(500, dtype=np.float32), 22050)
+    assert bank.get("listening").shape[0] == tone.shape[0] + 500
+    assert bank.missing() == []
+    assert CueBank(CUES, style="earcon", sounds_dir=str(tmp_path)).get("greeting").size == 0
+
+
+class FakeStream:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_player_plays_queued_cues_and_interrupt_drops_them():
+    player = CuePlayer(samplerate=22050, blocksize=4, open_stream=FakeStream)
+    first = player.play(np.ones(6, dtype=np.float32))
+    second = player.play(np.full(3, 2.0, dtype=np.float32))
+    out = np.full((4, 1), 9.0, dtype=np.float32)
+
+    player._callback(out, 4, None, None)
+    assert out[:, 0].tolist() == [1, 1, 1, 1] and not first.done()
+    player._callback(out, 4, None, None)
+    assert out[:, 0].tolist() == [1, 1, 2, 2]
+    assert first.result(2) is True and not second.done()
+
+    urgent = player.play(np.ones(2, dtype=np.float32), interrupt=True)
+    assert second.result(2) is False
+    player._callback(out, 4, None, None)
+    assert out[:, 0].tolist() == [1, 1, 0, 0]  # silence once the queue is empty
+    assert urgent.result(2) is True
+
+
+def test_play_resolves_false_when_the_output_cannot_open():
+    def no_device(callback):
+        raise OSError("Error querying device -1")
+
+    player = CuePlayer(samplerate=22050, blocksize=4, open_stream=no_device)
+    assert player.play(np.ones(6, dtype=np.float32)).result(1) is False
@@ -0,0 +1,55 @@
+# Unit tests for the daemon's command queue and local API
+import io
+import json
+import threading
+import time
+import urllib.request
+import wave
+import numpy as np
+import pytest
+from core.daemon import CommandQueue, Daemon, QueueFull, create_server, decode_audio
+from core.pipeline import build_pipeline
+
+
+def test_command_queue_runs_commands_and_rejects_overflow():
+    gate = threading.Event()
+    commands = CommandQueue(workers=1, max_pending=1).start()
+    running = commands.submit(gate.wait, 5)
+    while commands.pending():
+        time.sleep(0.01)  # wait until the worker picked up the blocking command
+    queued = commands.submit(lambda: "done")
+    with pytest.raises(QueueFull):
+        commands.submit(lambda: "rejected")
+    gate.set()
+    assert running.result(2) is True and queued.result(2) == "done"
+
+
+def test_decode_audio_downmixes_and_resamples_wav():
+    stereo = np.full((8000, 2), 16384, dtype="<i2")
+    raw = io.BytesIO()
+    with wave.open(raw, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(stereo.tobytes())
+    audio = decode_audio(raw.getvalue(), "audio/wav")
+    assert audio.shape == (16000,) and np.allclose(audio, 0.5)
+
+
+def test_match_endpoint_goes_through_the_queue():
+    track = {"artists": [{"uri": "spotify:artist:a"}]}
+    stages = build_pipeline(tts="none", player="none")
+    stages.match = lambda text, pages=None: (track, "God's Plan", "Drake", "spotify:track:t", 97.0)
+    server = create_server(Daemon(object(), CommandQueue(workers=1).start(), pipeline=stages), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/match",
+            data=json.dumps({"text": "gods plan by drake"}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=5) as response:
+            result = json.load(response)
+    finally:
+        server.shutdown()
+    assert result["match"]["uri"] == "spotify:track:t" and result["match"]["artist_uri"] == "spotify:artist:a"
@@ -0,0 +1,20 @@
+# Unit tests for spoken song request parsing
+import pytest
+from core.query_parser import parse_song_request, strip_command
+
+
+@pytest.mark.parametrize("spoken, expected", [
+    ("God's plan by Drake.", ("gods plan", "drake")),
+    ("Play Stand by Me by Ben E. King please", ("stand by me", "ben e king")),
+    ("can you play stand by me", ("stand by me", None)),
+    ("Hey Q, play the song Hotel California by Eagles", ("hotel california", "eagles")),
+    ("queue up bad guy by billie eilish on spotify", ("bad guy", "billie eilish")),
+    ("Blinding Lights", ("blinding lights", None)),
+    ("Start Me Up by The Rolling Stones", ("start me up", "the rolling stones")),
+])
+def test_parse_song_request(spoken, expected):
+    assert parse_song_request(spoken) == expected
+
+
+def test_strip_command_keeps_a_bare_keyword():
+    assert strip_command("Play") == "play"
@@ -0,0 +1,192 @@
+# Unit tests for recognizer helpers
+import threading
+import time
+import numpy as np
+import pytest
+from core.capture import RingBuffer
+import core.recognizer as recognizer
+from core.recognizer import StreamingTranscriber, common_prefix_words, create_backend, handle_transcription
+
+
+class ScriptedModel:
+    """Returns one canned hypothesis per transcribe() call."""
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.calls = 0
+        self.options = []
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        self.options.append(options)
+        return {"text": self.outputs.pop(0)}
+
+
+def test_common_prefix_words_ignores_case_and_punctuation():
+    assert common_prefix_words("Gods plan, by".split(), "god's Plan by Drake".split()) == ["god's", "Plan", "by"]
+
+
+def speech(seconds, level=0.5):
+    t = np.arange(int(seconds * 16000)) / 16000
+    return (level * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def quiet(seconds):
+    return np.random.default_rng(0).normal(0, 1e-3, int(seconds * 16000)).astype(np.float32)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_streaming_commits_agreed_prefix_and_reuses_last_pass_over_trailing_silence():
+    buffer = RingBuffer(16000 * 5)
+    stable = []
+    model = ScriptedModel(["Gods plan", "Gods plan by Drake"])
+    streamer = StreamingTranscriber(model, buffer, interval_ms=5, min_audio_s=0.1, on_stable=stable.append)
+    streamer.start()
+
+    buffer.write(np.concatenate([quiet(0.5), speech(0.5)]))
+    wait_until(lambda: streamer.partial == "Gods plan")
+    buffer.write(np.concatenate([speech(0.5), quiet(0.9)]))
+    wait_until(lambda: streamer.partial == "Gods plan by Drake")
+
+    assert streamer.finish() == "Gods plan by Drake"
+    assert stable == ["Gods plan"]
+    assert model.calls == 2  # no final decode: only silence came after the last pass
+
+
+class GatedBackend(recognizer.RecognizerBackend):
+    """Serialized like every backend; with `gate` set, the first decode blocks until it is released."""
+
+    def __init__(self, outputs, gate=False):
+        super().__init__()
+        self.outputs = list(outputs)
+        self.calls = 0
+        self.release = threading.Event()
+        if not gate:
+            self.release.set()
+
+    def _transcribe(self, audio, **options):
+        self.calls += 1
+        self.release.wait(5)
+        return {"text": self.outputs.pop(0)}
+
+
+def test_streaming_finish_decodes_new_speech_once_the_running_pass_frees_the_model():
+    buffer = RingBuffer(16000 * 5)
+    model = GatedBackend(["Gods", "Gods plan by Drake"], gate=True)
+    streamer = StreamingTranscriber(model, buffer, interval_ms=5, min_audio_s=0.1)
+    streamer.start()
+
+    buffer.write(np.concatenate([quiet(0.5), speech(0.5)]))
+    wait_until(lambda: model.calls == 1)  # the pass is decoding and holds the model
+    buffer.write(np.concatenate([speech(0.5), quiet(0.5)]))
+    result = []
+    finisher = threading.Thread(target=lambda: result.append(streamer.finish()))
+    finisher.start()
+    time.sleep(0.1)
+    assert not result  # the running pass can't be interrupted
+
+    model.release.set()
+    finisher.join(5)
+    assert result == ["Gods plan by Drake"] and model.calls == 2
+
+
+def test_streaming_pass_still_waiting_for_the_model_is_skipped_by_finish():
+    buffer = RingBuffer(16000 * 5)
+    model = GatedBackend(["Gods plan by Drake"])
+    streamer = StreamingTranscriber(model, buffer, interval_ms=5, min_audio_s=0.1)
+    with model.lock:  # another caller holds the model
+        streamer.start()
+        buffer.write(np.concatenate([quiet(0.5), speech(0.5)]))
+        time.sleep(0.1)  # the pass is now queued on the model lock
+        buffer.write(np.concatenate([speech(0.5), quiet(0.5)]))  # speech it won't cover
+        result = []
+        finisher = threading.Thread(target=lambda: result.append(streamer.finish()))
+        finisher.start()
+        time.sleep(0.1)
+    finisher.join(5)
+    streamer.stop()
+    assert result == ["Gods plan by Drake"] and model.calls == 1
+
+
+def test_streaming_keeps_decoding_once_the_ring_buffer_is_full():
+    buffer = RingBuffer(16000)
+    model = ScriptedModel(["Gods", "Gods plan"])
+    streamer = StreamingTranscriber(model, buffer, interval_ms=5, min_audio_s=0.1)
+    streamer.start()
+
+    buffer.write(speech(1.0))
+    wait_until(lambda: streamer.partial == "Gods")
+    buffer.write(speech(0.5))  # length stays at capacity
+    wait_until(lambda: streamer.partial == "Gods plan")
+    streamer.stop()
+
+
+def test_create_backend_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        create_backend("does-not-exist")
+
+
+class OverlapDetector(recognizer.RecognizerBackend):
+    """Fails if two decodes ever run at the same time."""
+
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.overlapped = False
+
+    def _transcribe(self, audio, **options):
+        self.running += 1
+        self.overlapped |= self.running > 1
+        time.sleep(0.01)
+        self.running -= 1
+        return {"text": "Gods plan"}
+
+
+def test_streaming_hotkey_and_batch_calls_never_decode_concurrently():
+    model = OverlapDetector()
+    buffer = RingBuffer(16000 * 5)
+    buffer.write(speech(1.0))
+    streamer = StreamingTranscriber(model, buffer, interval_ms=1, min_audio_s=0.1)
+    streamer.start()
+    callers = [threading.Thread(target=handle_transcription, args=(model, speech(0.5))) for _ in range(4)]
+    callers.append(threading.Thread(target=model.transcribe_batch, args=([speech(0.5)] * 3,)))
+    for caller in callers:
+        caller.start()
+        buffer.write(speech(0.1))
+    for caller in callers:
+        caller.join()
+    streamer.stop()
+    assert not model.overlapped
+
+
+def test_concurrent_transcriptions_each_get_their_own_text(monkeypatch):
+    model = ScriptedModel(["Gods plan", "Hotline bling"])
+    clean = recognizer.clean_transcription
+    others = []
+
+    def clean_while_another_worker_finishes(text):
+        monkeypatch.setattr(recognizer, "clean_transcription", clean)
+        others.append(handle_transcription(model, speech(0.5)))
+        return clean(text)
+
+    monkeypatch.setattr(recognizer, "clean_transcription", clean_while_another_worker_finishes)
+    assert handle_transcription(model, speech(0.5)) == "Gods plan"
+    assert others == ["Hotline bling"] and recognizer.latest_transcription == "Hotline bling"
+
+
+def test_music_profile_single_greedy_pass_with_library_prompt(monkeypatch):
+    model = ScriptedModel(["God's Plan, by Drake.", "Drake"])
+    monkeypatch.setattr(recognizer, "music_prompt", None)
+    assert handle_transcription(model, np.zeros(16000, dtype=np.float32)) == "Gods Plan by Drake"
+    options = model.options[0]
+    assert options["temperature"] == 0.0 and options["single_window"] is True and "initial_prompt" not in options
+
+    recognizer.set_music_prompt("Drake, God's Plan")
+    handle_transcription(model, np.zeros(16000, dtype=np.float32))
+    assert model.options[1]["initial_prompt"] == "Drake, God's Plan"
@@ -0,0 +1,128 @@
+# Unit tests for resident model offloading and the memory budget
+import threading
+import time
+import pytest
+from core.resident import MemoryManager, ResidentModel, load_mapped, save_weights
+
+
+class Model:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def transcribe(self, text, wait=None):
+        if wait:
+            wait.wait(2)
+        self.calls.append(text)
+        return text.upper()
+
+
+def counting_model():
+    loads, calls = [], []
+    handle = ResidentModel("model", lambda: loads.append(1) or Model(calls))
+    return handle, loads, calls
+
+
+def test_offloaded_model_reloads_on_next_use():
+    handle, loads, calls = counting_model()
+    assert handle.transcribe("hello") == "HELLO"
+    assert handle.offload()
+    assert handle.status()["state"] == "offloaded"
+    assert handle.transcribe("again") == "AGAIN"
+    assert len(loads) == 2 and handle.offloads == 1
+
+
+def test_models_in_use_are_not_offloaded():
+    handle, _, _ = counting_model()
+    handle.get()
+    started, release = threading.Event(), threading.Event()
+    worker = threading.Thread(target=lambda: started.set() or handle.transcribe("slow", wait=release))
+    worker.start()
+    started.wait(1)
+    while not handle.status()["busy"]:
+        pass
+    assert not handle.offload()
+    release.set()
+    worker.join()
+    assert handle.offload()
+
+
+def test_manager_offloads_idle_then_least_recently_used_over_budget():
+    idle, _, _ = counting_model()
+    recent, _, _ = counting_model()
+    idle.get()
+    recent.get()
+    idle.last_used -= 120
+
+    manager = MemoryManager(budget_mb=0, idle_s=60, rss=lambda: 500.0)
+    manager.register(idle)
+    manager.register(recent)
+    assert manager.enforce() == ["model"]
+    assert idle.status()["state"] == "offloaded" and recent.loaded()
+
+    rss = iter([900.0, 300.0])
+    manager = MemoryManager(budget_mb=400, idle_s=0, rss=lambda: next(rss))
+    manager.register(recent)
+    assert manager.enforce() == ["model"]
+    assert manager.report()["models"]["model"]["state"] == "offloaded"
+
+
+def test_wake_reloads_offloaded_models_in_the_background():
+    handle, loads, _ = counting_model()
+    handle.get()
+    handle.offload()
+    manager = MemoryManager(budget_mb=0, idle_s=0)
+    manager.register(handle)
+    manager.wake()
+    while not handle.loaded():
+        time.sleep(0.01)
+    assert len(loads) == 2
+
+
+def test_mapped_weights_round_trip(tmp_path):
+    torch = pytest.importorskip("torch")
+
+    class Tiny(torch.nn.Module):
+        def __init__(self, vocab):
+            super().__init__()
+            self.embed = torch.nn.Embedding(vocab, 4)
+            self.proj = torch.nn.Linear(4, 3)
+            self.register_buffer("scale", torch.arange(3.0), persistent=False)
+
+        def forward(self, tokens):
+            return self.proj(self.embed(tokens)) * self.scale
+
+    module = Tiny(10).eval()
+    module.proj.half()
+    path = str(tmp_path / "weights" / "tiny.pt")
+    save_weights(module, path, {"vocab": 10})
+    loaded = load_mapped(path, lambda meta: Tiny(meta["vocab"]))
+
+    assert loaded.proj.weight.dtype == torch.float16 and loaded.embed.weight.dtype == torch.float32
+    assert not loaded.proj.weight.requires_grad
+    tokens = torch.tensor([[1, 2, 3]])
+    with torch.no_grad():
+        module.proj.float()
+        loaded.proj.float()
+        assert torch.equal(module(tokens), loaded(tokens))
+
+
+def test_half_precision_whisper_weights_survive_the_mapped_round_trip(tmp_path):
+    torch = pytest.importorskip("torch")
+    whisper = pytest.importorskip("whisper")
+    from dataclasses import asdict
+    from core.recognizer import WhisperBackend
+
+    dims = whisper.model.ModelDimensions(n_mels=80, n_audio_ctx=8, n_audio_state=8, n_audio_head=2, n_audio_layer=1,
+                                         n_vocab=60, n_text_ctx=8, n_text_state=8, n_text_head=2, n_text_layer=1)
+    backend = WhisperBackend("tiny")
+    backend.weight_dtype = "float16"
+    model = backend._convert(whisper.model.Whisper(dims).eval())
+    path = str(tmp_path / "whisper.pt")
+    save_weights(model, path, {"dims": asdict(dims)})
+    loaded = load_mapped(path, lambda meta: whisper.model.Whisper(whisper.model.ModelDimensions(**meta["dims"])))
+
+    assert loaded.decoder.token_embedding.weight.dtype == torch.float16
+    assert loaded.encoder.ln_post.weight.dtype == torch.float32
+    mel = torch.randn(1, 80, 16)
+    with torch.no_grad():
+        assert torch.equal(model.encoder(mel), loaded.encoder(mel))
@@ -0,0 +1,30 @@
+# Unit tests for the persistent search cache
+import time
+from core.search_cache import SQLiteSearchCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  God's Plan,  by DRAKE ") == "gods plan by drake"
+
+
+def test_sqlite_cache_ttl_and_counters(tmp_path):
+    cache = SQLiteSearchCache(path=str(tmp_path / "search.sqlite3"))
+    cache.set("page", "a", [{"uri": "x"}], ttl=60)
+    cache.set("page", "old", [1], ttl=-1)
+    assert cache.get("page", "a") == [{"uri": "x"}]
+    assert cache.get("page", "old") is None
+    assert cache.get("query", "a") is None
+    assert cache.stats() == {"page": {"hits": 1, "misses": 1}, "query": {"hits": 0, "misses": 1}}
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path):
+    cache = SQLiteSearchCache(path=str(tmp_path / "search.sqlite3"), max_entries=2)
+    cache.set("q", "a", 1, ttl=60)
+    time.sleep(0.01)
+    cache.set("q", "b", 2, ttl=60)
+    time.sleep(0.01)
+    cache.get("q", "a")
+    time.sleep(0.01)
+    cache.set("q", "c", 3, ttl=60)
+    assert cache.get("q", "b") is None
+    assert cache.get("q", "a") == 1 and cache.get("q", "c") == 3
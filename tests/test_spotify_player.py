@@ -0,0 +1,361 @@
+# Unit tests for search, matching and device handling (no network: the client is faked)
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import spotipy
+from rapidfuzz import fuzz
+import core.spotify_player as player
+from core.history import CommandHistory, NullCommandHistory
+from core.search_cache import NullSearchCache, SQLiteSearchCache
+
+
+def track(name, artist):
+    return {"name": name, "uri": f"spotify:track:{name}", "artists": [{"name": artist, "uri": "spotify:artist:a"}],
+            "external_urls": {"spotify": ""}}
+
+
+class FakeSpotify:
+    def __init__(self, items):
+        self.items = items
+        self.searches = []
+        self.started = []
+        self.device_lookups = 0
+        self.fail_next_start = False
+
+    def search(self, q, type, limit, offset):
+        self.searches.append((q, offset))
+        return {"tracks": {"items": self.items if offset == 0 else []}}
+
+    def devices(self):
+        self.device_lookups += 1
+        return {"devices": [{"id": f"device-{self.device_lookups}", "is_active": True}]}
+
+    def start_playback(self, device_id, uris):
+        if self.fail_next_start:
+            self.fail_next_start = False
+            raise spotipy.exceptions.SpotifyException(404, -1, "Player command failed: No active device found")
+        self.started.append((device_id, uris[0]))
+
+
+def use_fake(monkeypatch, items):
+    fake = FakeSpotify(items)
+    monkeypatch.setattr(player, "sp", fake)
+    monkeypatch.setattr(player, "search_cache", NullSearchCache())
+    monkeypatch.setattr(player, "history", NullCommandHistory())
+    monkeypatch.setattr(player, "LIBRARY_INDEX_ENABLED", False)
+    monkeypatch.setattr(player, "devices", player.DeviceCache())
+    return fake
+
+
+def test_query_best_song_prefers_artist_aware_match(monkeypatch):
+    fake = use_fake(monkeypatch, [track("Gods Plan", "Drake"), track("Gods Plan", "Someone Else")])
+    chosen = player.query_best_song("Gods plan by Drake")
+    assert chosen[1] == "Gods Plan" and chosen[2] == "Drake" and chosen[4] == 100
+    assert ("gods plan", 0) in fake.searches
+
+
+def test_identical_strategies_are_searched_once(monkeypatch):
+    fake = use_fake(monkeypatch, [track("Hello", "Adele")])
+    player.query_best_song("Hello")
+    assert ("hello", 0) in fake.searches
+    assert len(set(fake.searches)) == len(fake.searches)
+
+
+class SlowSearch(FakeSpotify):
+    """Each query answers with its own items after its own delay; pages past the items are empty."""
+
+    def __init__(self, results):
+        super().__init__([])
+        self.results = results  # query -> (delay s, items)
+
+    def search(self, q, type, limit, offset):
+        self.searches.append((q, offset))
+        delay, items = self.results[q]
+        time.sleep(delay)
+        return {"tracks": {"items": items[offset:offset + limit]}}
+
+
+def full_page(name, artist):
+    return [track(name, artist)] + [track(f"filler {n}", "nobody") for n in range(player.SEARCH_PAGE_LIMIT - 1)]
+
+
+def test_strategies_and_pages_are_fetched_concurrently(monkeypatch):
+    fake = use_fake(monkeypatch, [])
+    fake.__class__ = SlowSearch
+    fake.results = {"gods plan": (0.2, full_page("Gods Plan", "Someone") * 2),
+                    "gods plan by drake": (0.2, full_page("Gods Plan", "Drake") * 2)}
+    started = time.monotonic()
+    chosen = player.query_best_song("gods plan by drake", confidence_threshold=101)
+    assert time.monotonic() - started < 0.6  # four 0.2 s pages, not one after the other
+    assert chosen[2] == "Drake"
+    assert sorted(fake.searches) == [("gods plan", 0), ("gods plan", 50), ("gods plan by drake", 0), ("gods plan by drake", 50)]
+
+
+def test_artist_aware_result_wins_even_when_the_fallback_answers_first(monkeypatch):
+    fake = use_fake(monkeypatch, [])
+    fake.__class__ = SlowSearch
+    fake.results = {"gods plan": (0.2, [track("Gods Plan", "Drake")]),
+                    "gods plan by drake": (0.0, [track("Gods Plan by Drake", "Tribute Band")])}
+    assert player.query_best_song("gods plan by drake")[2] == "Drake"
+
+
+def test_confident_match_cancels_queued_pages_and_short_page_stops_paging(monkeypatch):
+    fake = use_fake(monkeypatch, [])
+    fake.__class__ = SlowSearch
+    fake.results = {"gods plan": (0.0, [track("Gods Plan", "Drake")]),
+                    "gods plan by drake": (0.3, [track("Gods Plan", "Drake")])}
+    pool = ThreadPoolExecutor(max_workers=1)  # later pages stay queued, so they can be cancelled
+    monkeypatch.setattr(player, "search_pool", pool)
+    pages = {}
+    assert player.search_best_song("gods plan by drake", pages=pages)[2] == "Drake"
+    pool.shutdown(wait=True)
+    # The short first page stopped its own paging; the confident match cancelled the fallback's rest
+    assert ("gods plan", 50) not in fake.searches and ("gods plan by drake", 50) not in fake.searches
+    assert pages[("gods plan", 50, 50)].cancelled() and pages[("gods plan by drake", 50, 50)].cancelled()
+
+
+def test_identical_page_requests_share_one_future(monkeypatch):
+    fake = use_fake(monkeypatch, [track("Hello", "Adele")])
+    pages = {}
+    first = player.submit_pages("Hello ", 100, pages)
+    assert player.submit_pages("hello", 100, pages) == first
+    player.collect_pages(first)
+    assert fake.searches.count(("hello", 0)) == 1
+
+
+def test_score_tracks_applies_artist_threshold(monkeypatch):
+    monkeypatch.setattr(player, "history", NullCommandHistory())
+    tracks = [track("Hello", "Adele"), track("Hello", "Lionel Richie")]
+    assert player.score_tracks(tracks, "hello", "lionel richie")[2] == "Lionel Richie"
+    assert player.score_tracks(tracks, "hello", "zzzz")[3] is None
+
+
+def loop_score(tracks, query, artist_name=None, artist_threshold=player.MATCH_ARTIST_THRESHOLD):
+    """The per-track loop score_tracks replaced; kept as the reference for the batched version."""
+    best_match, best_score = None, 0
+    for t in tracks:
+        title_score = fuzz.token_set_ratio(query.lower(), t["name"].lower())
+        artist_score = 0
+        if artist_name:
+            artist_score = max(fuzz.token_set_ratio(artist_name.lower(), a["name"].lower()) for a in t["artists"])
+            if artist_score < artist_threshold:
+                continue
+        combined = 0.7 * title_score + 0.3 * artist_score
+        if combined > best_score:
+            best_match, best_score = t, combined
+    return best_match, best_score
+
+
+def test_batched_scoring_matches_the_per_track_loop(monkeypatch):
+    monkeypatch.setattr(player, "HISTORY_PRIOR_WEIGHT", 0)
+    rng = random.Random(7)
+    words = ["hello", "love", "night", "gods", "plan", "blinding", "lights", "the", "drake", "adele", "weeknd"]
+
+    def phrase():
+        return " ".join(rng.sample(words, rng.randint(1, 3)))
+
+    for _ in range(200):
+        tracks = [{**track(phrase(), ""), "uri": f"spotify:track:{i}",
+                   "artists": [{"name": phrase()} for _ in range(rng.randint(1, 3))]}
+                  for i in range(rng.randint(1, 25))]
+        query, artist = phrase(), rng.choice([None, phrase()])
+        expected, expected_score = loop_score(tracks, query, artist)
+        best, _, _, _, score = player.score_tracks(tracks, query, artist)
+        assert best is expected and score == expected_score
+
+
+def test_play_track_reuses_device_and_recovers_from_404(monkeypatch):
+    fake = use_fake(monkeypatch, [])
+    player.play_track("spotify:track:1")
+    player.play_track("spotify:track:2")
+    assert fake.device_lookups == 1
+
+    fake.fail_next_start = True
+    player.play_track("spotify:track:3")
+    assert fake.device_lookups == 2
+    assert fake.started[-1] == ("device-2", "spotify:track:3")
+
+
+def test_speculative_pages_are_reused_by_final_search(monkeypatch):
+    from core.speculation import Speculator
+    fake = use_fake(monkeypatch, [track("Gods Plan", "Drake")])
+    guess = Speculator(prefetch_min_score=101)  # search only, no metadata prefetch
+    guess.on_partial("Play gods plan by Drake")
+    guess.on_stable("Play gods plan by Drake")
+    searched = len(fake.searches)
+    assert searched > 0
+
+    chosen = player.query_best_song("play gods plan by drake", pages=guess.adopt("play gods plan by drake"))
+    assert chosen[2] == "Drake"
+    assert len(fake.searches) == searched
+
+
+def test_speculation_miss_cancels_and_searches_again(monkeypatch):
+    from core.speculation import Speculator
+    fake = use_fake(monkeypatch, [track("Hello", "Adele")])
+    guess = Speculator(prefetch_min_score=101)
+    guess.on_partial("gods plan by drake")
+    guess.on_stable("gods plan by drake")
+
+    pages = guess.adopt("hello by adele")
+    assert not any(key[0] == "gods plan" for key in pages)
+    assert player.query_best_song("hello by adele", pages=pages)[1] == "Hello"
+    assert ("hello", 0) in fake.searches
+
+
+def test_speculation_waits_for_the_artist_to_be_agreed_on(monkeypatch):
+    from core.speculation import Speculator
+    fake = use_fake(monkeypatch, [track("Blinding Lights", "The Weeknd")])
+    guess = Speculator(prefetch_min_score=101)
+    guess.on_partial("play blinding lights by the weeknd")
+    guess.on_stable("play blinding lights by the")
+    assert guess.key is None and fake.searches == []
+
+    guess.on_stable("play blinding lights by the weeknd")
+    assert guess.key == ("blinding lights", "the weeknd")
+
+
+def test_speculative_prefetch_stops_when_the_guess_is_abandoned(monkeypatch):
+    from core.speculation import Speculator
+    item = {**track("Gods Plan", "Drake"), "id": "gods-plan", "artists": [{"id": "drake", "name": "Drake"}]}
+    fake = use_fake(monkeypatch, [item])
+    guess = Speculator(prefetch_min_score=0)
+    related_lookups, top_tracks = [], []
+
+    def related(artist_id):
+        related_lookups.append(artist_id)
+        guess.cancel()  # the user kept talking: the guess is dropped mid-prefetch
+        return {"artists": [{"id": "21-savage"}]}
+
+    fake.artist_related_artists = related
+    fake.artist_top_tracks = lambda artist_id: top_tracks.append(artist_id) or {"tracks": []}
+    monkeypatch.setattr(player, "sp_client", fake)
+
+    guess.on_partial("gods plan by drake")
+    guess.on_stable("gods plan by drake")
+    guess.prefetcher.join(5)
+    assert not guess.prefetcher.is_alive()
+    assert related_lookups == ["drake"] and top_tracks == []
+
+
+def test_cancel_without_speech_drops_pages_and_ignores_late_partials(monkeypatch):
+    from core.speculation import Speculator
+    fake = use_fake(monkeypatch, [])
+    guess = Speculator(prefetch_min_score=101)
+    guess.start()
+    guess.cancel()
+    guess.on_partial("hello")
+    guess.on_stable("hello")
+    assert guess.key is None and guess.pages == {} and fake.searches == []
+
+
+def test_usage_prior_breaks_ties_and_habits_skip_search(monkeypatch):
+    lionel = {**track("Hello", "Lionel Richie"), "uri": "spotify:track:lionel"}
+    fake = use_fake(monkeypatch, [track("Hello", "Adele"), lionel])
+    history = CommandHistory(":memory:", skip_window_s=0)
+    monkeypatch.setattr(player, "history", history)
+    assert player.query_best_song("hello")[2] == "Adele"
+
+    history.record("hello", (lionel, "Hello", "Lionel Richie", lionel["uri"], 100.0))
+    assert player.query_best_song("hello", confidence_threshold=60)[2] == "Lionel Richie"
+
+    history.record("play hello", (lionel, "Hello", "Lionel Richie", lionel["uri"], 100.0))
+    history.record("hello", (lionel, "Hello", "Lionel Richie", lionel["uri"], 100.0))
+    searches = len(fake.searches)
+    assert player.query_best_song("Hello")[3] == lionel["uri"]
+    assert len(fake.searches) == searches
+
+
+def test_quick_follow_up_command_counts_as_skip():
+    history = CommandHistory(":memory:", skip_window_s=60)
+    adele, lionel = track("Hello", "Adele"), {**track("Hello", "Lionel Richie"), "uri": "spotify:track:lionel"}
+    history.record("hello", (adele, "Hello", "Adele", adele["uri"], 100.0))
+    history.record("hello by lionel richie", (lionel, "Hello", "Lionel Richie", lionel["uri"], 100.0))
+    prior_adele, prior_lionel = history.priors([adele["uri"], lionel["uri"]])
+    assert prior_adele < 0 < prior_lionel
+
+
+def test_skipped_answer_is_no_longer_served_from_the_query_cache(monkeypatch):
+    adele, lionel = track("Hello", "Adele"), {**track("Hello", "Lionel Richie"), "uri": "spotify:track:lionel"}
+    use_fake(monkeypatch, [adele, lionel])
+    monkeypatch.setattr(player, "search_cache", SQLiteSearchCache(":memory:"))
+    history = CommandHistory(":memory:", skip_window_s=60, on_skip=player.forget_answer)
+    monkeypatch.setattr(player, "history", history)
+
+    chosen = player.query_best_song("hello", confidence_threshold=60)
+    assert chosen[2] == "Adele" and player.search_cache.get("query", "hello") is not None
+    history.record("hello", chosen)
+    history.record("hello by lionel richie", (lionel, "Hello", "Lionel Richie", lionel["uri"], 100.0))
+    assert player.search_cache.get("query", "hello") is None
+    assert player.query_best_song("hello", confidence_threshold=60)[2] == "Lionel Richie"
+
+
+class FakeCatalog:
+    """Metadata endpoints for the recommendation pipeline; lookups take `delay` seconds each."""
+
+    def __init__(self, related, top, delay=None, failing=()):
+        self.related = related
+        self.top = top
+        self.delay = delay or {}
+        self.failing = set(failing)
+        self.related_lookups = []
+        self.queued = []
+        self.rate_limit_next = False
+
+    def track(self, track_id):
+        return {"id": track_id, "name": "Seed", "artists": [{"id": "a", "name": "A"}, {"id": "b", "name": "B"}]}
+
+    def artist_related_artists(self, artist_id):
+        self.related_lookups.append(artist_id)
+        if artist_id in self.failing:
+            raise spotipy.exceptions.SpotifyException(500, -1, "boom")
+        return {"artists": [{"id": i} for i in self.related[artist_id]]}
+
+    def artist_top_tracks(self, artist_id):
+        time.sleep(self.delay.get(artist_id, 0))
+        return {"tracks": [{"uri": f"spotify:track:{artist_id}{n}", "name": f"{artist_id}{n}"} for n in range(self.top)]}
+
+    def add_to_queue(self, uri, device_id):
+        if self.rate_limit_next:
+            self.rate_limit_next = False
+            raise spotipy.exceptions.SpotifyException(429, -1, "Too many requests")
+        self.queued.append((uri, time.monotonic()))
+
+
+def use_catalog(monkeypatch, catalog):
+    monkeypatch.setattr(player, "sp", catalog)
+    monkeypatch.setattr(player, "sp_client", catalog)
+    monkeypatch.setattr(player, "search_cache", NullSearchCache())
+
+
+def test_recommendations_keep_artist_order_and_look_up_shared_artists_once(monkeypatch):
+    # x is related to both seed artists; x's top tracks arrive last but are still queued first
+    catalog = FakeCatalog({"a": ["x", "y"], "b": ["x", "z"]}, top=2, delay={"x": 0.05})
+    use_catalog(monkeypatch, catalog)
+
+    queued = player.queue_recommendations_async("spotify:track:seed", "spotify:artist:w", device_id="d").result(5)
+    assert [t["uri"] for t in queued] == [f"spotify:track:{a}{n}" for a in "xyzw" for n in range(2)]
+    assert [uri for uri, _ in catalog.queued] == [t["uri"] for t in queued]
+    assert sorted(catalog.related_lookups) == ["a", "b"]
+
+
+def test_recommendations_survive_a_failed_artist_lookup(monkeypatch):
+    catalog = FakeCatalog({"a": ["x"], "b": ["y"]}, top=1, failing={"a"})
+    use_catalog(monkeypatch, catalog)
+    queued = player.queue_recommendations("spotify:track:seed", max_results=5, device_id="d")
+    assert [t["uri"] for t in queued] == ["spotify:track:y0"]
+
+
+def test_queue_is_paced_only_after_a_rate_limit(monkeypatch):
+    monkeypatch.setattr(player, "QUEUE_REQUEST_INTERVAL_S", 0.1)
+    catalog = FakeCatalog({"a": ["x"], "b": []}, top=3)
+    use_catalog(monkeypatch, catalog)
+    player.queue_recommendations("spotify:track:seed", device_id="d")
+    times = [t for _, t in catalog.queued]
+    assert times[-1] - times[0] < 0.1
+
+    catalog.queued.clear()
+    catalog.rate_limit_next = True
+    player.queue_recommendations("spotify:track:seed", device_id="d")
+    times = [t for _, t in catalog.queued]
+    assert len(times) == 2 and times[1] - times[0] >= 0.1
@@ -0,0 +1,17 @@
+# Unit tests for the shared Spotify transport
+from spotipy.exceptions import SpotifyException
+from core.spotify_transport import build_session, is_no_active_device
+
+
+def test_only_idempotent_requests_are_resent_after_server_errors():
+    retry = build_session().get_adapter("https://api.spotify.com").max_retries
+    assert retry.is_retry("GET", 503) and retry.is_retry("GET", 429)
+    assert retry.is_retry("POST", 429) and retry.is_retry("PUT", 429)
+    assert not retry.is_retry("POST", 502) and not retry.is_retry("PUT", 500)
+
+
+def test_no_active_device_needs_the_player_reason():
+    assert is_no_active_device(SpotifyException(404, -1, "Player command failed: No active device found", reason="NO_ACTIVE_DEVICE"))
+    assert is_no_active_device(SpotifyException(404, -1, "Player command failed: No active device found"))
+    assert not is_no_active_device(SpotifyException(404, -1, "Non existing id: 'spotify:track:x'"))
+    assert not is_no_active_device(SpotifyException(429, -1, "No active device"))
@@ -0,0 +1,27 @@
+# Unit tests for background startup handles
+import threading
+from core.startup import LazyHandle, StartupOrchestrator
+
+
+def test_lazy_handle_loads_inline_once():
+    calls = []
+    handle = LazyHandle("thing", lambda: calls.append(1) or "value")
+    assert not handle.ready()
+    assert handle.get() == "value"
+    assert handle.get() == "value"
+    assert calls == [1] and handle.ready()
+
+
+def test_orchestrator_loads_in_background_and_proxies_attributes():
+    release = threading.Event()
+
+    def loader():
+        release.wait(2)
+        return "hello world"
+
+    startup = StartupOrchestrator(max_workers=2)
+    handle = startup.submit("text", loader)
+    assert not handle.ready()
+    release.set()
+    assert handle.upper() == "HELLO WORLD"
+    assert handle.load_time is not None
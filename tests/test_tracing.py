@@ -0,0 +1,80 @@
+# Unit tests for per-command latency tracing
+import json
+import threading
+import time
+import core.tracing as tracing
+from core.tracing import CommandTrace, NullTrace, TraceRecorder
+
+
+def test_trace_written_after_last_release(tmp_path):
+    recorder = TraceRecorder(str(tmp_path / "traces.jsonl"))
+    trace = CommandTrace(recorder, command=1)
+    trace.mark("hotkey")
+    with trace.span("transcription", samples=16000):
+        time.sleep(0.01)
+
+    background = trace.hold()
+    trace.release()
+    assert not (tmp_path / "traces.jsonl").exists()
+
+    with background.span("recommendations"):
+        pass
+    background.release()
+
+    record = json.loads((tmp_path / "traces.jsonl").read_text())
+    assert record["command"] == 1 and "hotkey" in record["marks"]
+    assert [s["name"] for s in record["spans"]] == ["transcription", "recommendations"]
+    assert record["spans"][0]["duration_ms"] >= 10 and record["spans"][0]["samples"] == 16000
+
+
+def test_summary_percentiles_sum_repeated_stages():
+    recorder = TraceRecorder(path=None)
+    for _ in range(5):
+        trace = CommandTrace(recorder)
+        for _ in range(2):
+            trace.begin("search_page").end()
+        trace.release()
+    summary = recorder.summary()
+    assert summary["search_page"]["n"] == 5 and summary["total"]["n"] == 5
+    assert summary["total"]["p50"] <= summary["total"]["p99"]
+
+
+def test_null_trace_is_a_no_op():
+    trace = NullTrace()
+    with trace.span("scoring") as span:
+        span.end()
+    trace.hold().release()
+
+
+def test_total_is_command_latency_and_concurrent_commands_stay_apart():
+    recorder = TraceRecorder(path=None)
+    first, second = CommandTrace(recorder), CommandTrace(recorder)
+
+    def page():
+        with tracing.span("search_page"):
+            pass
+
+    def command(trace, stage):
+        with tracing.use(trace):
+            with tracing.span(stage):
+                time.sleep(0.02)
+            trace.mark("playing")
+            pool_thread = threading.Thread(target=tracing.bind(page))
+            pool_thread.start()
+            pool_thread.join()
+
+    workers = [threading.Thread(target=command, args=(t, name)) for t, name in ((first, "match"), (second, "scoring"))]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [s.name for s in first.spans] == ["match", "search_page"]
+    assert [s.name for s in second.spans] == ["scoring", "search_page"]
+    assert isinstance(tracing.active(), NullTrace)
+
+    background = first.hold()
+    tracing.end_command(first)
+    with background.span("recommendations"):
+        time.sleep(0.05)
+    background.release()
+    assert recorder.durations["total"][-1] == first.marks["playing"] < 40
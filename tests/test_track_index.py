@@ -0,0 +1,101 @@
+# Unit tests for the local track index
+import json
+from core.track_index import TrackIndex
+
+
+def track(name, artist, uri):
+    return {"name": name, "uri": uri, "artists": [{"name": artist, "uri": f"artist:{artist}"}]}
+
+
+def test_candidates_rank_by_shared_trigrams(tmp_path):
+    index = TrackIndex(path=str(tmp_path / "library.json"))
+    index.add_many([
+        track("God's Plan", "Drake", "spotify:track:1"),
+        track("Hotline Bling", "Drake", "spotify:track:2"),
+        track("Bohemian Rhapsody", "Queen", "spotify:track:3"),
+        track("God's Plan", "Drake", "spotify:track:1"),
+        track("Some Local File", "Me", "spotify:local:x"),
+    ])
+    assert len(index) == 3
+
+    names = [t["name"] for t in index.candidates("gods plan drake", limit=1)]
+    assert names == ["God's Plan"]
+    assert index.candidates("zzzz") == []
+
+
+def test_save_load_and_import_export(tmp_path):
+    path = str(tmp_path / "library.json")
+    index = TrackIndex(path=path)
+    index.add(track("Blinding Lights", "The Weeknd", "spotify:track:9"))
+    index.save()
+
+    export = tmp_path / "YourLibrary.json"
+    export.write_text(json.dumps({"tracks": [{"artist": "Queen", "track": "Bohemian Rhapsody", "uri": "spotify:track:3"}]}))
+    loaded = TrackIndex.load(path)
+    assert loaded.import_json(str(export)) == 1
+    assert {t["name"] for t in loaded.tracks} == {"Blinding Lights", "Bohemian Rhapsody"}
+
+
+def test_prompt_text_interleaves_frequent_artists_and_titles():
+    index = TrackIndex(path="unused.json")
+    index.add_many([
+        track("God's Plan", "Drake", "spotify:track:1"),
+        track("One Dance", "Drake", "spotify:track:2"),
+        track("Bad Guy", "Billie Eilish", "spotify:track:3"),
+    ])
+    assert index.prompt_text() == "Drake, God's Plan, Billie Eilish, One Dance, Bad Guy"
+    assert index.prompt_text(max_chars=20) == "Drake, God's Plan"
+
+
+class FakeLibrary:
+    """Saved tracks (newest first), playlists with snapshot ids and a play history."""
+
+    def __init__(self):
+        self.saved = [("2024-05-01T00:00:00Z", track("God's Plan", "Drake", "spotify:track:1"))]
+        self.playlists = {"mix": ("s1", [track("One Dance", "Drake", "spotify:track:2")]),
+                          "rock": ("r1", [track("Bohemian Rhapsody", "Queen", "spotify:track:3")])}
+        self.calls = []
+
+    def current_user_saved_tracks(self, limit, offset):
+        self.calls.append(("saved", offset))
+        items = [{"added_at": added, "track": t} for added, t in self.saved[offset:offset + limit]]
+        return {"items": items, "next": "more" if offset + limit < len(self.saved) else None}
+
+    def current_user_playlists(self, limit):
+        return {"items": [{"id": pid, "snapshot_id": snap} for pid, (snap, _) in self.playlists.items()]}
+
+    def playlist_items(self, playlist_id, limit, offset, additional_types):
+        self.calls.append(("playlist", playlist_id))
+        return {"items": [{"track": t} for t in self.playlists[playlist_id][1]], "next": None}
+
+    def current_user_recently_played(self, limit, after=None):
+        self.calls.append(("recent", after))
+        return {"items": [], "cursors": {"after": "1714521600000"}}
+
+
+def test_sync_only_pulls_what_changed_and_survives_a_restart(tmp_path):
+    client = FakeLibrary()
+    path = str(tmp_path / "library.json")
+    index = TrackIndex(path=path)
+    assert index.add_from_spotify(client) == 3
+    index.save()
+
+    client.saved.insert(0, ("2024-06-01T00:00:00Z", track("Hotline Bling", "Drake", "spotify:track:4")))
+    client.playlists["mix"] = ("s2", client.playlists["mix"][1] + [track("Bad Guy", "Billie Eilish", "spotify:track:5")])
+    client.calls.clear()
+
+    loaded = TrackIndex.load(path)
+    assert loaded.synced_within(60) and not loaded.synced_within(0)
+    assert loaded.add_from_spotify(client) == 2
+    assert client.calls == [("saved", 0), ("playlist", "mix"), ("recent", "1714521600000")]
+    assert [t["name"] for t in loaded.candidates("bad guy billie", limit=1)] == ["Bad Guy"]
+
+
+def test_load_reads_the_plain_track_list_format(tmp_path):
+    path = tmp_path / "library.json"
+    path.write_text(json.dumps([track("Blinding Lights", "The Weeknd", "spotify:track:9")]))
+    index = TrackIndex.load(str(path))
+    assert index.tracks == [{"name": "Blinding Lights", "uri": "spotify:track:9",
+                             "artists": [{"name": "The Weeknd", "uri": "artist:The Weeknd"}],
+                             "external_urls": {"spotify": ""}}]
+    assert not index.synced_within(3600)
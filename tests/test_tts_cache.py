@@ -0,0 +1,57 @@
+# Unit tests for the synthesized phrase cache
+import os
+import threading
+import numpy as np
+from core.tts_cache import TTSCache, make_key
+
+
+def test_key_depends_on_every_voice_parameter():
+    base = make_key("hi", "p347", 1.5, 0.7, 0.8, "vits")
+    assert base == make_key("hi", "p347", 1.5, 0.7, 0.8, "vits")
+    assert base != make_key("hi", "p347", 1.0, 0.7, 0.8, "vits")
+    assert base != make_key("hi", "p225", 1.5, 0.7, 0.8, "vits")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TTSCache(cache_dir=None, max_items=2)
+    for key in "abc":
+        cache.put(key, np.zeros(3), 22050)
+    assert cache.get("a") is None
+    assert cache.get("c")[1] == 22050
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    wav = np.linspace(-1, 1, 10, dtype=np.float32)
+    TTSCache(cache_dir=str(tmp_path)).put("k", wav, 22050)
+
+    fresh = TTSCache(cache_dir=str(tmp_path))
+    cached_wav, sr = fresh.get("k")
+    np.testing.assert_array_equal(cached_wav, wav)
+    assert sr == 22050 and fresh.disk_hits == 1
+
+
+def test_disk_tier_evicts_least_recently_used_beyond_byte_cap(tmp_path):
+    wav = np.zeros(1000, dtype=np.float32)
+    writer = TTSCache(cache_dir=str(tmp_path), max_bytes=10 ** 9)
+    for age, key in enumerate("abc"):
+        writer.put(key, wav, 22050)
+        os.utime(tmp_path / f"{key}.npz", (age, age))
+    size = os.path.getsize(tmp_path / "a.npz")
+
+    cache = TTSCache(cache_dir=str(tmp_path), max_bytes=3 * size)
+    assert cache.get("a") is not None  # a disk hit makes "a" the most recently used
+    cache.put("d", wav, 22050)
+    assert sorted(p.stem for p in tmp_path.glob("*.npz")) == ["a", "c", "d"]
+
+
+def test_concurrent_writers_of_one_phrase_leave_no_temp_files(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    threads = [threading.Thread(target=cache.put, args=("k", np.full(5000, i, dtype=np.float32), 22050))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [p.name for p in tmp_path.iterdir()] == ["k.npz"]
+    assert TTSCache(cache_dir=str(tmp_path)).get("k")[0].shape == (5000,)
@@ -0,0 +1,52 @@
+# Unit tests for voice activity detection
+import numpy as np
+from core.vad import EnergyVAD, frame_features, trim_silence
+
+SR = 16000
+
+
+def make_utterance(lead_s=0.5, speech_s=1.0, tail_s=1.2, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(speech_s * SR)) / SR
+    speech = 0.3 * np.sin(2 * np.pi * 220 * t)
+    noise = lambda s: 0.001 * rng.standard_normal(int(s * SR))
+    return np.concatenate((noise(lead_s), speech, noise(tail_s))).astype(np.float32)
+
+
+def test_frame_features_shapes():
+    energy, zcr = frame_features(np.zeros(1000, dtype=np.float32), 480)
+    assert energy.shape == zcr.shape == (2,)
+
+
+def test_vad_ends_after_trailing_silence():
+    audio = make_utterance()
+    vad = EnergyVAD(samplerate=SR, trailing_silence_ms=600)
+    ended_at = None
+    for i in range(0, audio.size, 1600):
+        if vad.process(audio[i:i + 1600]):
+            ended_at = i + 1600
+            break
+    assert vad.speech_started
+    # speech ends at 1.5 s; the stop must land inside the trailing window, not at the end of input
+    assert ended_at is not None and 1.5 * SR < ended_at < 2.5 * SR
+
+
+def test_vad_detects_speech_that_is_already_under_way_when_it_arms():
+    audio = make_utterance(lead_s=0.0, speech_s=1.0, tail_s=1.2)
+    vad = EnergyVAD(samplerate=SR, trailing_silence_ms=600)
+    ended_at = next((i + 1600 for i in range(0, audio.size, 1600) if vad.process(audio[i:i + 1600])), None)
+    assert vad.speech_started and ended_at is not None and 1.0 * SR < ended_at < 2.0 * SR
+
+
+def test_vad_times_out_without_speech():
+    vad = EnergyVAD(samplerate=SR, no_speech_timeout_s=1)
+    noise = 0.001 * np.random.default_rng(1).standard_normal(2 * SR).astype(np.float32)
+    assert any(vad.process(noise[i:i + 1600]) for i in range(0, noise.size, 1600))
+    assert not vad.speech_started
+
+
+def test_trim_silence_removes_dead_air():
+    audio = make_utterance()
+    trimmed = trim_silence(audio, samplerate=SR, pad_ms=100)
+    assert 1.0 * SR <= trimmed.size <= 1.3 * SR
+    assert trim_silence(np.zeros(SR, dtype=np.float32), samplerate=SR).size == 0